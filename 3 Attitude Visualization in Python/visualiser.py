@@ -1,3 +1,4 @@
+import os
 import sys
 import re
 import serial
@@ -11,9 +12,15 @@ from vispy.geometry import create_box
 from vispy.visuals.transforms import MatrixTransform
 from dark_theme import dark_stylesheet
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "GCS telemetry"))
+from rebroadcast import RebroadcastClient  # noqa: E402
+
 # Regex to extract Roll, Pitch, Yaw
 pattern = re.compile(r"Roll:\s*(-?\d+\.?\d*),\s*Pitch:\s*(-?\d+\.?\d*),\s*Yaw:\s*(-?\d+\.?\d*)")
 
+NETWORK_SOURCE = "Network (rebroadcast)"  # COM-box entry that reads from rebroadcast.py
+NETWORK_RATE_HZ = 20  # the view refreshes every 150 ms; no need for more
+
 
 class SerialReaderThread(QThread):
     data_received = pyqtSignal(float, float, float)
@@ -42,6 +49,37 @@ class SerialReaderThread(QThread):
         self.wait()
 
 
+class NetworkReaderThread(QThread):
+    """Latest attitude from the local rebroadcast service, rate limited on the service side."""
+    data_received = pyqtSignal(float, float, float)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        self.running = True
+
+    def run(self):
+        try:
+            client = RebroadcastClient(rate_hz=NETWORK_RATE_HZ,
+                                       topics=("attitude", "attitude_pair", "position"), timeout=0.1)
+        except OSError as e:
+            self.error_occurred.emit(str(e))
+            return
+        try:
+            while self.running:
+                for message, records in client.receive().items():
+                    last = records[-1]
+                    self.data_received.emit(last["roll"] / 100.0, last["pitch"] / 100.0, last["yaw"] / 100.0)
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+        finally:
+            client.close()
+
+    def stop(self):
+        self.running = False
+        self.wait()
+
+
 class MainWindow(QWidget):
     def __init__(self):
         super().__init__()
@@ -65,6 +103,7 @@ class MainWindow(QWidget):
         self.com_box = QComboBox()
         ports = [port.device for port in serial.tools.list_ports.comports()]
         self.com_box.addItems(ports)
+        self.com_box.addItem(NETWORK_SOURCE)
 
         # Baud rate selection
         self.baud_label = QLabel("Baud:")
@@ -206,7 +245,7 @@ class MainWindow(QWidget):
         self.update_timer.start()
 
     def toggle_connection(self):
-        if self.ser and self.ser.is_open:
+        if self.reader_thread is not None:
             self.disconnect_serial()
         else:
             self.connect_serial()
@@ -214,9 +253,12 @@ class MainWindow(QWidget):
     def connect_serial(self):
         port = self.com_box.currentText()
         try:
-            baud = int(self.baud_box.currentText())
-            self.ser = serial.Serial(port, baudrate=baud, timeout=1)
-            self.reader_thread = SerialReaderThread(self.ser)
+            if port == NETWORK_SOURCE:
+                self.reader_thread = NetworkReaderThread()
+            else:
+                baud = int(self.baud_box.currentText())
+                self.ser = serial.Serial(port, baudrate=baud, timeout=1)
+                self.reader_thread = SerialReaderThread(self.ser)
             self.reader_thread.data_received.connect(self.store_latest_rpy)
             self.reader_thread.error_occurred.connect(self.handle_error)
             self.reader_thread.start()
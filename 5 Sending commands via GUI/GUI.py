@@ -1,3 +1,4 @@
+import os
 import sys
 import serial
 import serial.tools.list_ports
@@ -9,11 +10,17 @@ from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QColor
 from dark_theme import dark_stylesheet
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "GCS telemetry"))
+from rebroadcast import RebroadcastClient  # noqa: E402
+
+NETWORK_SOURCE = "Network (rebroadcast)"  # port-box entry that sends through rebroadcast.py
+
 class Sender(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle('RPY Sender')
         self.ser = None
+        self.client = None
         self.timer = QTimer()
         self.timer.timeout.connect(self.send_data)
 
@@ -66,6 +73,7 @@ class Sender(QWidget):
         ports = serial.tools.list_ports.comports()
         for port in ports:
             self.port_selector.addItem(port.device)
+        self.port_selector.addItem(NETWORK_SOURCE)
 
     def update_label(self, label, name, value):
         label.setText(f"{name}: {value}")
@@ -74,7 +82,10 @@ class Sender(QWidget):
         port = self.port_selector.currentText()
         if port:
             try:
-                self.ser = serial.Serial(port, 9600)
+                if port == NETWORK_SOURCE:
+                    self.client = RebroadcastClient()
+                else:
+                    self.ser = serial.Serial(port, 9600)
                 self.timer.start(100)  # send every 100 ms
                 self.start_btn.setEnabled(False)
                 self.stop_btn.setEnabled(True)
@@ -91,6 +102,9 @@ class Sender(QWidget):
         if self.ser:
             self.ser.close()
             self.ser = None
+        if self.client:
+            self.client.close()
+            self.client = None
         self.start_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
         self.status_label.setText("Status: Stopped")
@@ -98,13 +112,16 @@ class Sender(QWidget):
         print("Stopped sending.")
 
     def send_data(self):
-        if self.ser and self.ser.is_open:
+        if (self.ser and self.ser.is_open) or self.client:
             r = self.sliders['Roll'].value()
             p = self.sliders['Pitch'].value()
             y = self.sliders['Yaw'].value()
             msg = f"{r},{p},{y}\n"
             try:
-                self.ser.write(msg.encode())
+                if self.client:
+                    self.client.send(msg.encode())
+                else:
+                    self.ser.write(msg.encode())
                 self.status_label.setText("Status: Sending...")
                 self.status_label.setStyleSheet("color: green; font-weight: bold;")
             except Exception as e:
@@ -1,3 +1,4 @@
+import os
 import sys
 import serial
 import serial.tools.list_ports
@@ -5,16 +6,35 @@ from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QVBoxLayout, QSlider, QPushButton,
     QHBoxLayout, QComboBox, QGridLayout
 )
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QTimer, QObject, pyqtSignal
 from dark_theme import dark_stylesheet
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "GCS telemetry"))
+from duplex_link import DuplexLink  # noqa: E402
+
+COMMAND_INTERVAL_MS = 20  # setpoints are offered at 50 Hz; the link's in-flight window paces them
+BAUD_RATE = 9600
+# gcs.ino answers text commands one at a time out of the Nano's 64-byte serial buffer
+WINDOW = {"text": 4, "binary": 32}
+
+
+class LinkSignals(QObject):
+    """Carries DuplexLink callbacks from its RX thread to the UI thread."""
+    response = pyqtSignal(object, object, float)
+    timeout = pyqtSignal(object)
+
+
 class Sender(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle('RPY Control Panel')
         self.ser = None
+        self.link = None
+        self.signals = LinkSignals()
+        self.signals.response.connect(self.on_response)
+        self.signals.timeout.connect(self.on_timeout)
         self.timer = QTimer()
-        self.timer.timeout.connect(self.send_and_receive)
+        self.timer.timeout.connect(self.submit_command)
 
         layout = QVBoxLayout()
 
@@ -27,6 +47,9 @@ class Sender(QWidget):
         refresh_btn = QPushButton("🔄")
         refresh_btn.clicked.connect(self.refresh_ports)
         port_layout.addWidget(refresh_btn)
+        self.protocol_selector = QComboBox()
+        self.protocol_selector.addItems(["Text", "Binary"])  # Text matches gcs.ino as shipped
+        port_layout.addWidget(self.protocol_selector)
         layout.addLayout(port_layout)
 
         # Sliders for Roll, Pitch, Yaw
@@ -56,8 +79,10 @@ class Sender(QWidget):
         # Current and Delta RPY Display
         self.current_rpy = QLabel("Current: Roll=0, Pitch=0, Yaw=0")
         self.delta_rpy = QLabel("Delta: Roll=0, Pitch=0, Yaw=0")
+        self.link_stats = QLabel("Link: ---")
         layout.addWidget(self.current_rpy)
         layout.addWidget(self.delta_rpy)
+        layout.addWidget(self.link_stats)
 
         # Start and Stop Buttons
         button_layout = QHBoxLayout()
@@ -85,10 +110,17 @@ class Sender(QWidget):
         port = self.port_selector.currentText()
         if port:
             try:
-                self.ser = serial.Serial(port, 9600, timeout=0.2)
-                self.timer.start(100)
+                # Short timeout: it only bounds how long the RX worker waits for bytes
+                self.ser = serial.Serial(port, BAUD_RATE, timeout=0.02)
+                protocol = self.protocol_selector.currentText().lower()
+                self.link = DuplexLink(self.ser, protocol=protocol, max_in_flight=WINDOW[protocol],
+                                       on_response=self.signals.response.emit,
+                                       on_timeout=self.signals.timeout.emit)
+                self.link.start()
+                self.timer.start(COMMAND_INTERVAL_MS)
                 self.start_btn.setEnabled(False)
                 self.stop_btn.setEnabled(True)
+                self.protocol_selector.setEnabled(False)
                 self.send_status.setText("Send: Waiting")
                 self.send_status.setStyleSheet("color: gray")
                 self.recv_status.setText("Recv: Waiting")
@@ -99,55 +131,54 @@ class Sender(QWidget):
                 print(f"Failed to open port {port}: {e}")
 
     def stop(self):
+        self.timer.stop()
+        if self.link:
+            self.link.stop()
+            self.link = None
         if self.ser and self.ser.is_open:
             self.ser.close()
-        self.timer.stop()
         self.ser = None
         self.start_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
+        self.protocol_selector.setEnabled(True)
         self.send_status.setText("Send: Stopped")
         self.send_status.setStyleSheet("color: gray")
         self.recv_status.setText("Recv: Stopped")
         self.recv_status.setStyleSheet("color: gray")
 
-    def send_and_receive(self):
-        if self.ser and self.ser.is_open:
-            r = self.sliders['Roll'].value()
-            p = self.sliders['Pitch'].value()
-            y = self.sliders['Yaw'].value()
-            msg = f"{r},{p},{y}\n"
-
-            # Show sending status
-            self.send_status.setText("Sending...")
-            self.send_status.setStyleSheet("color: orange")
-
-            try:
-                self.ser.write(msg.encode())
-                self.send_status.setText("Send Success ✅")
-                self.send_status.setStyleSheet("color: green")
-            except:
-                self.send_status.setText("Send Failed ❌")
-                self.send_status.setStyleSheet("color: red")
-                return
-
-            # Show receiving status
-            self.recv_status.setText("Receiving...")
-            self.recv_status.setStyleSheet("color: orange")
-
-            try:
-                line = self.ser.readline().decode().strip()
-                parts = line.split(",")
-                if len(parts) == 6:
-                    cr, cp, cy, dr, dp, dy = parts
-                    self.current_rpy.setText(f"Current: Roll={cr}, Pitch={cp}, Yaw={cy}")
-                    self.delta_rpy.setText(f"Delta: Roll={dr}, Pitch={dp}, Yaw={dy}")
-                    self.recv_status.setText("Receive Success ✅")
-                    self.recv_status.setStyleSheet("color: green")
-                else:
-                    raise ValueError("Invalid response format")
-            except:
-                self.recv_status.setText("Receive Failed ❌")
-                self.recv_status.setStyleSheet("color: red")
+    def submit_command(self):
+        """Offer the current setpoint to the link; never waits for the radio."""
+        if self.link is None:
+            return
+        if self.link.error is not None:
+            error = self.link.error
+            self.stop()
+            self.send_status.setText("Send Failed ❌")
+            self.send_status.setStyleSheet("color: red")
+            print(f"Link error: {error}")
+            return
+        self.link.submit((self.sliders['Roll'].value(), self.sliders['Pitch'].value(),
+                          self.sliders['Yaw'].value()))
+        stats = self.link.stats()
+        self.send_status.setText(f"Sent {stats['sent']} ({stats['in_flight']} in flight)")
+        self.send_status.setStyleSheet("color: green")
+        rtt = f"RTT {stats['rtt_mean_ms']:.0f} ms (p95 {stats['rtt_p95_ms']:.0f})" if "rtt_mean_ms" in stats else "RTT ---"
+        self.link_stats.setText(f"Link: {rtt}, received {stats['received']}, lost {stats['lost']}")
+
+    def on_response(self, seq, values, rtt):
+        cr, cp, cy, dr, dp, dy = values
+        self.current_rpy.setText(f"Current: Roll={cr:.2f}, Pitch={cp:.2f}, Yaw={cy:.2f}")
+        self.delta_rpy.setText(f"Delta: Roll={dr:.2f}, Pitch={dp:.2f}, Yaw={dy:.2f}")
+        self.recv_status.setText(f"Receive Success ✅ {rtt * 1000:.0f} ms")
+        self.recv_status.setStyleSheet("color: green")
+
+    def on_timeout(self, seq):
+        self.recv_status.setText("Receive Failed ❌ (timeout)")
+        self.recv_status.setStyleSheet("color: red")
+
+    def closeEvent(self, event):
+        self.stop()
+        event.accept()
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
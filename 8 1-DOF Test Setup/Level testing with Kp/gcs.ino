@@ -15,6 +15,67 @@ Telemetry data;
 
 const byte address[6] = "00001";
 
+// 1 = telemetry_codec MOTOR_TEST frames (gui.py "Binary"), 0 = CSV text lines (gui.py "CSV")
+#define BINARY_TELEMETRY 1
+#define MOTOR_TEST_ID 0x03
+uint8_t seq = 0;
+
+// CRC-16/CCITT-FALSE, the same as telemetry_codec.crc16
+uint16_t crc16(const uint8_t *buf, size_t len) {
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < len; i++) {
+    crc ^= (uint16_t)buf[i] << 8;
+    for (uint8_t b = 0; b < 8; b++) crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+  }
+  return crc;
+}
+
+// COBS-encode `len` bytes and write them followed by the 0x00 delimiter
+void writeCobs(const uint8_t *buf, size_t len) {
+  uint8_t out[64];
+  size_t code_at = 0, n = 1;
+  uint8_t code = 1;
+  for (size_t i = 0; i < len; i++) {
+    if (buf[i] == 0) {
+      out[code_at] = code;
+      code_at = n++;
+      code = 1;
+    } else {
+      out[n++] = buf[i];
+      if (++code == 0xFF) {
+        out[code_at] = code;
+        code_at = n++;
+        code = 1;
+      }
+    }
+  }
+  out[code_at] = code;
+  out[n++] = 0x00;
+  Serial.write(out, n);
+}
+
+// MOTOR_TEST: type, seq, t_ms u32, roll/pitch int16 in 0.01 deg, m1..m4 u16, crc16 (all little-endian)
+void sendMotorTest(const Telemetry &t) {
+  struct __attribute__((packed)) {
+    uint8_t type, seq;
+    uint32_t t_ms;
+    int16_t roll, pitch;
+    uint16_t m1, m2, m3, m4;
+    uint16_t crc;
+  } frame;
+  frame.type = MOTOR_TEST_ID;
+  frame.seq = seq++;
+  frame.t_ms = millis();
+  frame.roll = (int16_t)constrain(lroundf(t.roll_error * 100.0f), -32768L, 32767L);
+  frame.pitch = (int16_t)constrain(lroundf(t.pitch_error * 100.0f), -32768L, 32767L);
+  frame.m1 = t.pwm1;
+  frame.m2 = t.pwm2;
+  frame.m3 = t.pwm3;
+  frame.m4 = t.pwm4;
+  frame.crc = crc16((const uint8_t *)&frame, sizeof(frame) - 2);
+  writeCobs((const uint8_t *)&frame, sizeof(frame));
+}
+
 void setup() {
   Serial.begin(115200);
   radio.begin();
@@ -26,11 +87,15 @@ void setup() {
 void loop() {
   if (radio.available()) {
     radio.read(&data, sizeof(data));
+#if BINARY_TELEMETRY
+    sendMotorTest(data);
+#else
     Serial.print(data.roll_error); Serial.print(",");
     Serial.print(data.pitch_error); Serial.print(",");
     Serial.print(data.pwm1); Serial.print(",");
     Serial.print(data.pwm2); Serial.print(",");
     Serial.print(data.pwm3); Serial.print(",");
     Serial.println(data.pwm4);
+#endif
   }
 }
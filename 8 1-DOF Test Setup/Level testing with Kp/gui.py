@@ -1,49 +1,109 @@
 # gui.py
-import sys, serial, threading, serial.tools.list_ports, csv, datetime, os
+import sys, threading, serial.tools.list_ports, csv, datetime, os
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QComboBox, QLabel, QHBoxLayout
 from PyQt5.QtCore import pyqtSignal, QObject
 import pyqtgraph as pg
 
-# ---- Serial reader thread ----
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "GCS telemetry"))
+from telemetry_codec import MOTOR_TEST  # noqa: E402
+from telemetry_hub import BinaryDecoder, LineDecoder, TelemetryHub  # noqa: E402
+from rebroadcast import RebroadcastClient  # noqa: E402
+
+NETWORK_SOURCE = "Network (rebroadcast)"  # COM-box entry that reads from rebroadcast.py
+PROTOCOLS = ("Binary", "CSV")  # gcs.ino BINARY_TELEMETRY 1 / 0
+
+
+def emit_motor_test(signal, records):
+    """Emit every record of a decoded motor_test batch in physical units."""
+    values = MOTOR_TEST.physical(records)
+    for i in range(len(records)):
+        signal.emit(float(values["roll"][i]), float(values["pitch"][i]),
+                    int(records["m1"][i]), int(records["m2"][i]), int(records["m3"][i]), int(records["m4"][i]))
+
+def parse_line(line):
+    """CSV line r,p,m1,m2,m3,m4 -> tuple, or None to reject it."""
+    parts = line.split(",")
+    if len(parts) != 6:
+        return None
+    try:
+        return (float(parts[0]), float(parts[1])) + tuple(int(p) for p in parts[2:])
+    except ValueError:
+        return None
+
+# ---- Serial reader (TelemetryHub subscriber) ----
 class SerialReader(QObject):
+    """The hub thread owns the port and decodes it; deliveries are emitted from there."""
+    data_received = pyqtSignal(float, float, int, int, int, int)
+
+    def __init__(self):
+        super().__init__()
+        self.hub = None
+        self.feed = None
+
+    def start(self, port, baud, binary=True):
+        if self.hub is not None:
+            self.stop()
+        try:
+            self.hub = TelemetryHub()
+            decoder = BinaryDecoder() if binary else LineDecoder(parse_line, topic="motor_test_csv")
+            self.hub.add_serial("gcs", port, baud, decoder)
+        except RuntimeError as e:  # pyserial missing
+            self.hub = None
+            print(f"Failed to open serial port: {e}")
+            return
+        self.feed = self.hub.subscribe(maxlen=256, topics={"motor_test", "motor_test_csv", "link"},
+                                       notify=self.deliver)
+        self.hub.start()
+
+    def deliver(self):
+        for packet in self.feed.drain():
+            if packet.topic == "motor_test":
+                emit_motor_test(self.data_received, packet.payload)
+            elif packet.topic == "motor_test_csv":
+                for values in packet.payload:
+                    self.data_received.emit(*values)
+            elif packet.topic == "link" and not packet.payload:
+                print(f"Serial link down: {self.hub.sources['gcs'].last_error}")
+
+    def stop(self):
+        if self.hub is not None:
+            self.hub.stop()
+            self.hub = None
+
+# ---- Network reader thread ----
+class NetworkReader(QObject):
+    """motor_test records from the local rebroadcast service."""
     data_received = pyqtSignal(float, float, int, int, int, int)
 
     def __init__(self):
         super().__init__()
-        self.ser = None
+        self.client = None
         self.running = False
 
-    def start(self, port, baud):
+    def start(self, port=None, baud=None, binary=True):
         if self.running:
             self.stop()
         try:
-            self.ser = serial.Serial(port, baud, timeout=1)
+            self.client = RebroadcastClient(topics=("motor_test",), timeout=0.1)
             self.running = True
             threading.Thread(target=self.read_loop, daemon=True).start()
-        except:
-            print("Failed to open serial port.")
+        except OSError:
+            print("Failed to open network source.")
 
     def read_loop(self):
-        while self.running:
-            try:
-                line = self.ser.readline().decode().strip()
-                if not line:
-                    continue
-                parts = line.split(",")
-                if len(parts) == 6:
-                    r, p, m1, m2, m3, m4 = parts
-                    self.data_received.emit(float(r), float(p),
-                                            int(m1), int(m2), int(m3), int(m4))
-            except:
-                pass
+        client = self.client
+        try:
+            while self.running:
+                records = client.receive().get(MOTOR_TEST)
+                if records is not None:
+                    emit_motor_test(self.data_received, records)
+        except OSError:
+            print("Network source closed.")
+        finally:
+            client.close()
 
     def stop(self):
         self.running = False
-        try:
-            if self.ser:
-                self.ser.close()
-        except:
-            pass
 
 # ---- GUI ----
 class MainWindow(QWidget):
@@ -61,10 +121,13 @@ class MainWindow(QWidget):
         self.baud_label = QLabel("Baud:")
         self.baud_selector = QComboBox()
         self.baud_selector.addItems(["9600","115200","230400"])
+        self.protocol_selector = QComboBox()
+        self.protocol_selector.addItems(PROTOCOLS)
         serial_layout.addWidget(self.com_label)
         serial_layout.addWidget(self.com_selector)
         serial_layout.addWidget(self.baud_label)
         serial_layout.addWidget(self.baud_selector)
+        serial_layout.addWidget(self.protocol_selector)
         self.layout.addLayout(serial_layout)
 
         # Roll/Pitch error plot
@@ -99,9 +162,12 @@ class MainWindow(QWidget):
         self.t = 0
         self.plotting = False
 
-        # Serial reader
-        self.reader = SerialReader()
-        self.reader.data_received.connect(self.update_data)
+        # Serial and network readers; start_plotting picks one
+        self.serial_reader = SerialReader()
+        self.network_reader = NetworkReader()
+        self.serial_reader.data_received.connect(self.update_data)
+        self.network_reader.data_received.connect(self.update_data)
+        self.reader = self.serial_reader
 
         # Log folder and file setup
         script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -123,11 +189,14 @@ class MainWindow(QWidget):
         ports = serial.tools.list_ports.comports()
         for p in ports:
             self.com_selector.addItem(p.device)
+        self.com_selector.addItem(NETWORK_SOURCE)
 
     def start_plotting(self):
         port = self.com_selector.currentText()
         baud = int(self.baud_selector.currentText())
-        self.reader.start(port, baud)
+        self.reader.stop()
+        self.reader = self.network_reader if port == NETWORK_SOURCE else self.serial_reader
+        self.reader.start(port, baud, self.protocol_selector.currentText() == "Binary")
         self.plotting = True
         self.stop_line_error.setVisible(False)
         self.stop_line_motor.setVisible(False)
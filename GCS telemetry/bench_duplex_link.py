@@ -0,0 +1,140 @@
+import heapq
+import random
+import sys
+import threading
+import time
+from duplex_link import DuplexLink
+from telemetry_codec import ATTITUDE_PAIR, RPY_COMMAND, FrameDecoder, encode
+
+BAUD = 115200
+LATENCY = 0.025   # one-way radio + transceiver latency, s
+SECONDS = 2.0
+
+
+class _Channel:
+    """One direction of a simulated serial/radio link: serialised at `baud`, delivered after `latency`."""
+
+    def __init__(self, baud, latency):
+        self.byte_time = 10.0 / baud
+        self.latency = latency
+        self.busy_until = 0.0
+        self.deliveries = []
+        self.buffer = bytearray()
+        self.cond = threading.Condition()
+        self.closed = False
+
+    def write(self, data):
+        with self.cond:
+            now = time.perf_counter()
+            self.busy_until = max(now, self.busy_until) + len(data) * self.byte_time
+            heapq.heappush(self.deliveries, (self.busy_until + self.latency, bytes(data)))
+            self.cond.notify_all()
+
+    def _collect(self, now):
+        while self.deliveries and self.deliveries[0][0] <= now:
+            self.buffer += heapq.heappop(self.deliveries)[1]
+
+    def read(self, n, timeout):
+        end = time.perf_counter() + timeout
+        with self.cond:
+            while True:
+                now = time.perf_counter()
+                self._collect(now)
+                if self.buffer or now >= end or self.closed:
+                    data = bytes(self.buffer[:n])
+                    del self.buffer[:n]
+                    return data
+                wait = end - now
+                if self.deliveries:
+                    wait = min(wait, self.deliveries[0][0] - now)
+                self.cond.wait(max(wait, 0.0))
+
+    def waiting(self):
+        with self.cond:
+            self._collect(time.perf_counter())
+            return len(self.buffer)
+
+
+class _HostPort:
+    """pyserial-like end the DuplexLink talks to."""
+
+    def __init__(self, tx, rx, timeout=0.01):
+        self.tx, self.rx, self.timeout = tx, rx, timeout
+
+    @property
+    def in_waiting(self):
+        return self.rx.waiting()
+
+    def read(self, n=1):
+        return self.rx.read(n, self.timeout)
+
+    def write(self, data):
+        self.tx.write(data)
+
+
+def _vehicle(rx, tx, protocol, loss, stop, seed=0):
+    """Answers every command it receives (dropping `loss` of them) with current and delta attitude."""
+    rng = random.Random(seed)
+    decoder, text = FrameDecoder(), b""
+    while not stop.is_set():
+        data = rx.read(4096, 0.01)
+        if not data:
+            continue
+        if protocol == "binary":
+            records = decoder.feed(data).get(RPY_COMMAND)
+            commands = [] if records is None else \
+                [(int(r["seq"]), r["roll"] / 100.0, r["pitch"] / 100.0, r["yaw"] / 100.0) for r in records]
+        else:
+            *lines, text = (text + data).split(b"\n")
+            commands = [(None, *map(float, line.split(b","))) for line in lines if line]
+        for seq, r, p, y in commands:
+            if rng.random() < loss:
+                continue
+            current = (0.9 * r, 0.9 * p, 0.9 * y)
+            delta = (r - current[0], p - current[1], y - current[2])
+            if protocol == "binary":
+                tx.write(encode(ATTITUDE_PAIR, (0,) + current + delta, seq))
+            else:
+                tx.write((",".join(f"{v:.2f}" for v in current + delta) + "\n").encode())
+
+
+def run(protocol, max_in_flight, loss=0.0, seconds=SECONDS):
+    up, down = _Channel(BAUD, LATENCY), _Channel(BAUD, LATENCY)
+    stop = threading.Event()
+    vehicle = threading.Thread(target=_vehicle, args=(up, down, protocol, loss, stop))
+    vehicle.start()
+    link = DuplexLink(_HostPort(up, down), protocol=protocol, max_in_flight=max_in_flight, timeout=0.25)
+    link.start()
+    start = time.perf_counter()
+    i = 0
+    while time.perf_counter() - start < seconds:
+        link.submit((i % 90, -(i % 45), i % 180))  # a UI streaming setpoints faster than any link
+        i += 1
+        time.sleep(0.0005)
+    time.sleep(0.3)
+    link.stop()
+    stop.set()
+    down.closed = up.closed = True
+    vehicle.join()
+    stats = link.stats()
+    stats["rate"] = stats["received"] / seconds
+    return stats
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else SECONDS
+    print(f"Simulated link: {BAUD} baud, {LATENCY * 1000:.0f} ms each way, {seconds:.0f} s per case")
+    print(f"{'protocol':<8} {'window':>6} {'loss':>5} {'resp/s':>8} {'lost':>5} {'rtt mean':>9} {'p95':>7}")
+    results = {}
+    for protocol, window, loss in (("text", 1, 0.0), ("text", 8, 0.0), ("binary", 1, 0.0),
+                                   ("binary", 8, 0.0), ("binary", 64, 0.0), ("binary", 64, 0.05)):
+        s = run(protocol, window, loss, seconds)
+        results[(protocol, window, loss)] = s
+        print(f"{protocol:<8} {window:>6} {loss:>5.0%} {s['rate']:8.1f} {s['lost']:5d} "
+              f"{s.get('rtt_mean_ms', 0):7.1f}ms {s.get('rtt_p95_ms', 0):5.1f}ms")
+    lockstep, pipelined = results[("binary", 1, 0.0)]["rate"], results[("binary", 64, 0.0)]["rate"]
+    print(f"pipelining speed-up: {pipelined / lockstep:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
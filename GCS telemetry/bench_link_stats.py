@@ -0,0 +1,76 @@
+import random
+import time
+from link_stats import LATENCY_EDGES_MS, LinkStats
+
+RATE_HZ = 200
+SECONDS = 90
+
+
+def simulate(loss=0.03, reorder=0.01, duplicate=0.005, base_delay=0.012, jitter=0.004, outage=(75.0, 75.5),
+             seed=0):
+    """A RATE_HZ stream with random loss, swaps, repeats and delay jitter, plus a short outage."""
+    rng = random.Random(seed)
+    packets = []
+    for i in range(RATE_HZ * SECONDS):
+        t_tx = i / RATE_HZ
+        if rng.random() < loss or outage[0] <= t_tx < outage[1]:
+            continue
+        t_rx = t_tx + base_delay + abs(rng.gauss(0, jitter)) + 100.0  # receiver clock offset
+        packets.append((t_rx, i % 256, t_tx))
+        if rng.random() < duplicate:
+            packets.append((t_rx + 1e-4, i % 256, t_tx))
+    for k in range(1, len(packets)):
+        if rng.random() < reorder:
+            packets[k - 1], packets[k] = packets[k], packets[k - 1]
+    return packets
+
+
+def main():
+    packets = simulate()
+    sent = RATE_HZ * SECONDS
+    stats = LinkStats()
+    start = time.perf_counter()
+    summaries = {}
+    next_publish = packets[0][0] + 1.0
+    for t_rx, seq, t_tx in packets:
+        stats.record(t_rx, seq, 0, t_tx, size=28)
+        if t_rx >= next_publish:
+            summaries[round(next_publish - packets[0][0])] = stats.summary(t_rx)
+            next_publish += 1.0
+    elapsed = time.perf_counter() - start
+    print(f"{len(packets)} packets in {elapsed * 1e3:.0f} ms ({elapsed / len(packets) * 1e9:.0f} ns/packet, "
+          f"{len(summaries)} summaries published)")
+    print(f"true loss {1 - len(set((s, int(t * RATE_HZ)) for _, s, t in packets)) / sent:.2%}, "
+          f"counted {stats.total_lost / (stats.total_lost + stats.total_received):.2%}")
+
+    final = stats.summary(packets[-1][0])
+    print(f"{'window':>6} {'pkt/s':>7} {'loss':>6} {'reord':>6} {'dup':>4} {'jitter':>7} {'p50':>6} {'p95':>6} {'p99':>6}")
+    for w in (1, 10, 60):
+        s = final[w]
+        print(f"{w:>5}s {s['rate']:7.1f} {s['loss']:6.1%} {s['reordered']:6d} {s['duplicates']:4d} "
+              f"{s['jitter_ms']:6.2f}ms {s['latency_p50_ms']:5.1f} {s['latency_p95_ms']:5.1f} "
+              f"{s['latency_p99_ms']:5.1f}")
+    flagged = [t for t, s in summaries.items() if s["degraded"]]
+    print(f"degraded at t = {flagged} s: {summaries[flagged[0]]['degraded'] if flagged else '-'}")
+    print(f"histogram edges (ms): {LATENCY_EDGES_MS[:12].round(1).tolist()} ...")
+    check_outages()
+
+
+def check_outages():
+    """Outages longer than the seq can count must be loss, never reordering or negative loss."""
+    for outage in ((75.0, 75.5), (75.0, 76.0), (75.0, 77.0), (75.0, 80.0)):
+        packets = simulate(outage=outage)
+        stats = LinkStats()
+        for t_rx, seq, t_tx in packets:
+            stats.record(t_rx, seq, 0, t_tx)
+        sent = RATE_HZ * SECONDS
+        true = 1 - len(set(round(t * RATE_HZ) for _, _, t in packets)) / sent
+        counted = stats.total_lost / (stats.total_lost + stats.total_received)
+        window = stats.summary(packets[-1][0])[60]
+        print(f"outage {outage[1] - outage[0]:.1f} s: true loss {true:.2%}, counted {counted:.2%}, "
+              f"60 s window {window['loss']:.2%}, reordered {window['reordered']}")
+        assert stats.total_lost >= 0 and abs(counted - true) < 0.005 and window["reordered"] < 200
+
+
+if __name__ == "__main__":
+    main()
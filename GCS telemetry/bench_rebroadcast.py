@@ -0,0 +1,126 @@
+import socket
+import sys
+import threading
+import time
+from rebroadcast import RebroadcastClient, RebroadcastServer
+from telemetry_codec import POSITION, RPY_COMMAND, STATUS, FrameDecoder, encode
+from telemetry_hub import BinaryDecoder, TelemetryHub
+
+HOST = "127.0.0.1"
+RATE_HZ = 500
+SECONDS = 3.0
+
+
+def _free_port(kind=socket.SOCK_STREAM):
+    with socket.socket(socket.AF_INET, kind) as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def _vehicle(port, n, rate_hz, commands):
+    """
+    Simulated vehicle: POSITION at rate_hz and STATUS at 1/10 of it, written
+    in real time; commands that came up the link are counted at the end.
+    """
+    while True:
+        try:
+            sock = socket.create_connection((HOST, port))
+            break
+        except ConnectionRefusedError:
+            time.sleep(0.01)
+    start = time.perf_counter()
+    for i in range(n):
+        frame = encode(POSITION, (i * 1000 // rate_hz, 1.0, 2.0, i % 360, 12.97, 77.59, 10.0), i)
+        if i % 10 == 0:
+            frame += encode(STATUS, (i * 1000 // rate_hz, 2, 1, 1, 1, 11.1, 1500, 1500, 1500, 1500), i)
+        sock.sendall(frame)
+        delay = start + (i + 1) / rate_hz - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    sock.settimeout(0.2)
+    decoder = FrameDecoder()
+    try:
+        while True:
+            data = sock.recv(4096)
+            if not data:
+                break
+            for message, records in decoder.feed(data).items():
+                commands[message.name] = commands.get(message.name, 0) + len(records)
+    except socket.timeout:
+        pass
+    sock.close()
+
+
+def _listen(client, stop, counts):
+    client.subscribe()
+    while not stop.is_set():
+        batch = client.receive()
+        for message, records in batch.items():
+            counts[message.name] = counts.get(message.name, 0) + len(records)
+            counts.setdefault("first_t_ms", int(records["t_ms"][0]))
+        if batch:
+            counts.setdefault("first_batch", sorted(m.name for m in batch))
+    client.close()
+
+
+def _command(client, n):
+    for i in range(n):
+        client.send(encode(RPY_COMMAND, (i, -i, 0), i))
+        time.sleep(0.01)
+    client.close()
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else SECONDS
+    n = int(RATE_HZ * seconds)
+    link_port, udp_port = _free_port(), _free_port(socket.SOCK_DGRAM)
+    hub = TelemetryHub()
+    hub.add_tcp_server("vehicle", HOST, link_port, BinaryDecoder())
+    server = hub.add_source(RebroadcastServer(port=udp_port, uplink="vehicle"))
+    hub.start()
+
+    clients = {
+        "gcs (all)": (RebroadcastClient(port=udp_port), 0.0),
+        "visualiser (20 Hz)": (RebroadcastClient(port=udp_port, rate_hz=20, topics=["position"]), 0.0),
+        "logger (late join)": (RebroadcastClient(port=udp_port), seconds / 2)
+    }
+    stop = threading.Event()
+    threads = []
+    commands = {}
+    vehicle = threading.Thread(target=_vehicle, args=(link_port, n, RATE_HZ, commands))
+    vehicle.start()
+    commander = threading.Timer(seconds / 4, _command, args=(RebroadcastClient(port=udp_port), 20))
+    commander.start()
+    start = time.perf_counter()
+    results = {}
+    for name, (client, delay) in clients.items():
+        results[name] = {}
+        thread = threading.Timer(delay, _listen, args=(client, stop, results[name]))
+        thread.start()
+        threads.append(thread)
+    vehicle.join()
+    commander.join()
+    time.sleep(0.2)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    hub.stop()
+
+    print(f"vehicle: {n} position + {(n + 9) // 10} status frames over {elapsed:.1f} s, "
+          f"{server.datagrams_sent} datagrams rebroadcast, {commands.get('rpy_command', 0)} of 20 commands up")
+    for name, counts in results.items():
+        print(f"  {name:<20} position {counts.get('position', 0):6d}  status {counts.get('status', 0):5d}  "
+              f"first t {counts.get('first_t_ms')} ms  first batch {counts.get('first_batch')}")
+    full, limited = results["gcs (all)"], results["visualiser (20 Hz)"]
+    ok = (full.get("position") == n and full.get("status") == (n + 9) // 10
+          and limited.get("position", 0) <= 20 * seconds + 5 and "status" not in limited
+          and results["logger (late join)"].get("first_batch") == ["position", "status"]  # snapshot
+          and commands.get("rpy_command") == 20)
+    print("OK" if ok else "FAIL")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
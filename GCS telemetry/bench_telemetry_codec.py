@@ -0,0 +1,99 @@
+import random
+import sys
+import time
+import numpy as np
+from telemetry_codec import POSITION, STATUS, RADIO_PAYLOAD, FrameDecoder, decode, encode
+
+N_FRAMES = 200_000
+CHUNK = 4096  # bytes handed to the decoder at a time, like a serial read
+
+
+def _samples(n, seed=0):
+    rng = random.Random(seed)
+    return [(i * 4, rng.uniform(-45, 45), rng.uniform(-45, 45), rng.uniform(-180, 180),
+             12.9716 + rng.uniform(-1e-3, 1e-3), 77.5946 + rng.uniform(-1e-3, 1e-3), rng.uniform(0, 120))
+            for i in range(n)]
+
+
+def text_stream(samples):
+    """The GCS CSV line as gcs.ino prints it today."""
+    return "".join(f"{r:.2f},{p:.2f},{y:.2f},{lat:.6f},{lon:.6f},{alt:.2f},"
+                   f"Stabilize,ARMED,OK,OK,11.10,1500,1500,1500,1500\n"
+                   for _, r, p, y, lat, lon, alt in samples).encode()
+
+
+def binary_stream(samples):
+    out = bytearray()
+    for i, s in enumerate(samples):
+        out += encode(POSITION, s, i)
+        if i % 10 == 0:
+            out += encode(STATUS, (s[0], 1, 1, 1, 1, 11.1, 1500, 1500, 1500, 1500), i)
+    return bytes(out)
+
+
+def decode_text(stream):
+    rows = []
+    pending = b""
+    for k in range(0, len(stream), CHUNK):
+        *lines, pending = (pending + stream[k:k + CHUNK]).split(b"\n")
+        for line in lines:
+            parts = line.decode().split(",")
+            rows.append([float(p) for p in parts[:6]] + parts[6:11] + [float(p) for p in parts[11:15]])
+    return rows
+
+
+def decode_binary(stream):
+    decoder = FrameDecoder()
+    batches = []
+    for k in range(0, len(stream), CHUNK):
+        batches.append(decoder.feed(stream[k:k + CHUNK]))
+    return decoder, batches
+
+
+def _timed(fn, *args):
+    best, result = None, None
+    for _ in range(3):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else N_FRAMES
+    samples = _samples(n)
+    text, binary = text_stream(samples), binary_stream(samples)
+    t_text, rows = _timed(decode_text, text)
+    t_bin, (decoder, batches) = _timed(decode_binary, binary)
+
+    positions = np.concatenate([b[POSITION] for b in batches if POSITION in b])
+    values = POSITION.physical(positions)
+    expected = np.array([s[1:] for s in samples])
+    error = {name: float(np.abs(values[name] - expected[:, i]).max())
+             for i, name in enumerate(("roll", "pitch", "yaw", "lat", "lon", "alt"))}
+
+    line_bytes = len(text) / n
+    frame_bytes = len(encode(POSITION, samples[0], 0))
+    print(f"{n} samples")
+    print(f"text    {line_bytes:6.1f} B/sample  {n / t_text / 1e3:8.1f} k samples/s decoded"
+          f"   ({int(np.ceil(line_bytes / RADIO_PAYLOAD))} radio packets each)")
+    print(f"binary  {len(binary) / n:6.1f} B/sample  {n / t_bin / 1e3:8.1f} k samples/s decoded"
+          f"   (position frame {frame_bytes} B, fits one {RADIO_PAYLOAD} B packet)")
+    print(f"speed-up {t_text / t_bin:.1f}x, frames {decoder.frames}, "
+          f"crc errors {decoder.crc_errors}, framing errors {decoder.framing_errors}")
+    print("max quantization error: " + ", ".join(f"{k} {v:.1e}" for k, v in error.items()))
+
+    # A corrupted byte costs exactly that frame; the stream resynchronises on the next delimiter
+    corrupt = bytearray(binary[:10 * frame_bytes])
+    corrupt[frame_bytes + 5] ^= 0x40
+    decoder = FrameDecoder()
+    decoder.feed(bytes(corrupt))
+    print(f"one corrupted byte: {decoder.frames} frames kept, "
+          f"{decoder.crc_errors + decoder.framing_errors} rejected")
+    assert decode(encode(POSITION, samples[0], 7))[1] == 7
+    assert len(rows) == n and len(positions) == n
+
+
+if __name__ == "__main__":
+    main()
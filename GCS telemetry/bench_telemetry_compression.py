@@ -0,0 +1,154 @@
+import math
+import random
+import sys
+import time
+import numpy as np
+from telemetry_codec import POSITION, STATUS, RADIO_PAYLOAD, FrameDecoder, encode
+from telemetry_compression import FIELD_NAMES, CompressedDecoder, DeltaEncoder
+from link_stats import LinkStats
+
+RATE_HZ = 100
+GPS_HZ = 10
+N_FRAMES = 100_000
+CHUNK = 4096  # bytes handed to the decoder at a time, like a serial read
+
+
+def _flight(n, seed=0):
+    """A smooth flight sampled at RATE_HZ: attitude from the IMU, position held between GPS fixes."""
+    rng = random.Random(seed)
+    samples = []
+    lat, lon, alt = 12.9716, 77.5946, 0.0
+    for i in range(n):
+        t = i / RATE_HZ
+        if i % (RATE_HZ // GPS_HZ) == 0:
+            lat += 2e-6 + rng.gauss(0, 2e-7)
+            lon += 1e-6 + rng.gauss(0, 2e-7)
+            alt = min(alt + 0.02, 30.0) + rng.gauss(0, 0.01)
+        roll = 10 * math.sin(0.5 * t) + rng.gauss(0, 0.05)
+        pitch = 5 * math.sin(0.3 * t + 1) + rng.gauss(0, 0.05)
+        yaw = (20 * t) % 360 - 180
+        motors = [1500 + int(40 * math.sin(0.5 * t + k) + rng.gauss(0, 2)) for k in range(4)]
+        battery = 12.6 - 1.5 * i / n
+        samples.append((i * 1000 // RATE_HZ, roll, pitch, yaw, lat, lon, alt, 2, 1, 1, 1, battery, *motors))
+    return samples
+
+
+def text_stream(samples):
+    """The GCS CSV line as gcs.ino prints it today."""
+    return "".join(f"{r:.2f},{p:.2f},{y:.2f},{lat:.6f},{lon:.6f},{alt:.2f},"
+                   f"AltHold,ARMED,OK,OK,{bat:.2f},{m1},{m2},{m3},{m4}\n"
+                   for _, r, p, y, lat, lon, alt, _, _, _, _, bat, m1, m2, m3, m4 in samples).encode()
+
+
+def binary_stream(samples):
+    """POSITION and STATUS frames for every sample (telemetry_codec)."""
+    out = bytearray()
+    for i, s in enumerate(samples):
+        out += encode(POSITION, s[:7], i) + encode(STATUS, (s[0],) + s[7:], i)
+    return bytes(out)
+
+
+def compressed_stream(samples):
+    encoder = DeltaEncoder()
+    frames = [encoder.encode(s) for s in samples]
+    return b"".join(frames), frames
+
+
+def decode_text(stream):
+    rows = []
+    pending = b""
+    for k in range(0, len(stream), CHUNK):
+        *lines, pending = (pending + stream[k:k + CHUNK]).split(b"\n")
+        for line in lines:
+            parts = line.decode().split(",")
+            rows.append([float(p) for p in parts[:6]] + parts[6:11] + [float(p) for p in parts[11:15]])
+    return rows
+
+
+def decode_stream(decoder_type, stream):
+    decoder = decoder_type()
+    batches = []
+    for k in range(0, len(stream), CHUNK):
+        batches.append(decoder.feed(stream[k:k + CHUNK]))
+    return decoder, batches
+
+
+def _timed(fn, *args):
+    best, result = None, None
+    for _ in range(3):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _max_error(batches, samples):
+    position = np.concatenate([b[POSITION] for b in batches if POSITION in b])
+    status = np.concatenate([b[STATUS] for b in batches if STATUS in b])
+    values = {**POSITION.physical(position), **STATUS.physical(status)}
+    expected = np.array(samples)
+    return {name: float(np.abs(values[name] - expected[:, i]).max())
+            for i, name in enumerate(POSITION.fields + STATUS.fields[1:]) if name in FIELD_NAMES}
+
+
+def check_frame_by_frame(frames, lost=(75, 180)):
+    """Feed one frame per read: join mid-stream (deltas first) and lose frames, as the GCS sees the radio."""
+    decoder = CompressedDecoder()
+    stats = LinkStats()
+    kept = []
+    for i, frame in enumerate(frames[3:400], start=3):
+        if i in lost:
+            continue
+        batches = decoder.feed(frame)
+        for seq in decoder.received["seq"].tolist():  # as the GCS reader does: every frame that passed the CRC
+            stats.record(i / RATE_HZ, seq)
+        if batches:
+            kept.append(i)
+    # Nothing until the first keyframe, then everything except each lost frame's keyframe interval
+    print(f"frame by frame, joined at frame 3, lost {list(lost)}: {len(kept)} kept, {decoder.dropped} dropped, "
+          f"first kept {kept[0]}, link stats lost {stats.total_lost}")
+    assert kept[0] == 50 and 76 not in kept and 100 in kept and 181 not in kept and 200 in kept
+    assert decoder.frames == 397 - len(lost) and decoder.dropped + len(kept) == decoder.frames
+    assert stats.total_lost == len(lost)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else N_FRAMES
+    samples = _flight(n)
+    text, binary = text_stream(samples), binary_stream(samples)
+    t_encode, (compressed, frames) = _timed(compressed_stream, samples)
+    t_text, rows = _timed(decode_text, text)
+    t_bin, (_, bin_batches) = _timed(decode_stream, FrameDecoder, binary)
+    t_cmp, (decoder, cmp_batches) = _timed(decode_stream, CompressedDecoder, compressed)
+
+    sizes = np.array([len(f) for f in frames])
+    print(f"{n} samples at {RATE_HZ} Hz (GPS {GPS_HZ} Hz), all 15 GCS fields per sample")
+    print(f"{'format':<11} {'B/sample':>8} {'packets/s':>9} {'decode k/s':>10} {'samples/s at CSV airtime':>25}")
+    csv_bytes = len(text) / n
+    for name, stream, elapsed in (("csv", text, t_text), ("binary", binary, t_bin),
+                                  ("compressed", compressed, t_cmp)):
+        per_sample = len(stream) / n
+        print(f"{name:<11} {per_sample:8.1f} {RATE_HZ * per_sample / RADIO_PAYLOAD:9.1f} "
+              f"{n / elapsed / 1e3:10.1f} {RATE_HZ * csv_bytes / per_sample:25.0f}")
+    print(f"compressed frames: keyframe {sizes.max()} B, delta median {int(np.median(sizes))} B, "
+          f"{np.mean(sizes <= RADIO_PAYLOAD):.1%} fit one {RADIO_PAYLOAD} B packet; "
+          f"encode {n / t_encode / 1e3:.1f} k samples/s")
+    print(f"rate gain vs csv {len(text) / len(compressed):.1f}x, vs binary {len(binary) / len(compressed):.1f}x")
+    print("max error: " + ", ".join(f"{k} {v:.1e}" for k, v in _max_error(cmp_batches, samples).items()))
+
+    # A corrupted byte costs that frame and the deltas up to the next keyframe
+    corrupt = bytearray(compressed)
+    corrupt[len(b"".join(frames[:3])) + 4] ^= 0x40
+    decoder = CompressedDecoder()
+    kept = len(decoder.feed(bytes(corrupt))[POSITION])
+    print(f"one corrupted byte: {kept} of {n} frames kept, {decoder.crc_errors + decoder.framing_errors} "
+          f"rejected, {decoder.dropped} dropped until the next keyframe")
+    assert len(rows) == n and decoder.dropped < 50
+    assert sum(len(b[POSITION]) for b in cmp_batches if POSITION in b) == n
+    assert len(bin_batches) and len(compressed) * 2 <= len(text)
+    check_frame_by_frame(frames)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import socket
+import struct
+import sys
+import threading
+import time
+import numpy as np
+from telemetry_hub import FixedFrameDecoder, TelemetryHub
+
+HOST = "127.0.0.1"
+TELEM_LEN = 13
+N_FRAMES = 200_000
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def _connect(port, timeout=5.0):
+    """The hub binds its servers asynchronously after start(); retry like Simulink does."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return socket.create_connection((HOST, port))
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.01)
+
+
+def _simulink(port, n, chunk=37):
+    """Stand-in for the Simulink client: n '>13d' frames written in odd-sized pieces."""
+    frames = np.zeros((n, TELEM_LEN))
+    frames[:, 0] = np.arange(n) * 0.001
+    frames[:, 3] = np.sin(np.arange(n) * 0.01)
+    data = frames.astype(">f8").tobytes()
+    sock = _connect(port)
+    step = chunk * 8 * TELEM_LEN + 5  # never frame-aligned, so frames straddle reads
+    for k in range(0, len(data), step):
+        sock.sendall(data[k:k + step])
+    sock.close()
+
+
+def check_bind_failure(timeout=5.0):
+    """A server source whose port is taken reports the error and a link-down event instead of dying silently."""
+    with socket.socket() as taken:
+        taken.bind((HOST, 0))
+        taken.listen()
+        port = taken.getsockname()[1]
+        hub = TelemetryHub()
+        sitl = hub.add_tcp_server("sitl", HOST, port, FixedFrameDecoder(">13d", "sitl"))
+        cmd = hub.add_command_server("sitl_cmd", HOST, port, lambda: b"", rate_hz=50)
+        links = hub.subscribe(topics={"link"})
+        hub.start()
+        events = []
+        deadline = time.monotonic() + timeout
+        while len(events) < 2 and time.monotonic() < deadline:
+            events.extend((p.source, p.payload) for p in links.drain())
+            time.sleep(0.01)
+        hub.stop()
+    print(f"port {port} already bound: link events {sorted(events)}, errors {sitl.last_error!r}, {cmd.last_error!r}")
+    assert sorted(events) == [("sitl", False), ("sitl_cmd", False)]
+    assert sitl.last_error and cmd.last_error
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else N_FRAMES
+    port, cmd_port = _free_port(), _free_port()
+    hub = TelemetryHub()
+    hub.add_tcp_server("sitl", HOST, port, FixedFrameDecoder(">13d", "sitl"))
+    hub.add_command_server("sitl_cmd", HOST, cmd_port, lambda: struct.pack(">2d", 1.0, 2.5), rate_hz=50)
+
+    plots = [hub.subscribe(maxlen=100_000, topics={"sitl"}) for _ in range(3)]
+    slow = hub.subscribe(maxlen=8, topics={"sitl"})       # a consumer that never keeps up
+    links = hub.subscribe(topics={"link"})
+    counted = {"frames": 0}
+
+    async def mission_controller(sub):
+        while True:
+            packet = await sub.get()
+            counted["frames"] += len(packet.payload)
+
+    hub.start()
+    hub.spawn(mission_controller(hub.subscribe(maxlen=100_000, topics={"sitl"})))
+
+    commands = _connect(cmd_port)
+    start = time.perf_counter()
+    sender = threading.Thread(target=_simulink, args=(port, n))
+    sender.start()
+    got = [[] for _ in plots]
+    while counted["frames"] < n and time.perf_counter() - start < 30:
+        for sub, out in zip(plots, got):
+            out.extend(p.payload for p in sub.drain())
+        time.sleep(0.01)  # a 100 Hz UI timer
+        for _ in slow.drain()[:1]:
+            time.sleep(0.05)  # a consumer stuck in a slow redraw
+    elapsed = time.perf_counter() - start
+    sender.join()
+    for sub, out in zip(plots, got):
+        out.extend(p.payload for p in sub.drain())
+    received = commands.recv(4096)
+    commands.close()
+    hub.stop()
+
+    arrays = [np.concatenate(out) for out in got]
+    in_order = all(len(a) == n and np.array_equal(a[:, 0], np.arange(n) * 0.001) for a in arrays)
+    batches = sum(len(out) for out in got) // len(got)
+    print(f"{n} frames through the hub in {elapsed:.2f} s ({n / elapsed / 1e3:.0f} k frames/s)")
+    print(f"{batches} decoded batches ({n / batches:.1f} frames each), "
+          f"fan-out to {len(plots) + 2} data subscribers, all frames in order: {in_order}")
+    print(f"async subscriber saw {counted['frames']} frames; slow subscriber dropped {slow.dropped} "
+          f"of {slow.delivered} packets without stalling the others")
+    print(f"link events: {[(p.source, p.payload) for p in links.drain()]}; "
+          f"command bytes received: {len(received)}")
+    if not in_order:
+        sys.exit(1)
+    check_bind_failure()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Full-duplex command/response link over one serial port.
+
+A TX worker writes commands as soon as the in-flight window allows and an
+RX worker reads responses as they arrive; the two never wait for each
+other, so several commands can be on the air at once and the command rate
+is bounded by the link, not by the round trip.
+
+    link = DuplexLink(serial.Serial(port, 115200, timeout=0.02), protocol="binary",
+                      on_response=lambda seq, values, rtt: ...)
+    link.start()
+    link.submit((roll, pitch, yaw))      # never blocks; the newest commands win
+    ...
+    link.stop()
+
+Protocols:
+
+    "binary"  RPY_COMMAND frames out, ATTITUDE_PAIR frames back; the
+              responder echoes the command's seq, which matches responses
+              to commands even when some are lost.
+    "text"    "r,p,y\\n" out and "cr,cp,cy,dr,dp,dy\\n" back, as gcs.ino
+              speaks today; with no seq on the wire, responses are matched
+              to the oldest outstanding command (the link keeps order).
+
+Commands without a response after `timeout` seconds are counted as lost
+and free their window slot. RTTs are kept for the last RTT_HISTORY
+responses; stats() summarises them.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+import numpy as np
+from telemetry_codec import ATTITUDE_PAIR, RPY_COMMAND, FrameDecoder, encode
+
+RTT_HISTORY = 1000
+SEQ_MODULO = 256  # seq is one byte on the wire
+
+
+class DuplexLink:
+    def __init__(self, ser, protocol="binary", max_in_flight=32, timeout=0.5, tx_queue=4,
+                 on_response=None, on_timeout=None, clock=time.perf_counter):
+        if protocol not in ("binary", "text"):
+            raise ValueError(f"Unknown link protocol: {protocol}")
+        if not 0 < max_in_flight < SEQ_MODULO:
+            raise ValueError("max_in_flight must be between 1 and 255")
+        self.ser = ser
+        self.protocol = protocol
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.on_response = on_response
+        self.on_timeout = on_timeout
+        self.clock = clock
+
+        self._queue = deque(maxlen=tx_queue)  # pending commands; the oldest is dropped when full
+        self._pending = OrderedDict()          # seq -> send time, oldest first
+        self._cond = threading.Condition()
+        self._running = False
+        self._threads = []
+        self._seq = 0
+        self._decoder = FrameDecoder()
+        self._text = b""
+
+        self.sent = 0
+        self.received = 0
+        self.lost = 0
+        self.superseded = 0   # commands replaced in the TX queue by newer ones
+        self.unmatched = 0    # responses with no outstanding command
+        self.rtts = deque(maxlen=RTT_HISTORY)
+        self.error = None
+
+    # --- API ---
+    def start(self):
+        self._running = True
+        self._threads = [threading.Thread(target=self._tx_loop, name="link-tx", daemon=True),
+                         threading.Thread(target=self._rx_loop, name="link-rx", daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, command):
+        """Queue a (roll, pitch, yaw) command; returns immediately."""
+        with self._cond:
+            if len(self._queue) == self._queue.maxlen:
+                self.superseded += 1
+            self._queue.append(command)
+            self._cond.notify_all()
+
+    @property
+    def in_flight(self):
+        return len(self._pending)
+
+    def stats(self):
+        rtt = np.asarray(self.rtts) * 1000.0
+        summary = {"sent": self.sent, "received": self.received, "lost": self.lost,
+                   "superseded": self.superseded, "unmatched": self.unmatched, "in_flight": self.in_flight}
+        if len(rtt):
+            summary.update(rtt_mean_ms=float(rtt.mean()), rtt_p95_ms=float(np.percentile(rtt, 95)),
+                           rtt_max_ms=float(rtt.max()))
+        return summary
+
+    # --- workers ---
+    def _tx_loop(self):
+        try:
+            while True:
+                with self._cond:
+                    while self._running and (not self._queue or len(self._pending) >= self.max_in_flight):
+                        self._cond.wait(self.timeout / 4)
+                        self._expire()
+                    if not self._running:
+                        return
+                    command = self._queue.popleft()
+                    seq = self._seq
+                    self._seq = (seq + 1) % SEQ_MODULO
+                    self._pending[seq] = self.clock()
+                if self.protocol == "binary":
+                    data = encode(RPY_COMMAND, command, seq)
+                else:
+                    data = (",".join(f"{v:g}" for v in command) + "\n").encode()
+                self.ser.write(data)
+                self.sent += 1
+        except Exception as e:
+            self._fail(e)
+
+    def _rx_loop(self):
+        try:
+            while self._running:
+                data = self.ser.read(max(1, self.ser.in_waiting))  # the port's timeout bounds the wait
+                now = self.clock()
+                if data:
+                    for seq, values in self._responses(data):
+                        self._complete(seq, values, now)
+                with self._cond:
+                    self._expire()
+        except Exception as e:
+            self._fail(e)
+
+    def _responses(self, data):
+        if self.protocol == "binary":
+            records = self._decoder.feed(data).get(ATTITUDE_PAIR)
+            if records is None:
+                return []
+            values = ATTITUDE_PAIR.physical(records)
+            columns = [values[f].tolist() for f in ATTITUDE_PAIR.fields[1:]]
+            return list(zip(records["seq"].tolist(), zip(*columns)))
+        *lines, self._text = (self._text + data).split(b"\n")
+        out = []
+        for line in lines:
+            parts = line.decode("utf-8", errors="replace").strip().split(",")
+            if len(parts) != 6:
+                continue
+            try:
+                out.append((None, tuple(float(p) for p in parts)))
+            except ValueError:
+                continue
+        return out
+
+    def _complete(self, seq, values, now):
+        with self._cond:
+            if seq is None:  # text: the oldest outstanding command
+                sent_at = self._pending.popitem(last=False)[1] if self._pending else None
+            else:
+                sent_at = self._pending.pop(seq, None)
+            self._cond.notify_all()
+        if sent_at is None:
+            self.unmatched += 1
+            return
+        rtt = now - sent_at
+        self.received += 1
+        self.rtts.append(rtt)
+        if self.on_response is not None:
+            self.on_response(seq, values, rtt)
+
+    def _expire(self):
+        """Drop commands older than timeout (caller holds the condition)."""
+        deadline = self.clock() - self.timeout
+        while self._pending:
+            seq, sent_at = next(iter(self._pending.items()))
+            if sent_at > deadline:
+                break
+            del self._pending[seq]
+            self.lost += 1
+            self._cond.notify_all()
+            if self.on_timeout is not None:
+                self.on_timeout(seq)
+
+    def _fail(self, error):
+        self.error = error
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
@@ -0,0 +1,232 @@
+"""
+Streaming link-quality statistics for the telemetry radio.
+
+record() costs O(1) per packet: it updates per-stream sequence tracking,
+an RFC 3550 style jitter estimate and the current one-second bucket (a
+fixed log-spaced latency histogram included). summary() sums the last 1,
+10 and 60 completed buckets, so publishing rolling windows never touches
+individual packets. Call both from the same thread (the reader's).
+
+    stats = LinkStats()
+    stats.record(t_rx, seq=record_seq, stream=msg.type_id, t_tx=t_ms / 1000.0)
+    stats.summary()   # {1: {...}, 10: {...}, 60: {...}}
+
+Sequence numbers are one byte and count per stream (message type). A
+forward gap counts as lost packets; a packet up to REORDER_WINDOW behind
+the newest seq, arriving within REORDER_TIMEOUT of the previous one, is
+reordered (and takes back one packet counted lost); an exact repeat is a
+duplicate. Anything after a longer silence is a forward gap, and when the
+silence spans more packets than the seq can count (at the stream's
+measured packet interval) the wrapped cycles are counted lost too.
+
+Latency: with `t_tx` (sender clock) the one-way delay is measured relative
+to the smallest delay seen on that stream, because the two clocks are not
+synchronised; a known latency (e.g. an RTT from DuplexLink) can be passed
+directly. Jitter is the smoothed variation of the transit time.
+"""
+import math
+import time
+import numpy as np
+
+WINDOWS = (1, 10, 60)
+HISTORY = max(WINDOWS) + 1  # one-second buckets kept: the windows plus the one being filled
+SEQ_MODULO = 256
+REORDER_WINDOW = 16     # how far behind the newest seq a packet may arrive and count as reordered
+REORDER_TIMEOUT = 0.25  # s; after a longer silence any seq is a forward gap
+
+# Latency histogram: 0 .. 0.5 ms, then 31 bins growing by 1.35x up to ~5.5 s, last bin open-ended
+LATENCY_BINS = 32
+LATENCY_FIRST_MS = 0.5
+LATENCY_GROWTH = 1.35
+LATENCY_EDGES_MS = LATENCY_FIRST_MS * LATENCY_GROWTH ** np.arange(LATENCY_BINS)  # upper edges
+_LOG_GROWTH = math.log(LATENCY_GROWTH)
+
+# Bucket columns
+RECEIVED, LOST, REORDERED, DUPLICATES, BYTES, JITTER_SUM, JITTER_N = range(7)
+_COLUMNS = 7
+
+# Health thresholds applied to the 1 s window
+DEGRADED_LOSS = 0.10      # fraction
+DEGRADED_RATE = 0.5       # of the 60 s rate
+DEGRADED_JITTER_MS = 50.0
+
+
+class _Stream:
+    __slots__ = ("last_seq", "first_rx", "last_rx", "advanced", "unfilled", "last_transit", "min_transit",
+                 "jitter")
+
+    def __init__(self):
+        self.last_seq = None
+        self.first_rx = None
+        self.last_rx = None
+        self.advanced = 0    # seq steps since first_rx (received + lost), for the mean packet interval
+        self.unfilled = 0    # recently counted lost that a reordered packet may still fill
+        self.last_transit = None
+        self.min_transit = None
+        self.jitter = 0.0
+
+
+class LinkStats:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.buckets = np.zeros((HISTORY, _COLUMNS))
+        self.hist = np.zeros((HISTORY, LATENCY_BINS), dtype=np.int64)
+        # The bucket being filled lives in plain lists (cheaper per packet than NumPy scalars)
+        self._cur = [0.0] * _COLUMNS
+        self._cur_hist = [0] * LATENCY_BINS
+        self.streams = {}
+        self.start = None
+        self.second = None  # absolute second of the current bucket
+        self.total_received = 0
+        self.total_lost = 0
+
+    def reset(self):
+        self.__init__(self.clock)
+
+    def _flush(self):
+        i = self.second % HISTORY
+        self.buckets[i] = self._cur
+        self.hist[i] = self._cur_hist
+
+    def _advance(self, t):
+        """Make the bucket for time t current (a later t only; earlier times stay in the current one)."""
+        second = int(t)
+        if self.second is None:
+            self.start = t
+            self.second = second
+        elif second > self.second:
+            self._flush()
+            for s in range(self.second + 1, min(second, self.second + HISTORY) + 1):
+                i = s % HISTORY
+                self.buckets[i] = 0.0
+                self.hist[i] = 0
+            self.second = second
+            self._cur = [0.0] * _COLUMNS
+            self._cur_hist = [0] * LATENCY_BINS
+
+    def record(self, t_rx, seq=None, stream=0, t_tx=None, latency=None, size=0):
+        """Account one received packet (times in seconds)."""
+        if self.second is None or t_rx >= self.second + 1:
+            self._advance(t_rx)
+        bucket = self._cur
+        bucket[RECEIVED] += 1
+        bucket[BYTES] += size
+        self.total_received += 1
+
+        s = self.streams.get(stream)
+        if s is None:
+            s = self.streams[stream] = _Stream()
+
+        if seq is not None:
+            if s.last_seq is not None:
+                silence = t_rx - s.last_rx
+                recent = silence < REORDER_TIMEOUT
+                gap = (seq - s.last_seq) % SEQ_MODULO
+                if gap == 0 and recent:
+                    bucket[DUPLICATES] += 1
+                elif SEQ_MODULO - gap <= REORDER_WINDOW and recent:
+                    bucket[REORDERED] += 1
+                    if s.unfilled:  # it was counted lost when the gap opened
+                        s.unfilled -= 1
+                        bucket[LOST] -= 1
+                        self.total_lost -= 1
+                else:
+                    lost = (gap or SEQ_MODULO) - 1
+                    if not recent and s.advanced and s.last_rx > s.first_rx:
+                        # Packets the silence should have held at the mean interval so far
+                        interval = (s.last_rx - s.first_rx) / s.advanced
+                        lost += max(round((silence / interval - lost - 1) / SEQ_MODULO), 0) * SEQ_MODULO
+                    s.advanced += lost + 1
+                    if lost:
+                        bucket[LOST] += lost
+                        self.total_lost += lost
+                        s.unfilled = min(s.unfilled + lost, REORDER_WINDOW)
+                    s.last_seq = seq
+            else:
+                s.last_seq = seq
+                s.first_rx = t_rx
+            s.last_rx = t_rx
+
+        if t_tx is not None:
+            transit = t_rx - t_tx
+            if s.last_transit is not None:
+                s.jitter += (abs(transit - s.last_transit) - s.jitter) / 16.0
+                bucket[JITTER_SUM] += s.jitter
+                bucket[JITTER_N] += 1
+            s.last_transit = transit
+            if s.min_transit is None or transit < s.min_transit:
+                s.min_transit = transit
+            if latency is None:
+                latency = transit - s.min_transit
+
+        if latency is not None:
+            ms = latency * 1000.0
+            i = 0 if ms <= LATENCY_FIRST_MS else int(math.log(ms / LATENCY_FIRST_MS) / _LOG_GROWTH) + 1
+            self._cur_hist[i if i < LATENCY_BINS else LATENCY_BINS - 1] += 1
+
+    def record_batch(self, records, t_rx, stream, size=0):
+        """Every record of a telemetry_codec batch (seq, and t_ms when present and >= 0), received at t_rx."""
+        seqs = records["seq"].tolist()
+        per_record = size / len(seqs) if seqs else 0
+        if "t_ms" in records.dtype.names:
+            for seq, t_ms in zip(seqs, records["t_ms"].tolist()):
+                self.record(t_rx, seq, stream, t_ms / 1000.0 if t_ms >= 0 else None, size=per_record)
+        else:
+            for seq in seqs:
+                self.record(t_rx, seq, stream, size=per_record)
+
+    def _window(self, seconds, now):
+        if self.second is None:
+            return None
+        self._advance(now)
+        self._flush()
+        current = self.second % HISTORY
+        complete = self.second - int(self.start)  # whole seconds since the first packet
+        if complete:
+            n = min(seconds, complete)
+            idx = [(current - k) % HISTORY for k in range(1, n + 1)]
+            span = float(n)
+        else:  # nothing completed yet: use the partial first second
+            idx = [current]
+            span = max(now - self.start, 1e-3)
+        totals = self.buckets[idx].sum(axis=0)
+        hist = self.hist[idx].sum(axis=0)
+        received, lost = totals[RECEIVED], max(totals[LOST], 0.0)
+        expected = received + lost
+        out = {
+            "rate": received / span,
+            "received": int(received),
+            "lost": int(lost),
+            "loss": lost / expected if expected else 0.0,
+            "reordered": int(totals[REORDERED]),
+            "duplicates": int(totals[DUPLICATES]),
+            "bytes_per_s": totals[BYTES] / span,
+            "jitter_ms": totals[JITTER_SUM] / totals[JITTER_N] * 1000.0 if totals[JITTER_N] else None,
+            "latency_hist": hist
+        }
+        count = hist.sum()
+        for name, q in (("latency_p50_ms", 0.5), ("latency_p95_ms", 0.95), ("latency_p99_ms", 0.99)):
+            out[name] = float(LATENCY_EDGES_MS[np.searchsorted(np.cumsum(hist), q * count)]) if count else None
+        return out
+
+    def summary(self, now=None):
+        """{window seconds: statistics} for WINDOWS, plus "degraded" (list of reasons, empty when fine)."""
+        now = self.clock() if now is None else now
+        result = {w: self._window(w, now) for w in WINDOWS}
+        result["degraded"] = degraded(result)
+        return result
+
+
+def degraded(summary):
+    """Reasons the 1 s window looks worse than the link normally does."""
+    short, long = summary.get(1), summary.get(60)
+    if short is None:
+        return []
+    reasons = []
+    if short["loss"] > DEGRADED_LOSS:
+        reasons.append(f"loss {short['loss']:.0%}")
+    if long is not None and long["rate"] > 0 and short["rate"] < DEGRADED_RATE * long["rate"]:
+        reasons.append(f"rate {short['rate']:.0f}/s vs {long['rate']:.0f}/s")
+    if short["jitter_ms"] is not None and short["jitter_ms"] > DEGRADED_JITTER_MS:
+        reasons.append(f"jitter {short['jitter_ms']:.0f} ms")
+    return reasons
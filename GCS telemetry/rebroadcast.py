@@ -0,0 +1,342 @@
+"""
+Local telemetry rebroadcast: one process owns the vehicle link, every GCS
+tool on the machine attaches over localhost UDP.
+
+    python rebroadcast.py serve COM5 --baud 115200 --protocol csv
+    python rebroadcast.py log flight          # flight_position.csv, flight_status.csv, ...
+
+The service runs a TelemetryHub with the vehicle link as its only source
+and a RebroadcastServer as a subscriber. Tools subscribe by sending
+
+    b"SUB " + JSON {"rate_hz": 20, "topics": ["position", "status"]}
+
+to the service port and repeating it every KEEPALIVE seconds; a
+subscriber silent for SUBSCRIBER_TIMEOUT seconds is forgotten, b"BYE"
+leaves at once. A new subscriber first gets a snapshot (the newest frame
+of every message type seen so far), then the live stream as
+telemetry_codec frames, several per datagram. rate_hz limits how often
+each message type is forwarded to that subscriber (the newest record is
+sent, older ones are skipped); 0 forwards every record.
+
+Tools that command the vehicle send b"CMD " + frame bytes to the same
+port; the service writes them on the vehicle link unchanged. Command-only
+tools need no subscription.
+
+The link can also be a TCP port a simulated vehicle connects to
+("tcp:PORT"), which is how bench_rebroadcast.py tests it on loopback.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import socket
+import time
+import numpy as np
+from telemetry_codec import (
+    MESSAGES_BY_NAME, POSITION, STATUS, FLIGHT_MODE_NAMES, ARMED_NAMES, HEALTH_NAMES,
+    FrameDecoder, encode_records
+)
+from telemetry_hub import BinaryDecoder, Source, TelemetryHub
+
+REBROADCAST_HOST = "127.0.0.1"
+REBROADCAST_PORT = 14650
+KEEPALIVE = 1.0
+SUBSCRIBER_TIMEOUT = 5.0
+MAX_DATAGRAM = 8192
+
+
+# -------------------------------
+# CSV link -> codec records
+# -------------------------------
+class CsvDecoder:
+    """
+    The Quadrotor GCS text line (roll,pitch,yaw,lat,lon,alt,flight_mode,
+    armed,imu,gps,battery,m1..m4) as POSITION and STATUS records, so text
+    links are rebroadcast in the same binary form as binary ones.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.start = clock()
+        self.seq = 0
+        self.rejected = 0
+        self._pending = b""
+        self._modes = {name.lower(): code for code, name in FLIGHT_MODE_NAMES.items()}
+        self._armed = {name.lower(): code for code, name in ARMED_NAMES.items()}
+        self._health = {name.lower(): code for code, name in HEALTH_NAMES.items()}
+
+    def _status(self, table, value):
+        value = value.strip().lower()
+        return table.get(value, 1 if value in ("1", "true", "yes") else 0)
+
+    def feed(self, data):
+        *lines, self._pending = (self._pending + data).split(b"\n")
+        t_ms = int((self.clock() - self.start) * 1000)
+        position, status = [], []
+        for raw in lines:
+            parts = raw.decode("utf-8", errors="replace").strip().split(",")
+            if len(parts) < 6:
+                if parts != [""]:
+                    self.rejected += 1
+                continue
+            try:
+                values = [float(p) for p in parts[:6]]
+                position.append(POSITION.pack([t_ms] + values, self.seq))
+                if len(parts) >= 15:
+                    mode = parts[6].strip()
+                    status.append(STATUS.pack(
+                        [t_ms, self._modes.get(mode.lower(), int(mode) if mode.isdigit() else 0),
+                         self._status(self._armed, parts[7]), self._status(self._health, parts[8]),
+                         self._status(self._health, parts[9]), float(parts[10])] +
+                        [float(p) for p in parts[11:15]], self.seq))
+            except ValueError:
+                self.rejected += 1
+                continue
+            self.seq += 1
+        batches = []
+        for message, bodies in ((POSITION, position), (STATUS, status)):
+            if bodies:
+                batches.append((message.name, np.frombuffer(b"".join(bodies), dtype=message.dtype)))
+        return batches
+
+
+# -------------------------------
+# Service
+# -------------------------------
+class _Subscriber:
+    def __init__(self, addr):
+        self.addr = addr
+        self.interval = 0.0
+        self.topics = None
+        self.last_seen = 0.0
+        self.last_sent = {}
+        self.sent = 0
+        self.skipped = 0
+
+
+class _ControlProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+
+    def connection_made(self, transport):
+        self.server.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.server._control(data, addr)
+
+    def error_received(self, exc):
+        pass  # ICMP port unreachable from a subscriber that went away; it times out
+
+
+class RebroadcastServer(Source):
+    """Hub subscriber that forwards codec messages to UDP subscribers; add with hub.add_source()."""
+
+    def __init__(self, name="rebroadcast", host=REBROADCAST_HOST, port=REBROADCAST_PORT, uplink=None,
+                 clock=time.monotonic):
+        super().__init__(name, None)
+        self.host = host
+        self.port = port
+        self.uplink = uplink  # source name CMD datagrams are written to
+        self.clock = clock
+        self.subscribers = {}
+        self.snapshot = {}
+        self.datagrams_sent = 0
+        self.commands_forwarded = 0
+        self._last_expiry = 0.0
+
+    def _control(self, data, addr):
+        now = self.clock()
+        if data.startswith(b"CMD "):
+            if self.uplink is not None and self.hub.sources[self.uplink].write(data[4:]):
+                self.commands_forwarded += 1
+            return
+        if data.startswith(b"BYE"):
+            self.subscribers.pop(addr, None)
+            return
+        if not data.startswith(b"SUB"):
+            return
+        try:
+            request = json.loads(data[3:].decode() or "{}")
+        except ValueError:
+            return
+        sub = self.subscribers.get(addr)
+        joined = sub is None
+        if joined:
+            sub = self.subscribers[addr] = _Subscriber(addr)
+        rate = float(request.get("rate_hz") or 0.0)
+        sub.interval = 1.0 / rate if rate > 0 else 0.0
+        topics = request.get("topics")
+        sub.topics = frozenset(topics) if topics else None
+        sub.last_seen = now
+        if joined:
+            late_join = b"".join(frame for topic, frame in self.snapshot.items()
+                                 if sub.topics is None or topic in sub.topics)
+            if late_join:
+                self._sendto(late_join, sub)
+
+    def _sendto(self, data, sub):
+        if self.transport is None:
+            return
+        while len(data) > MAX_DATAGRAM:
+            cut = data.rfind(b"\x00", 0, MAX_DATAGRAM) + 1  # whole frames only
+            self.transport.sendto(data[:cut], sub.addr)
+            self.datagrams_sent += 1
+            data = data[cut:]
+        self.transport.sendto(data, sub.addr)
+        self.datagrams_sent += 1
+        sub.sent += 1
+
+    def _forward(self, packet):
+        if packet.topic not in MESSAGES_BY_NAME or not len(packet.payload):
+            return
+        now = self.clock()
+        records = packet.payload
+        latest = encode_records(records[-1:])
+        self.snapshot[packet.topic] = latest
+        every = None
+        for sub in tuple(self.subscribers.values()):
+            if sub.topics is not None and packet.topic not in sub.topics:
+                continue
+            if sub.interval:
+                if now - sub.last_sent.get(packet.topic, -1e9) < sub.interval:
+                    sub.skipped += len(records)
+                    continue
+                sub.last_sent[packet.topic] = now
+                sub.skipped += len(records) - 1
+                self._sendto(latest, sub)
+            else:
+                if every is None:
+                    every = encode_records(records)
+                self._sendto(every, sub)
+        if now - self._last_expiry >= KEEPALIVE:
+            self._last_expiry = now
+            for addr, sub in tuple(self.subscribers.items()):
+                if now - sub.last_seen > SUBSCRIBER_TIMEOUT:
+                    del self.subscribers[addr]
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _ControlProtocol(self), local_addr=(self.host, self.port))
+        feed = self.hub.subscribe(maxlen=4096, topics=set(MESSAGES_BY_NAME))
+        try:
+            while True:
+                self._forward(await feed.get())
+        finally:
+            feed.close()
+            transport.close()
+            self.transport = None
+
+
+# -------------------------------
+# Client
+# -------------------------------
+class RebroadcastClient:
+    """
+    Blocking UDP subscriber for tools with their own reader thread.
+    receive() returns a FrameDecoder batch ({} after `timeout` without data)
+    and keeps the subscription alive; send() passes bytes to the vehicle.
+    """
+
+    def __init__(self, host=REBROADCAST_HOST, port=REBROADCAST_PORT, rate_hz=0, topics=None, timeout=0.05):
+        self.server = (host, port)
+        self.request = b"SUB " + json.dumps({"rate_hz": rate_hz, "topics": list(topics) if topics else None}).encode()
+        self.decoder = FrameDecoder()
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, 0))
+        self.sock.settimeout(timeout)
+        self._last_keepalive = None
+
+    def subscribe(self):
+        self.sock.sendto(self.request, self.server)
+        self._last_keepalive = time.monotonic()
+
+    def receive(self):
+        if self._last_keepalive is None or time.monotonic() - self._last_keepalive >= KEEPALIVE:
+            self.subscribe()
+        try:
+            data = self.sock.recv(65536)
+        except (socket.timeout, ConnectionResetError):  # Windows reports an absent service as a reset
+            return {}
+        return self.decoder.feed(data)
+
+    def send(self, data):
+        self.sock.sendto(b"CMD " + data, self.server)
+
+    def close(self):
+        try:
+            self.sock.sendto(b"BYE", self.server)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+# -------------------------------
+# Command line
+# -------------------------------
+def _decoder(protocol):
+    return CsvDecoder() if protocol == "csv" else BinaryDecoder()
+
+
+def serve(args):
+    hub = TelemetryHub()
+    if args.link.startswith("tcp:"):
+        hub.add_tcp_server("vehicle", REBROADCAST_HOST, int(args.link[4:]), _decoder(args.protocol))
+    else:
+        hub.add_serial("vehicle", args.link, args.baud, _decoder(args.protocol))
+    server = hub.add_source(RebroadcastServer(port=args.port, uplink="vehicle"))
+    hub.start()
+    print(f"Rebroadcasting {args.link} on udp://{REBROADCAST_HOST}:{args.port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(5.0)
+            print(f"{hub.published} batches in, {server.datagrams_sent} datagrams out, "
+                  f"{server.commands_forwarded} commands up, {len(server.subscribers)} subscribers")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        hub.stop()
+
+
+def log(args):
+    client = RebroadcastClient(port=args.port, rate_hz=args.rate)
+    files, writers = {}, {}
+    print(f"Logging udp://{REBROADCAST_HOST}:{args.port} to {args.prefix}_<message>.csv (Ctrl+C to stop)")
+    try:
+        while True:
+            for message, records in client.receive().items():
+                if message.name not in writers:
+                    files[message.name] = open(f"{args.prefix}_{message.name}.csv", "w", newline="")
+                    writers[message.name] = csv.writer(files[message.name])
+                    writers[message.name].writerow(("seq",) + message.fields)
+                values = message.physical(records)
+                columns = [records["seq"].tolist()] + [values[f].tolist() for f in message.fields]
+                writers[message.name].writerows(zip(*columns))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.close()
+        for f in files.values():
+            f.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Share one vehicle link with every GCS tool over localhost UDP")
+    commands = parser.add_subparsers(dest="command", required=True)
+    p = commands.add_parser("serve", help="own the link and rebroadcast it")
+    p.add_argument("link", help="serial port (COM5, /dev/ttyUSB0) or tcp:PORT for a simulated vehicle")
+    p.add_argument("--baud", type=int, default=115200)
+    p.add_argument("--protocol", choices=("binary", "csv"), default="binary")
+    p.add_argument("--port", type=int, default=REBROADCAST_PORT)
+    p.set_defaults(func=serve)
+    p = commands.add_parser("log", help="subscribe and write one CSV per message type")
+    p.add_argument("prefix")
+    p.add_argument("--port", type=int, default=REBROADCAST_PORT)
+    p.add_argument("--rate", type=float, default=0, help="max messages/s per type (0 = all)")
+    p.set_defaults(func=log)
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
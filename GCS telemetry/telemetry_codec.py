@@ -0,0 +1,246 @@
+"""
+Binary telemetry codec shared by the ground-station tools.
+
+Every message travels as one self-delimiting frame:
+
+    COBS( type:u8 | seq:u8 | payload | crc16:u16le ) 0x00
+
+COBS removes every zero byte from the frame body, so 0x00 only ever marks
+the end of a frame and a receiver that joins mid-stream resynchronises on
+the next delimiter. The CRC is CRC-16/CCITT-FALSE (poly 0x1021, init
+0xFFFF) over type, seq and payload, the same routine the firmware side
+computes. `seq` increments per message so receivers can count loss.
+
+Payloads are fixed little-endian `struct` layouts of scaled integers
+(angles in 0.01 deg, coordinates in 1e-7 deg, altitude in cm). COBS adds
+one byte per frame, so a payload of up to MAX_PAYLOAD bytes still fits a
+single 32-byte NRF24L01 packet together with the delimiter.
+
+Decoding is batched: FrameDecoder.feed() takes whatever bytes arrived,
+validates every complete frame and returns one NumPy structured array per
+message type, built with a single numpy.frombuffer over all frames of
+that type.
+
+    frame = encode(POSITION, (t_ms, roll, pitch, yaw, lat, lon, alt), seq)
+    decoder = FrameDecoder()
+    for msg, records in decoder.feed(chunk).items():
+        values = msg.physical(records)      # {"roll": float array, ...}
+"""
+import binascii
+import struct
+import numpy as np
+
+RADIO_PAYLOAD = 32   # NRF24L01 packet size
+HEADER_SIZE = 2      # type, seq
+CRC_SIZE = 2
+# COBS overhead (1 byte for bodies under 254 bytes) and the delimiter
+MAX_PAYLOAD = RADIO_PAYLOAD - HEADER_SIZE - CRC_SIZE - 2
+MAX_FRAME = 256      # longest encoded frame accepted before the buffer is dropped
+
+_NUMPY_CODES = {"B": "u1", "b": "i1", "H": "u2", "h": "i2", "I": "u4", "i": "i4"}
+_LIMITS = {code: (int(np.iinfo(dtype).min), int(np.iinfo(dtype).max))
+           for code, dtype in _NUMPY_CODES.items()}
+
+
+# -------------------------------
+# COBS / CRC
+# -------------------------------
+def cobs_encode(data):
+    out = bytearray()
+    for block in bytes(data).split(b"\x00"):
+        while len(block) >= 254:
+            out.append(0xFF)
+            out += block[:254]
+            block = block[254:]
+        out.append(len(block) + 1)
+        out += block
+    return bytes(out)
+
+
+def cobs_decode(frame):
+    """Inverse of cobs_encode for one frame without its delimiter; ValueError if malformed."""
+    n = len(frame)
+    if n and frame[0] == n:
+        return bytes(frame[1:])  # no zero bytes in the body: one block
+    out = bytearray()
+    i = 0
+    while i < n:
+        code = frame[i]
+        end = i + code
+        if code == 0 or end > n:
+            raise ValueError("malformed COBS frame")
+        out += frame[i + 1:end]
+        i = end
+        if code < 0xFF and i < n:
+            out.append(0)
+    return bytes(out)
+
+
+def crc16(data, crc=0xFFFF):
+    return binascii.crc_hqx(data, crc)
+
+
+# -------------------------------
+# Message definitions
+# -------------------------------
+class Message:
+    """
+    One message type: `fields` is a sequence of (name, struct code, scale);
+    a field is sent as round(value * scale).
+    """
+
+    def __init__(self, type_id, name, fields):
+        self.type_id = type_id
+        self.name = name
+        self.fields = tuple(f[0] for f in fields)
+        self.codes = tuple(f[1] for f in fields)
+        self.scales = tuple(float(f[2]) for f in fields)
+        self.struct = struct.Struct("<BB" + "".join(self.codes))
+        self.size = self.struct.size
+        if self.size - HEADER_SIZE > MAX_PAYLOAD:
+            raise ValueError(f"{name} payload does not fit one radio packet")
+        self.dtype = np.dtype([("type", "u1"), ("seq", "u1")] +
+                              [(f, "<" + _NUMPY_CODES[c]) for f, c in zip(self.fields, self.codes)])
+
+    def pack(self, values, seq=0):
+        """Header and payload, values in physical units (saturated to the field range)."""
+        ints = []
+        for value, code, scale in zip(values, self.codes, self.scales):
+            low, high = _LIMITS[code]
+            ints.append(min(max(int(round(value * scale)), low), high))
+        return self.struct.pack(self.type_id, seq & 0xFF, *ints)
+
+    def unpack(self, raw):
+        """(seq, values in physical units) of one header + payload."""
+        _, seq, *ints = self.struct.unpack(raw)
+        return seq, tuple(v / s for v, s in zip(ints, self.scales))
+
+    def physical(self, records):
+        """Field name -> float64 array in physical units for a decoded batch."""
+        return {name: records[name] / scale for name, scale in zip(self.fields, self.scales)}
+
+    def __repr__(self):
+        return f"Message({self.type_id:#04x}, {self.name})"
+
+
+CDEG = 100.0   # angles in 0.01 deg
+E7 = 1e7       # coordinates in 1e-7 deg
+
+ATTITUDE = Message(0x01, "attitude", (
+    ("t_ms", "I", 1), ("roll", "h", CDEG), ("pitch", "h", CDEG), ("yaw", "h", CDEG)
+))
+ATTITUDE_PAIR = Message(0x02, "attitude_pair", (
+    ("t_ms", "I", 1),
+    ("roll", "h", CDEG), ("pitch", "h", CDEG), ("yaw", "h", CDEG),
+    ("d_roll", "h", CDEG), ("d_pitch", "h", CDEG), ("d_yaw", "h", CDEG)
+))
+MOTOR_TEST = Message(0x03, "motor_test", (
+    ("t_ms", "I", 1), ("roll", "h", CDEG), ("pitch", "h", CDEG),
+    ("m1", "H", 1), ("m2", "H", 1), ("m3", "H", 1), ("m4", "H", 1)
+))
+POSITION = Message(0x04, "position", (
+    ("t_ms", "I", 1), ("roll", "h", CDEG), ("pitch", "h", CDEG), ("yaw", "h", CDEG),
+    ("lat", "i", E7), ("lon", "i", E7), ("alt", "i", 100.0)
+))
+STATUS = Message(0x05, "status", (
+    ("t_ms", "I", 1), ("flight_mode", "B", 1), ("armed", "B", 1), ("imu", "B", 1), ("gps", "B", 1),
+    ("battery", "H", 1000.0),
+    ("m1", "H", 1), ("m2", "H", 1), ("m3", "H", 1), ("m4", "H", 1)
+))
+RPY_COMMAND = Message(0x10, "rpy_command", (
+    ("roll", "h", CDEG), ("pitch", "h", CDEG), ("yaw", "h", CDEG)
+))
+
+MESSAGES = {m.type_id: m for m in (ATTITUDE, ATTITUDE_PAIR, MOTOR_TEST, POSITION, STATUS, RPY_COMMAND)}
+MESSAGES_BY_NAME = {m.name: m for m in MESSAGES.values()}
+
+# STATUS code tables; flight modes follow guidance.Mode in the flight controller
+FLIGHT_MODE_NAMES = {1: "Stabilize", 2: "AltHold", 3: "PosHold", 4: "Guided", 5: "Land", 6: "RTL"}
+ARMED_NAMES = {0: "DISARMED", 1: "ARMED"}
+HEALTH_NAMES = {0: "FAIL", 1: "OK"}
+
+
+# -------------------------------
+# Encoding / decoding
+# -------------------------------
+def encode(message, values, seq=0):
+    """One delimited frame ready to write to the link."""
+    raw = message.pack(values, seq)
+    return cobs_encode(raw + crc16(raw).to_bytes(2, "little")) + b"\x00"
+
+
+def encode_records(records):
+    """Frames for decoded records (a FrameDecoder batch or a slice of one), re-framed as they arrived."""
+    out = bytearray()
+    for raw in np.ascontiguousarray(records).view(np.uint8).reshape(len(records), -1):
+        raw = raw.tobytes()
+        out += cobs_encode(raw + crc16(raw).to_bytes(2, "little"))
+        out += b"\x00"
+    return bytes(out)
+
+
+def decode(frame):
+    """(message, seq, values) of one frame (with or without its delimiter); ValueError if invalid."""
+    raw = cobs_decode(frame.rstrip(b"\x00"))
+    if len(raw) < HEADER_SIZE + CRC_SIZE or crc16(raw[:-2]) != int.from_bytes(raw[-2:], "little"):
+        raise ValueError("bad CRC")
+    message = MESSAGES.get(raw[0])
+    if message is None or len(raw) - CRC_SIZE != message.size:
+        raise ValueError(f"unknown message type {raw[0]:#04x} or wrong length")
+    seq, values = message.unpack(raw[:-2])
+    return message, seq, values
+
+
+class FrameDecoder:
+    """
+    Incremental decoder for a byte stream. Partial frames are kept between
+    feed() calls; frames failing COBS, CRC, type or length checks are
+    dropped and counted.
+    """
+
+    def __init__(self, messages=MESSAGES):
+        self.messages = messages
+        self._pending = b""
+        self.frames = 0
+        self.crc_errors = 0
+        self.framing_errors = 0
+
+    def feed(self, data):
+        """Decode every complete frame in pending + data: {Message: structured array}."""
+        *frames, pending = (self._pending + data).split(b"\x00")
+        if len(pending) > MAX_FRAME:
+            self.framing_errors += 1  # no delimiter for too long: not our stream, resync
+            pending = b""
+        self._pending = pending
+        return self.decode_frames(frames)
+
+    def decode_frames(self, frames):
+        """Decode delimiter-free frames in one batch per message type."""
+        grouped = {}
+        messages = self.messages
+        for frame in frames:
+            if not frame:
+                continue
+            try:
+                raw = cobs_decode(frame)
+            except ValueError:
+                self.framing_errors += 1
+                continue
+            if len(raw) < HEADER_SIZE + CRC_SIZE or \
+                    binascii.crc_hqx(raw[:-2], 0xFFFF) != int.from_bytes(raw[-2:], "little"):
+                self.crc_errors += 1
+                continue
+            message = messages.get(raw[0])
+            if message is None or len(raw) - CRC_SIZE != message.size:
+                self.framing_errors += 1
+                continue
+            grouped.setdefault(message, []).append(raw[:-2])
+
+        batches = {}
+        for message, bodies in grouped.items():
+            self.frames += len(bodies)
+            batches[message] = np.frombuffer(b"".join(bodies), dtype=message.dtype)
+        return batches
+
+    def reset(self):
+        self._pending = b""
@@ -0,0 +1,298 @@
+"""
+Delta-compressed telemetry for the low-bandwidth radio link.
+
+The full GCS sample (POSITION and STATUS fields together) is sent as a
+stream of frames in the telemetry_codec framing
+
+    COBS( type:u8 | seq:u8 | varints | crc16:u16le ) 0x00
+
+where the varints are zig-zag encoded LEB128 integers of the quantized
+fields (round(value * scale), scales in FIELDS):
+
+    KEYFRAME  t_ms, then every field in FIELDS order, absolute
+    DELTA     mask, dt_ms, then the change of every field whose mask bit
+              is set, relative to the previous frame
+
+Between keyframes most fields move by a few quanta or not at all, so a
+delta frame is a fraction of the fixed binary frame and of the CSV line.
+FIELDS is ordered by how often a field changes so the usual mask fits in
+two varint bytes. `seq` counts every frame: after a gap the decoder drops
+delta frames until the next keyframe (sent every `keyframe_interval`
+frames), so a lost packet costs at most one keyframe interval.
+
+Frames are self-delimiting and are packed back to back into radio
+packets; a keyframe spans two 32-byte packets, a delta frame usually fits
+in one with room to spare.
+
+    encoder = DeltaEncoder()
+    link.write(encoder.encode(sample))      # sample in SAMPLE_FIELDS order
+
+    decoder = CompressedDecoder()
+    batches = decoder.feed(chunk)           # {POSITION: records, STATUS: records}
+
+Decoding is batched: CRC and COBS are checked per frame, then the varints
+of every frame in the batch are parsed, zig-zag decoded and integrated
+(segmented cumulative sum between keyframes) with whole-array NumPy
+operations. The output is one POSITION and one STATUS record per frame,
+the same structured arrays FrameDecoder returns.
+"""
+import numpy as np
+from telemetry_codec import (
+    CDEG, E7, HEADER_SIZE, CRC_SIZE, MAX_FRAME, POSITION, STATUS, cobs_decode, cobs_encode, crc16
+)
+
+KEYFRAME = 0x20
+DELTA = 0x21
+KEYFRAME_INTERVAL = 50  # frames between keyframes (0.5 s at 100 Hz)
+SEQ_MODULO = 256
+MAX_VARINT = 10         # bytes; enough for any int64
+
+# (name, scale): sent as round(value * scale). Most frequently changing first.
+FIELDS = (
+    ("roll", CDEG), ("pitch", CDEG), ("yaw", CDEG), ("alt", 100.0), ("lat", E7), ("lon", E7),
+    ("m1", 1), ("m2", 1), ("m3", 1), ("m4", 1), ("battery", 100.0),
+    ("flight_mode", 1), ("armed", 1), ("imu", 1), ("gps", 1)
+)
+FIELD_NAMES = tuple(name for name, _ in FIELDS)
+ALL_FIELDS = (1 << len(FIELDS)) - 1
+
+# Order of the values handed to DeltaEncoder.encode(): the CSV line's, with t_ms first
+SAMPLE_FIELDS = POSITION.fields + STATUS.fields[1:]
+_SAMPLE_INDEX = tuple(SAMPLE_FIELDS.index(name) for name in FIELD_NAMES)
+
+
+def field_scales(scales=None):
+    """FIELDS scales with per-field overrides ({name: scale}) applied."""
+    scales = scales or {}
+    unknown = set(scales) - set(FIELD_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown telemetry fields: {sorted(unknown)}")
+    return tuple(float(scales.get(name, scale)) for name, scale in FIELDS)
+
+
+def _varint(value, out):
+    """Append zig-zag LEB128 of a signed integer."""
+    value = (value << 1) ^ (value >> 63)
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+# -------------------------------
+# Encoder
+# -------------------------------
+class DeltaEncoder:
+    """
+    Sample-by-sample encoder (the vehicle side). It keeps the quantized
+    state the decoder will reconstruct, so rounding never accumulates.
+    """
+
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL, scales=None):
+        self.keyframe_interval = keyframe_interval
+        self.scales = field_scales(scales)
+        self.seq = 0
+        self._state = None
+        self._t_ms = None
+        self._since_keyframe = 0
+
+    def force_keyframe(self):
+        """Make the next frame a keyframe (e.g. after the link came back)."""
+        self._state = None
+
+    def quantize(self, sample):
+        return [int(round(sample[i] * scale)) for i, scale in zip(_SAMPLE_INDEX, self.scales)]
+
+    def encode(self, sample):
+        """One delimited frame for a sample in SAMPLE_FIELDS order (physical units)."""
+        t_ms = int(sample[0])
+        values = self.quantize(sample)
+        body = bytearray()
+        if self._state is None or self._since_keyframe >= self.keyframe_interval:
+            body += bytes((KEYFRAME, self.seq))
+            _varint(t_ms, body)
+            for value in values:
+                _varint(value, body)
+            self._since_keyframe = 0
+        else:
+            mask = 0
+            changes = []
+            for bit, (value, previous) in enumerate(zip(values, self._state)):
+                if value != previous:
+                    mask |= 1 << bit
+                    changes.append(value - previous)
+            body += bytes((DELTA, self.seq))
+            _varint(mask, body)
+            _varint(t_ms - self._t_ms, body)
+            for change in changes:
+                _varint(change, body)
+        self._since_keyframe += 1
+        self._state = values
+        self._t_ms = t_ms
+        self.seq = (self.seq + 1) % SEQ_MODULO
+        return cobs_encode(body + crc16(body).to_bytes(2, "little")) + b"\x00"
+
+
+# -------------------------------
+# Batch decoder
+# -------------------------------
+def decode_varints(buf):
+    """Every zig-zag varint in a uint8 array (which must end on a final byte) as int64."""
+    if not len(buf):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    ends = np.flatnonzero(buf < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    lengths = ends - starts + 1
+    if lengths.max() > MAX_VARINT:
+        raise ValueError("varint too long")
+    position = np.arange(len(buf)) - np.repeat(starts, lengths)
+    parts = (buf & 0x7F).astype(np.uint64) << (7 * position).astype(np.uint64)
+    raw = np.add.reduceat(parts, starts)
+    values = (raw >> np.uint64(1)).astype(np.int64) ^ -(raw & np.uint64(1)).astype(np.int64)
+    return values, starts
+
+
+class CompressedDecoder:
+    """
+    Incremental decoder for a compressed telemetry stream, a drop-in for
+    telemetry_codec.FrameDecoder where POSITION and STATUS batches are
+    expected. Frames failing COBS, CRC or layout checks are counted as
+    errors; valid delta frames that cannot be reconstructed because an
+    earlier frame was lost are counted in `dropped`.
+
+    `received` holds seq and t_ms of every frame of the last batch that
+    passed the CRC, rebuilt or not (t_ms is -1 for dropped frames), so
+    link statistics see what actually crossed the radio.
+    """
+
+    RECEIVED_DTYPE = np.dtype([("seq", "u1"), ("t_ms", "i8")])
+
+    def __init__(self, scales=None):
+        self.scales = np.array(field_scales(scales))
+        # quantized units -> the codec's POSITION/STATUS units
+        codec_scales = dict(zip(POSITION.fields + STATUS.fields, POSITION.scales + STATUS.scales))
+        self._to_codec = np.array([codec_scales[name] for name in FIELD_NAMES]) / self.scales
+        self._pending = b""
+        self._state = None   # last reconstructed row: t_ms, then FIELDS (quantized)
+        self._seq = None
+        self.frames = 0
+        self.crc_errors = 0
+        self.framing_errors = 0
+        self.dropped = 0
+        self.received = np.zeros(0, dtype=self.RECEIVED_DTYPE)
+
+    def feed(self, data):
+        """Decode every complete frame in pending + data: {POSITION: records, STATUS: records}."""
+        *frames, pending = (self._pending + data).split(b"\x00")
+        if len(pending) > MAX_FRAME:
+            self.framing_errors += 1
+            pending = b""
+        self._pending = pending
+        return self.decode_frames(frames)
+
+    def decode_frames(self, frames):
+        """Decode delimiter-free frames in one batch."""
+        types, seqs, bodies = [], [], []
+        for frame in frames:
+            if not frame:
+                continue
+            try:
+                raw = cobs_decode(frame)
+            except ValueError:
+                self.framing_errors += 1
+                continue
+            if len(raw) < HEADER_SIZE + CRC_SIZE + 1 or crc16(raw[:-2]) != int.from_bytes(raw[-2:], "little"):
+                self.crc_errors += 1
+                continue
+            if raw[0] not in (KEYFRAME, DELTA) or raw[-3] >= 0x80:  # payload must end on a final varint byte
+                self.framing_errors += 1
+                continue
+            types.append(raw[0])
+            seqs.append(raw[1])
+            bodies.append(raw[HEADER_SIZE:-CRC_SIZE])
+        self.received = np.zeros(len(seqs), dtype=self.RECEIVED_DTYPE)
+        if not bodies:
+            return {}
+        self.received["seq"] = seqs
+        self.received["t_ms"] = -1
+        rows, index = self._decode(np.array(types), np.array(seqs), bodies)
+        self.received["t_ms"][index] = rows[:, 0]
+        return self._records(rows, self.received["seq"][index]) if len(rows) else {}
+
+    def _decode(self, types, seqs, bodies):
+        """Reconstructed rows and the index (into bodies) of the frame each came from."""
+        n_fields = len(FIELDS)
+        values, starts = decode_varints(np.frombuffer(b"".join(bodies), dtype=np.uint8))
+        offsets = np.zeros(len(bodies), dtype=np.int64)
+        np.cumsum([len(b) for b in bodies[:-1]], out=offsets[1:])
+        first = np.searchsorted(starts, offsets)  # index of each frame's first varint
+        counts = np.diff(np.append(first, len(values)))
+
+        is_delta = types == DELTA
+        masks = np.where(is_delta, values[np.minimum(first, len(values) - 1)], ALL_FIELDS)
+        present = np.ones((len(bodies), n_fields + 1), dtype=bool)  # t_ms is always sent
+        present[:, 1:] = (masks[:, None] >> np.arange(n_fields)) & 1
+        bad = (counts != present.sum(axis=1) + is_delta) | (masks > ALL_FIELDS) | (masks < 0)
+        if bad.any():
+            self.framing_errors += int(bad.sum())
+            good = np.flatnonzero(~bad)
+            if not len(good):
+                return np.zeros((0, n_fields + 1), dtype=np.int64), good
+            rows, index = self._decode(types[good], seqs[good], [bodies[i] for i in good])
+            return rows, good[index]
+
+        keep = np.ones(len(values), dtype=bool)
+        keep[first[is_delta]] = False  # masks are not field values
+        changes = np.zeros(present.shape, dtype=np.int64)
+        changes[present] = values[keep]
+
+        # A row before the batch carries the state of the previous one
+        is_key = ~is_delta
+        if self._state is not None:
+            changes = np.vstack((self._state, changes))
+            is_key = np.concatenate(([True], is_key))
+        previous = np.concatenate(([-1 if self._seq is None else self._seq], seqs[:-1]))
+        broken = is_delta & ((seqs - previous) % SEQ_MODULO != 1)
+        if self._state is not None:
+            broken = np.concatenate(([False], broken))
+
+        # Integrate the deltas from each row's latest keyframe (segmented cumulative sum)
+        segment = np.cumsum(is_key)
+        keyframes = np.flatnonzero(is_key)
+        if len(keyframes):
+            start = np.where(segment > 0, keyframes[np.maximum(segment - 1, 0)], 0)
+        else:  # deltas with nothing to apply them to (joined mid-stream or after a loss): all invalid
+            start = np.zeros(len(segment), dtype=np.int64)
+        total = np.vstack((np.zeros(n_fields + 1, dtype=np.int64), np.cumsum(changes, axis=0)))
+        rows = total[1:] - total[start]
+        breaks = np.concatenate(([0], np.cumsum(broken)))
+        valid = (segment > 0) & (breaks[1:] == breaks[start])
+
+        if self._state is not None:
+            rows, valid = rows[1:], valid[1:]
+        self._state = rows[-1] if valid[-1] else None
+        self._seq = int(seqs[-1])
+        self.frames += len(bodies)
+        self.dropped += int((~valid).sum())
+        return rows[valid], np.flatnonzero(valid)
+
+    def _records(self, rows, seqs):
+        codec = np.round(rows[:, 1:] * self._to_codec)
+        columns = dict(zip(FIELD_NAMES, codec.T))
+        columns["t_ms"] = rows[:, 0]
+        batches = {}
+        for message in (POSITION, STATUS):
+            records = np.empty(len(rows), dtype=message.dtype)
+            records["type"] = message.type_id
+            records["seq"] = seqs
+            for name in message.fields:
+                records[name] = columns[name]
+            batches[message] = records
+        return batches
+
+    def reset(self):
+        self._pending = b""
+        self._state = None
+        self._seq = None
@@ -0,0 +1,460 @@
+"""
+asyncio telemetry hub: one event loop owns every link, decodes each frame
+once and fans the result out to any number of in-process subscribers.
+
+    hub = TelemetryHub()
+    hub.add_serial("radio", "COM5", 115200, BinaryDecoder())
+    hub.add_tcp_server("sitl", "127.0.0.1", 55001, FixedFrameDecoder(">13d", "sitl"))
+    hub.add_command_server("sitl_cmd", "127.0.0.1", 55000, make_command, rate_hz=10)
+    view = hub.subscribe(maxlen=512, topics={"position", "status"})
+    hub.start()                 # the loop runs in one background thread
+    ...
+    for packet in view.drain():  # from a Qt timer, or `await view.get()` in a hub coroutine
+        ...
+    hub.stop()
+
+Sources publish Packet(source, topic, payload, t) where payload is a whole
+batch: a structured array for binary frames, an (n, k) array for fixed
+SITL frames, a list for text lines. Sources also publish topic "link" with
+payload True / False when they connect or drop.
+
+Each subscription is a bounded deque: when a consumer falls behind the
+oldest packets are dropped (and counted) so a slow plot never stalls the
+link or the other subscribers. deque append / popleft are atomic, so a
+subscription can be drained from any thread; the optional notify callback
+runs on the hub thread after every delivery (e.g. a Qt signal emit).
+"""
+import asyncio
+import threading
+import time
+from collections import deque, namedtuple
+import numpy as np
+from telemetry_codec import FrameDecoder
+
+try:
+    import serial
+except ImportError:  # only needed for serial sources
+    serial = None
+try:
+    import serial_asyncio
+except ImportError:  # pyserial-asyncio is optional; serial ports are polled without it
+    serial_asyncio = None
+
+Packet = namedtuple("Packet", "source topic payload t")
+
+SERIAL_POLL_INTERVAL = 0.005  # s between non-blocking reads without pyserial-asyncio
+
+
+# -------------------------------
+# Decoders: bytes in, [(topic, payload batch)] out
+# -------------------------------
+class BinaryDecoder:
+    """telemetry_codec frames; one structured array per message type and chunk."""
+
+    def __init__(self):
+        self.frames = FrameDecoder()
+
+    def feed(self, data):
+        return [(message.name, records) for message, records in self.frames.feed(data).items()]
+
+
+class LineDecoder:
+    """Newline-terminated text; parse(line) may return None to reject a line."""
+
+    def __init__(self, parse=None, topic="text"):
+        self.parse = parse
+        self.topic = topic
+        self._pending = b""
+        self.rejected = 0
+
+    def feed(self, data):
+        *lines, self._pending = (self._pending + data).split(b"\n")
+        items = []
+        for raw in lines:
+            line = raw.decode("utf-8", errors="replace").strip()
+            if not line:
+                continue
+            item = line if self.parse is None else self.parse(line)
+            if item is None:
+                self.rejected += 1
+            else:
+                items.append(item)
+        return [(self.topic, items)] if items else []
+
+
+class FixedFrameDecoder:
+    """Back-to-back fixed-size numeric frames (e.g. ">13d" from Simulink) as an (n, fields) float64 array."""
+
+    def __init__(self, fmt, topic):
+        count, code = int(fmt[1:-1] or 1), fmt[0] + fmt[-1]
+        self.dtype = np.dtype(code)
+        self.fields = count
+        self.frame_bytes = count * self.dtype.itemsize
+        self.topic = topic
+        self._pending = b""
+
+    def feed(self, data):
+        buf = self._pending + data
+        whole = len(buf) - len(buf) % self.frame_bytes
+        self._pending = buf[whole:]
+        if not whole:
+            return []
+        frames = np.frombuffer(buf, dtype=self.dtype, count=whole // self.dtype.itemsize)
+        return [(self.topic, frames.reshape(-1, self.fields).astype(np.float64))]
+
+
+# -------------------------------
+# Subscriptions
+# -------------------------------
+class Subscription:
+    """Bounded per-consumer queue with drop-oldest backpressure."""
+
+    def __init__(self, hub, maxlen, topics, notify):
+        self.hub = hub
+        self.topics = None if topics is None else frozenset(topics)
+        self.notify = notify
+        self._queue = deque(maxlen=maxlen)
+        self._event = asyncio.Event()
+        self.delivered = 0
+        self.dropped = 0
+
+    def _push(self, packet):
+        queue = self._queue
+        if len(queue) == queue.maxlen:
+            self.dropped += 1
+        queue.append(packet)
+        self.delivered += 1
+        self._event.set()
+        if self.notify is not None:
+            self.notify()
+
+    async def get(self):
+        """Next packet; only from coroutines running on the hub loop."""
+        while not self._queue:
+            self._event.clear()
+            await self._event.wait()
+        return self._queue.popleft()
+
+    def drain(self):
+        """Every queued packet, oldest first; safe from any thread."""
+        out = []
+        queue = self._queue
+        while True:
+            try:
+                out.append(queue.popleft())
+            except IndexError:
+                return out
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+# -------------------------------
+# Sources
+# -------------------------------
+class _StreamProtocol(asyncio.Protocol):
+    """Feeds a Source; resolves `lost` (if given) when the connection ends."""
+
+    def __init__(self, source, lost=None):
+        self.source = source
+        self.lost = lost
+
+    def connection_made(self, transport):
+        self.source._attach(transport)
+
+    def data_received(self, data):
+        self.source._received(data)
+
+    def connection_lost(self, exc):
+        self.source._detach(None if exc is None else str(exc))
+        if self.lost is not None and not self.lost.done():
+            self.lost.set_result(None)
+
+
+class Source:
+    """A named link feeding one decoder; subclasses implement run()."""
+
+    def __init__(self, name, decoder):
+        self.name = name
+        self.decoder = decoder
+        self.hub = None
+        self.transport = None
+        self.bytes_received = 0
+        self.last_error = None
+
+    def _attach(self, transport):
+        self.transport = transport
+        self.hub.publish(self.name, "link", True)
+
+    def _detach(self, error=None):
+        self.transport = None
+        self.last_error = error
+        self.hub.publish(self.name, "link", False)
+
+    def _received(self, data):
+        self.bytes_received += len(data)
+        for topic, payload in self.decoder.feed(data):
+            self.hub.publish(self.name, topic, payload)
+
+    def write(self, data):
+        """Send bytes on the link; False if it is not connected. Hub thread only."""
+        if self.transport is None:
+            return False
+        self.transport.write(data)
+        return True
+
+    async def run(self):
+        raise NotImplementedError
+
+
+class SerialSource(Source):
+    """
+    A serial port, read through pyserial-asyncio's transport when it is
+    installed and by non-blocking polling (timeout=0) otherwise. Reopens
+    the port every `retry` seconds after an error.
+    """
+
+    def __init__(self, name, port, baud_rate, decoder, retry=1.0):
+        super().__init__(name, decoder)
+        if serial is None:
+            raise RuntimeError("pyserial is required for serial sources")
+        self.port = port
+        self.baud_rate = baud_rate
+        self.retry = retry
+
+    async def run(self):
+        while True:
+            try:
+                if serial_asyncio is not None:
+                    await self._run_transport()
+                else:
+                    await self._run_polled()
+            except (OSError, serial.SerialException) as e:
+                self.last_error = str(e)
+            await asyncio.sleep(self.retry)
+
+    async def _run_transport(self):
+        loop = asyncio.get_running_loop()
+        lost = loop.create_future()
+        transport, _ = await serial_asyncio.create_serial_connection(
+            loop, lambda: _StreamProtocol(self, lost), self.port, baudrate=self.baud_rate)
+        try:
+            await lost
+        finally:
+            transport.close()
+
+    async def _run_polled(self):
+        ser = serial.Serial(self.port, self.baud_rate, timeout=0, write_timeout=0)
+        self._attach(_PolledSerialTransport(ser))
+        error = None
+        try:
+            while True:
+                data = ser.read(ser.in_waiting or 1)
+                if data:
+                    self._received(data)
+                else:
+                    await asyncio.sleep(SERIAL_POLL_INTERVAL)
+        except (OSError, serial.SerialException) as e:
+            error = str(e)  # recorded before the link-down event, not after it
+            raise
+        finally:
+            ser.close()
+            self._detach(error)
+
+
+class _PolledSerialTransport:
+    """The write() half of a transport for a port opened without pyserial-asyncio."""
+
+    def __init__(self, ser):
+        self.ser = ser
+
+    def write(self, data):
+        self.ser.write(data)
+
+    def close(self):
+        self.ser.close()
+
+
+class TcpServerSource(Source):
+    """Listens on host:port; the peer that connects (e.g. Simulink) streams into the decoder."""
+
+    def __init__(self, name, host, port, decoder):
+        super().__init__(name, decoder)
+        self.host = host
+        self.port = port
+
+    async def run(self):
+        try:
+            server = await asyncio.get_running_loop().create_server(
+                lambda: _StreamProtocol(self), self.host, self.port)
+        except OSError as e:
+            self._detach(str(e))  # e.g. port already in use
+            return
+        async with server:
+            await server.serve_forever()
+
+
+class TcpClientSource(Source):
+    """Connects to host:port and reconnects every `retry` seconds when the link drops."""
+
+    def __init__(self, name, host, port, decoder, retry=1.0):
+        super().__init__(name, decoder)
+        self.host = host
+        self.port = port
+        self.retry = retry
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            lost = loop.create_future()
+            try:
+                transport, _ = await loop.create_connection(lambda: _StreamProtocol(self, lost), self.host, self.port)
+                try:
+                    await lost
+                finally:
+                    transport.close()
+            except OSError as e:
+                self.last_error = str(e)
+            await asyncio.sleep(self.retry)
+
+
+class CommandServer(Source):
+    """
+    Listens on host:port and, while a peer is connected, sends make_command()
+    (bytes) every 1 / rate_hz seconds on a drift-free schedule. Incoming bytes
+    are ignored.
+    """
+
+    def __init__(self, name, host, port, make_command, rate_hz):
+        super().__init__(name, None)
+        self.host = host
+        self.port = port
+        self.make_command = make_command
+        self.period = 1.0 / rate_hz
+        self.commands_sent = 0
+
+    def _received(self, data):
+        self.bytes_received += len(data)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            server = await loop.create_server(lambda: _StreamProtocol(self), self.host, self.port)
+        except OSError as e:
+            self._detach(str(e))  # e.g. port already in use
+            return
+        async with server:
+            next_t = loop.time()
+            while True:
+                if self.transport is not None and not self.transport.is_closing():
+                    self.transport.write(self.make_command())
+                    self.commands_sent += 1
+                next_t += self.period
+                await asyncio.sleep(max(0.0, next_t - loop.time()))
+
+
+# -------------------------------
+# Hub
+# -------------------------------
+class TelemetryHub:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.sources = {}
+        self._subscribers = ()  # replaced, never mutated, so publish() can iterate without a lock
+        self._lock = threading.Lock()
+        self.loop = None
+        self._thread = None
+        self._stopping = None
+        self._tasks = []
+        self.published = 0
+
+    # --- configuration ---
+    def add_source(self, source):
+        if source.name in self.sources:
+            raise ValueError(f"Duplicate source name: {source.name}")
+        source.hub = self
+        self.sources[source.name] = source
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._spawn, source.run())
+        return source
+
+    def add_serial(self, name, port, baud_rate, decoder, retry=1.0):
+        return self.add_source(SerialSource(name, port, baud_rate, decoder, retry))
+
+    def add_tcp_server(self, name, host, port, decoder):
+        return self.add_source(TcpServerSource(name, host, port, decoder))
+
+    def add_tcp_client(self, name, host, port, decoder, retry=1.0):
+        return self.add_source(TcpClientSource(name, host, port, decoder, retry))
+
+    def add_command_server(self, name, host, port, make_command, rate_hz):
+        return self.add_source(CommandServer(name, host, port, make_command, rate_hz))
+
+    def subscribe(self, maxlen=256, topics=None, notify=None):
+        sub = Subscription(self, maxlen, topics, notify)
+        with self._lock:
+            self._subscribers = self._subscribers + (sub,)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not sub)
+
+    # --- data path (hub thread) ---
+    def publish(self, source, topic, payload):
+        packet = Packet(source, topic, payload, self.clock())
+        self.published += 1
+        for sub in self._subscribers:
+            if sub.topics is None or topic in sub.topics:
+                sub._push(packet)
+
+    def send(self, source_name, data):
+        """Write bytes on a source's link from any thread."""
+        source = self.sources[source_name]
+        if self.loop is None:
+            raise RuntimeError("hub is not running")
+        self.loop.call_soon_threadsafe(source.write, data)
+
+    # --- lifecycle ---
+    def _spawn(self, coro):
+        self._tasks.append(asyncio.get_running_loop().create_task(coro))
+
+    def spawn(self, coro):
+        """Run a coroutine (e.g. an async subscriber) on the hub loop, from any thread."""
+        if self.loop is None:
+            raise RuntimeError("hub is not running")
+        self.loop.call_soon_threadsafe(self._spawn, coro)
+
+    async def run(self, started=None):
+        """Serve every source until stop(); use directly from an asyncio program."""
+        self.loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        for source in self.sources.values():
+            self._spawn(source.run())
+        if started is not None:
+            started.set()
+        try:
+            await self._stopping.wait()
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+            self.loop = None
+
+    def start(self):
+        """Run the hub in one background thread; returns once the loop is up."""
+        started = threading.Event()
+        self._thread = threading.Thread(target=lambda: asyncio.run(self.run(started)),
+                                        name="telemetry-hub", daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def stop(self):
+        loop, stopping = self.loop, self._stopping
+        if loop is not None and stopping is not None:
+            loop.call_soon_threadsafe(stopping.set)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._stopping = None
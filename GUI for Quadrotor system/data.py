@@ -1,35 +1,275 @@
-import serial
-from PyQt5.QtCore import QTimer
-from PyQt5.QtWidgets import QWidget, QVBoxLayout
+import os
+import sys
+import time
+from collections import deque
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QGridLayout, QLabel
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "GCS telemetry"))
+from telemetry_codec import (  # noqa: E402
+    MESSAGES_BY_NAME, POSITION, STATUS, FLIGHT_MODE_NAMES, ARMED_NAMES, HEALTH_NAMES
+)
+from telemetry_compression import CompressedDecoder  # noqa: E402
+from telemetry_hub import BinaryDecoder, LineDecoder, TelemetryHub  # noqa: E402
+from rebroadcast import RebroadcastClient  # noqa: E402
+from link_stats import LinkStats, WINDOWS, LATENCY_EDGES_MS  # noqa: E402
+
 
 # -------------------------------
 # COM data reading
 # -------------------------------
-def read_com_data(port_name, baud_rate):
+STATUS_FIELDS = ("flight_mode", "armed", "imu", "gps", "battery")
+
+
+def parse_telemetry_line(line, t=None):
     """
-    Read a line of data from the COM port and return parsed values.
-    Expected format: roll,pitch,yaw,lat,lon,alt,m1,m2,m3,m4,flight_mode,armed,imu,gps,battery
+    Parse one telemetry line into a dict, or None if it is incomplete.
+    Expected format: roll,pitch,yaw,lat,lon,alt,flight_mode,armed,imu,gps,battery,m1,m2,m3,m4
     """
+    parts = line.split(",")
+    if len(parts) < 6:
+        return None
     try:
-        ser = serial.Serial(port_name, baud_rate, timeout=0.1)
-        line = ser.readline().decode("utf-8").strip()
-        ser.close()
-        if line:
-            parts = line.split(",")
-            if len(parts) >= 6:
-                roll = float(parts[0])
-                pitch = float(parts[1])
-                yaw = float(parts[2])
-                lat = float(parts[3])
-                lon = float(parts[4])
-                alt = float(parts[5])
-                return roll, pitch, yaw, lat, lon, alt
-    except Exception as e:
-        print("COM read error:", e)
-    return None, None, None, None, None, None
+        sample = {
+            "t": t,
+            "roll": float(parts[0]),
+            "pitch": float(parts[1]),
+            "yaw": float(parts[2]),
+            "lat": float(parts[3]),
+            "lon": float(parts[4]),
+            "alt": float(parts[5])
+        }
+        if len(parts) >= 11:
+            for name, value in zip(STATUS_FIELDS, parts[6:11]):
+                sample[name] = value.strip()
+        if len(parts) >= 15:
+            sample["motors"] = tuple(float(p) for p in parts[11:15])
+    except ValueError:
+        return None
+    return sample
+
+
+def samples_from_frames(batches, status):
+    """
+    Sample dicts from a FrameDecoder batch. POSITION frames become samples
+    (t in vehicle seconds); the newest STATUS frame updates `status`, whose
+    fields every later sample carries.
+    """
+    if STATUS in batches:
+        last = batches[STATUS][-1]
+        status.update({
+            "flight_mode": FLIGHT_MODE_NAMES.get(int(last["flight_mode"]), str(last["flight_mode"])),
+            "armed": ARMED_NAMES.get(int(last["armed"]), "?"),
+            "imu": HEALTH_NAMES.get(int(last["imu"]), "?"),
+            "gps": HEALTH_NAMES.get(int(last["gps"]), "?"),
+            "battery": f"{last['battery'] / 1000.0:.2f}",
+            "motors": (int(last["m1"]), int(last["m2"]), int(last["m3"]), int(last["m4"]))
+        })
+    records = batches.get(POSITION)
+    if records is None:
+        return []
+    values = POSITION.physical(records)
+    columns = [values[name].tolist() for name in ("t_ms", "roll", "pitch", "yaw", "lat", "lon", "alt")]
+    return [{"t": t_ms / 1000.0, "roll": roll, "pitch": pitch, "yaw": yaw, "lat": lat, "lon": lon,
+             "alt": alt, **status}
+            for t_ms, roll, pitch, yaw, lat, lon, alt in zip(*columns)]
+
+
+STATS_INTERVAL = 1.0  # s between link-statistics updates
+PROTOCOLS = {"CSV": "text", "Binary": "binary", "Compressed": "compressed"}  # protocol box -> SerialReader
+
+
+def record_link_stats(stats, batches, now):
+    """Feed every decoded frame of a FrameDecoder batch to a LinkStats."""
+    for message, records in batches.items():
+        stats.record_batch(records, now, message.type_id, size=len(records) * (message.size + 4))
+
+
+SUBSCRIPTION_MAXLEN = 1024  # hub packets (one per port read) queued between UI drains
+
+
+class CompressedHubDecoder:
+    """
+    CompressedDecoder as a hub decoder. Besides one batch per message type
+    it publishes topic "received": (seq/t_ms of every frame that passed the
+    CRC, bytes read), which LinkStats needs for delta frames that were
+    dropped until the next keyframe.
+    """
+
+    def __init__(self):
+        self.frames = CompressedDecoder()
+
+    def feed(self, data):
+        batches = self.frames.feed(data)
+        out = [("received", (self.frames.received, len(data)))] if len(self.frames.received) else []
+        return out + [(message.name, records) for message, records in batches.items()]
+
+
+def _sized_sample(line):
+    """LineDecoder parser: (bytes on the wire, sample without t) or None."""
+    sample = parse_telemetry_line(line)
+    return None if sample is None else (len(line) + 1, sample)
+
+
+class SerialReader(QObject):
+    """
+    One serial connection for the whole session, served by a TelemetryHub:
+    the hub thread owns the port and decodes every read (CSV lines are
+    parsed there too), and this object only drains its subscription from a
+    UI-thread timer every batch_interval seconds, emitting the samples as
+    one `batch`.
+
+    protocol is "text" for the CSV line, "binary" for telemetry_codec
+    frames or "compressed" for telemetry_compression frames.
+
+    Every packet also goes through a LinkStats; its rolling windows are
+    emitted through `link_stats` once per STATS_INTERVAL. Without sequence
+    numbers (text) only rate and arrival counts are known. The hub reopens
+    the port after a read error; a port that never opens ends the session.
+    """
+
+    batch = pyqtSignal(list)
+    error = pyqtSignal(str)
+    link_stats = pyqtSignal(object)
+    finished = pyqtSignal()
+
+    def __init__(self, port_name, baud_rate, batch_interval=0.05, protocol="text", parent=None):
+        super().__init__(parent)
+        if protocol not in PROTOCOLS.values():
+            raise ValueError(f"Unknown telemetry protocol: {protocol}")
+        self.port_name = port_name
+        self.baud_rate = baud_rate
+        self.batch_interval = batch_interval
+        self.protocol = protocol
+        if protocol == "compressed":
+            decoder = CompressedHubDecoder()
+        elif protocol == "binary":
+            decoder = BinaryDecoder()
+        else:
+            decoder = LineDecoder(_sized_sample, topic="text")
+        self.hub = TelemetryHub()
+        self.source = self.hub.add_serial("vehicle", port_name, baud_rate, decoder)
+        self.feed = self.hub.subscribe(maxlen=SUBSCRIPTION_MAXLEN)
+        self.stats = LinkStats()
+        self.status = {}
+        self.linked = None  # None until the port has opened once
+        self.timer = QTimer(self)
+        self.timer.setInterval(int(batch_interval * 1000))
+        self.timer.timeout.connect(self._drain)
+        self.start_t = self.last_stats = None
+
+    def start(self):
+        self.start_t = self.last_stats = time.monotonic()
+        self.hub.start()
+        self.timer.start()
+
+    def _samples(self, packet):
+        if packet.topic == "link":
+            self.linked = packet.payload
+            if not packet.payload and self.source.last_error:
+                self.error.emit(f"COM read error: {self.source.last_error}")
+            return []
+        if packet.topic == "text":
+            for size, _ in packet.payload:
+                self.stats.record(packet.t, size=size)
+            return [dict(sample, t=packet.t - self.start_t) for _, sample in packet.payload]
+        if packet.topic == "received":
+            received, size = packet.payload
+            self.stats.record_batch(received, packet.t, POSITION.type_id, size=size)
+            return []
+        batches = {MESSAGES_BY_NAME[packet.topic]: packet.payload}
+        if self.protocol == "binary":
+            record_link_stats(self.stats, batches, packet.t)
+        return samples_from_frames(batches, self.status)
+
+    def _drain(self):
+        pending = []
+        for packet in self.feed.drain():
+            pending.extend(self._samples(packet))
+        if pending:
+            self.batch.emit(pending)
+        now = time.monotonic()
+        if now - self.last_stats >= STATS_INTERVAL:
+            self.link_stats.emit(self.stats.summary(now))
+            self.last_stats = now
+        if self.linked is None and self.source.last_error:
+            self.error.emit(f"Could not open {self.port_name}: {self.source.last_error}")
+            self.stop()
+
+    def stop(self):
+        """Stop the hub (closing the port) and deliver what was still queued."""
+        if not self.timer.isActive():
+            return
+        self.timer.stop()
+        self.hub.stop()
+        pending = []
+        for packet in self.feed.drain():
+            pending.extend(self._samples(packet))
+        if pending:
+            self.batch.emit(pending)
+        self.finished.emit()
+
+
+NETWORK_SOURCE = "Network (rebroadcast)"  # port-box entry that reads from rebroadcast.py instead of a port
+
+
+class NetworkReader(QThread):
+    """
+    SerialReader counterpart for the local rebroadcast service: subscribes
+    over localhost UDP (binary frames) and emits the same sample batches
+    and link statistics.
+    """
+
+    batch = pyqtSignal(list)
+    error = pyqtSignal(str)
+    link_stats = pyqtSignal(object)
+
+    def __init__(self, rate_hz=0, batch_interval=0.05, parent=None):
+        super().__init__(parent)
+        self.rate_hz = rate_hz
+        self.batch_interval = batch_interval
+        self.stats = LinkStats()
+        self._running = True
+
+    def run(self):
+        try:
+            client = RebroadcastClient(rate_hz=self.rate_hz, topics=("position", "status"),
+                                       timeout=self.batch_interval)
+        except OSError as e:
+            self.error.emit(f"Could not open network source: {e}")
+            return
+
+        pending = []
+        status = {}
+        last_emit = last_stats = time.monotonic()
+        try:
+            while self._running:
+                batches = client.receive()
+                now = time.monotonic()
+                record_link_stats(self.stats, batches, now)
+                pending.extend(samples_from_frames(batches, status))
+                if pending and now - last_emit >= self.batch_interval:
+                    self.batch.emit(pending)
+                    pending = []
+                    last_emit = now
+                if now - last_stats >= STATS_INTERVAL:
+                    self.link_stats.emit(self.stats.summary(now))
+                    last_stats = now
+        except Exception as e:
+            self.error.emit(f"Network read error: {e}")
+        finally:
+            client.close()
+        if pending:
+            self.batch.emit(pending)
+
+    def stop(self):
+        self._running = False
+        self.wait()
+
+
+PLOT_HISTORY = 5000  # samples kept per plotted series
 
 
 # -------------------------------
@@ -49,15 +289,20 @@ def create_map_widget():
     ax.tick_params(colors='white')
     ax.grid(True, color='gray', linestyle='--', alpha=0.5)
 
-    lat_data, lon_data = [], []
+    lat_data, lon_data = deque(maxlen=PLOT_HISTORY), deque(maxlen=PLOT_HISTORY)
     line, = ax.plot([], [], 'ro-', markersize=4)
 
     layout.addWidget(canvas)
 
-    def update_map(lat, lon):
-        if lat is not None and lon is not None:
-            lat_data.append(lat)
-            lon_data.append(lon)
+    def update_map(lats, lons):
+        """Append a batch of fixes and redraw once."""
+        added = False
+        for lat, lon in zip(lats, lons):
+            if lat is not None and lon is not None:
+                lat_data.append(lat)
+                lon_data.append(lon)
+                added = True
+        if added:
             line.set_data(lon_data, lat_data)
             ax.relim()
             ax.autoscale_view()
@@ -83,7 +328,8 @@ def create_rpy_plot():
     ax.tick_params(colors='white')
     ax.grid(True, color='gray', linestyle='--', alpha=0.5)
 
-    time_data, roll_data, pitch_data, yaw_rate_data = [], [], [], []
+    # Bounded history: the axis only shows the last 20 s at full telemetry rate
+    time_data, roll_data, pitch_data, yaw_rate_data = (deque(maxlen=PLOT_HISTORY) for _ in range(4))
     roll_line, = ax.plot([], [], 'r-', label='Roll (deg)')
     pitch_line, = ax.plot([], [], 'g-', label='Pitch (deg)')
     yaw_line, = ax.plot([], [], 'b-', label='Yaw Rate (deg/s)')
@@ -91,11 +337,15 @@ def create_rpy_plot():
 
     layout.addWidget(canvas)
 
-    def update_rpy_plot(t, roll, pitch, yaw_rate):
-        time_data.append(t)
-        roll_data.append(roll)
-        pitch_data.append(pitch)
-        yaw_rate_data.append(yaw_rate)
+    def update_rpy_plot(times, rolls, pitches, yaw_rates):
+        """Append a batch of samples and redraw once."""
+        if not times:
+            return
+        time_data.extend(times)
+        roll_data.extend(rolls)
+        pitch_data.extend(pitches)
+        yaw_rate_data.extend(yaw_rates)
+        t = times[-1]
 
         roll_line.set_data(time_data, roll_data)
         pitch_line.set_data(time_data, pitch_data)
@@ -128,7 +378,7 @@ def create_motor_pwm_plot():
     ax.tick_params(colors='white')
     ax.grid(True, color='gray', linestyle='--', alpha=0.5)
 
-    time_data, m1_data, m2_data, m3_data, m4_data = [], [], [], [], []
+    time_data, m1_data, m2_data, m3_data, m4_data = (deque(maxlen=PLOT_HISTORY) for _ in range(5))
     m1_line, = ax.plot([], [], 'r-', label='M1')
     m2_line, = ax.plot([], [], 'g-', label='M2')
     m3_line, = ax.plot([], [], 'b-', label='M3')
@@ -137,12 +387,16 @@ def create_motor_pwm_plot():
 
     layout.addWidget(canvas)
 
-    def update_motor_pwms(t, m1, m2, m3, m4):
-        time_data.append(t)
-        m1_data.append(m1)
-        m2_data.append(m2)
-        m3_data.append(m3)
-        m4_data.append(m4)
+    def update_motor_pwms(times, m1, m2, m3, m4):
+        """Append a batch of samples (one sequence per motor) and redraw once."""
+        if not times:
+            return
+        time_data.extend(times)
+        m1_data.extend(m1)
+        m2_data.extend(m2)
+        m3_data.extend(m3)
+        m4_data.extend(m4)
+        t = times[-1]
 
         m1_line.set_data(time_data, m1_data)
         m2_line.set_data(time_data, m2_data)
@@ -158,65 +412,181 @@ def create_motor_pwm_plot():
 
 
 # -------------------------------
-# Timer update
+# Link statistics panel
 # -------------------------------
-def setup_timer(labels_dict, com_port_box, baud_rate_box, update_map_func,
-                update_rpy_plot_func=None, update_motor_pwms_func=None):
-    prev_yaw = 0
-    time_counter = 0
+STATS_COLUMNS = (
+    ("Packets/s", "rate", "{:.1f}"),
+    ("Loss", "loss", "{:.1%}"),
+    ("Reordered", "reordered", "{:d}"),
+    ("Duplicates", "duplicates", "{:d}"),
+    ("Jitter (ms)", "jitter_ms", "{:.2f}"),
+    ("Latency p50 (ms)", "latency_p50_ms", "{:.1f}"),
+    ("p95", "latency_p95_ms", "{:.1f}"),
+    ("p99", "latency_p99_ms", "{:.1f}"),
+    ("Bytes/s", "bytes_per_s", "{:.0f}")
+)
+
+
+def create_link_stats_panel():
+    """
+    Table of the rolling link windows, a health line and the 60 s latency
+    histogram. Latency is relative to the fastest packet seen (the vehicle
+    and GCS clocks are not synchronised).
+    """
+    widget = QWidget()
+    layout = QVBoxLayout(widget)
 
-    def update_labels():
-        nonlocal prev_yaw, time_counter
-        try:
-            port_name = com_port_box.currentText()
-            baud_rate = int(baud_rate_box.currentText())
-            ser = serial.Serial(port_name, baud_rate, timeout=0.1)
-            line = ser.readline().decode("utf-8").strip()
-            ser.close()
-        except Exception as e:
-            print("COM read error:", e)
-            line = ""
-
-        if line:
-            parts = line.split(",")
-            if len(parts) >= 6:
-                roll = float(parts[0])
-                pitch = float(parts[1])
-                yaw = float(parts[2])
-                lat = float(parts[3])
-                lon = float(parts[4])
-                alt = float(parts[5])
-
-                labels_dict['roll'].setText(f"{roll:.2f}")
-                labels_dict['pitch'].setText(f"{pitch:.2f}")
-                labels_dict['yaw'].setText(f"{yaw:.2f}")
-                labels_dict['lat'].setText(f"{lat:.6f}")
-                labels_dict['lon'].setText(f"{lon:.6f}")
-                labels_dict['alt'].setText(f"{alt:.2f}")
-
-                update_map_func(lat, lon)
-
-                if update_rpy_plot_func:
-                    dt = 0.1
-                    yaw_rate = (yaw - prev_yaw) / dt
-                    time_counter += dt
-                    update_rpy_plot_func(time_counter, roll, pitch, yaw_rate)
-                    prev_yaw = yaw
-
-            if len(parts) >= 11:
-                labels_dict['flight_mode'].setText(f"Flight Mode: {parts[6]}")
-                labels_dict['armed'].setText(f"Armed: {parts[7]}")
-                labels_dict['imu'].setText(f"IMU: {parts[8]}")
-                labels_dict['gps'].setText(f"GPS: {parts[9]}")
-                labels_dict['battery'].setText(f"Battery: {parts[10]}")
-
-            if len(parts) >= 15 and update_motor_pwms_func:
-                m1 = float(parts[11])
-                m2 = float(parts[12])
-                m3 = float(parts[13])
-                m4 = float(parts[14])
-                update_motor_pwms_func(time_counter, m1, m2, m3, m4)
-
-    timer = QTimer()
-    timer.timeout.connect(update_labels)
-    timer.start(100)
+    health_label = QLabel("Link: no data")
+    health_label.setStyleSheet("color: gray; font-weight: bold")
+    layout.addWidget(health_label)
+
+    grid = QGridLayout()
+    grid.addWidget(QLabel("Window"), 0, 0)
+    for col, (title, _, _) in enumerate(STATS_COLUMNS, start=1):
+        grid.addWidget(QLabel(title), 0, col)
+    cells = {}
+    for row, window in enumerate(WINDOWS, start=1):
+        grid.addWidget(QLabel(f"{window} s"), row, 0)
+        for col, (_, key, _) in enumerate(STATS_COLUMNS, start=1):
+            cells[window, key] = QLabel("---")
+            grid.addWidget(cells[window, key], row, col)
+    layout.addLayout(grid)
+
+    fig = Figure(figsize=(5, 2), facecolor='black')
+    canvas = FigureCanvas(fig)
+    ax = fig.add_subplot(111, facecolor='black')
+    ax.set_title("Latency histogram (60 s)", color='white')
+    ax.set_xlabel("Latency above best (ms)", color='white')
+    ax.set_ylabel("Packets", color='white')
+    ax.set_xscale('log')
+    ax.tick_params(colors='white')
+    ax.grid(True, color='gray', linestyle='--', alpha=0.5)
+    lower_edges = [LATENCY_EDGES_MS[0] / 2] + list(LATENCY_EDGES_MS[:-1])
+    widths = [hi - lo for lo, hi in zip(lower_edges, LATENCY_EDGES_MS)]
+    bars = ax.bar(lower_edges, [0] * len(widths), width=widths, align='edge', color='c')
+    layout.addWidget(canvas)
+
+    def update_link_stats(summary):
+        for window in WINDOWS:
+            values = summary.get(window)
+            for _, key, fmt in STATS_COLUMNS:
+                value = None if values is None else values[key]
+                cells[window, key].setText("---" if value is None else fmt.format(value))
+
+        if summary.get(1) is None:
+            health_label.setText("Link: no data")
+            health_label.setStyleSheet("color: gray; font-weight: bold")
+        elif summary["degraded"]:
+            health_label.setText("Link DEGRADED: " + ", ".join(summary["degraded"]))
+            health_label.setStyleSheet("color: orange; font-weight: bold")
+        else:
+            health_label.setText("Link OK")
+            health_label.setStyleSheet("color: green; font-weight: bold")
+
+        if summary.get(60) is not None:
+            counts = summary[60]["latency_hist"]
+            for bar, count in zip(bars, counts):
+                bar.set_height(count)
+            ax.set_ylim(0, max(1, counts.max()) * 1.1)
+            canvas.draw_idle()
+
+    return widget, update_link_stats
+
+
+# -------------------------------
+# Serial link
+# -------------------------------
+def setup_serial_link(connect_button, labels_dict, com_port_box, baud_rate_box, update_map_func,
+                      update_rpy_plot_func=None, update_motor_pwms_func=None, protocol_box=None,
+                      update_link_stats_func=None):
+    """
+    Wire the CONNECT button to a SerialReader. Each batch updates the
+    labels from its newest sample and feeds every sample to the plots, which
+    append the whole batch and redraw once.
+    protocol_box, if given, selects a PROTOCOLS entry (CSV by default). Choosing
+    NETWORK_SOURCE in the port box attaches to rebroadcast.py instead.
+    update_link_stats_func receives the reader's link statistics.
+    """
+    state = {"reader": None, "prev_t": None, "prev_yaw": None}
+
+    def apply_batch(samples):
+        # Collect the whole batch, then hand each plot one append + redraw
+        update_map_func([s["lat"] for s in samples], [s["lon"] for s in samples])
+
+        rpy = ([], [], [], [])
+        motors = ([], [], [], [], [])
+        for sample in samples:
+            t = sample["t"]
+            if state["prev_t"] is not None and t > state["prev_t"]:
+                rpy[0].append(t)
+                rpy[1].append(sample["roll"])
+                rpy[2].append(sample["pitch"])
+                rpy[3].append((sample["yaw"] - state["prev_yaw"]) / (t - state["prev_t"]))
+            state["prev_t"], state["prev_yaw"] = t, sample["yaw"]
+            if "motors" in sample:
+                motors[0].append(t)
+                for series, pwm in zip(motors[1:], sample["motors"]):
+                    series.append(pwm)
+
+        if update_rpy_plot_func:
+            update_rpy_plot_func(*rpy)
+        if update_motor_pwms_func:
+            update_motor_pwms_func(*motors)
+
+        latest = samples[-1]
+        labels_dict['roll'].setText(f"{latest['roll']:.2f}")
+        labels_dict['pitch'].setText(f"{latest['pitch']:.2f}")
+        labels_dict['yaw'].setText(f"{latest['yaw']:.2f}")
+        labels_dict['lat'].setText(f"{latest['lat']:.6f}")
+        labels_dict['lon'].setText(f"{latest['lon']:.6f}")
+        labels_dict['alt'].setText(f"{latest['alt']:.2f}")
+        if "flight_mode" in latest:
+            labels_dict['flight_mode'].setText(f"Flight Mode: {latest['flight_mode']}")
+            labels_dict['armed'].setText(f"Armed: {latest['armed']}")
+            labels_dict['imu'].setText(f"IMU: {latest['imu']}")
+            labels_dict['gps'].setText(f"GPS: {latest['gps']}")
+            labels_dict['battery'].setText(f"Battery: {latest['battery']}")
+
+    def on_finished(reader):
+        # The port closed by itself (open or read error)
+        if state["reader"] is reader:
+            state["reader"] = None
+            set_connected(False)
+
+    def connect():
+        if com_port_box.currentText() == NETWORK_SOURCE:
+            reader = NetworkReader()
+        else:
+            protocol = PROTOCOLS.get(protocol_box.currentText(), "text") if protocol_box is not None else "text"
+            reader = SerialReader(com_port_box.currentText(), int(baud_rate_box.currentText()), protocol=protocol)
+        reader.batch.connect(apply_batch)
+        reader.error.connect(print)
+        if update_link_stats_func:
+            reader.link_stats.connect(update_link_stats_func)
+        reader.finished.connect(lambda: on_finished(reader))
+        state["reader"], state["prev_t"], state["prev_yaw"] = reader, None, None
+        reader.start()
+        set_connected(True)
+
+    def disconnect():
+        reader = state["reader"]
+        if reader is not None:
+            state["reader"] = None
+            reader.stop()
+        set_connected(False)
+
+    def set_connected(connected):
+        connect_button.setText("DISCONNECT" if connected else "CONNECT")
+        com_port_box.setEnabled(not connected)
+        baud_rate_box.setEnabled(not connected)
+        if protocol_box is not None:
+            protocol_box.setEnabled(not connected)
+
+    def toggle():
+        if state["reader"] is None:
+            connect()
+        else:
+            disconnect()
+
+    connect_button.clicked.connect(toggle)
+    return disconnect
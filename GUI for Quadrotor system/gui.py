@@ -7,7 +7,8 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtGui import QIcon
 from dark_theme import dark_stylesheet
 from data import (
-    setup_timer, create_map_widget, create_rpy_plot, create_motor_pwm_plot
+    NETWORK_SOURCE, PROTOCOLS, setup_serial_link, create_map_widget, create_rpy_plot, create_motor_pwm_plot,
+    create_link_stats_panel
 )
 
 
@@ -25,12 +26,17 @@ def create_data_tab():
     ports = serial.tools.list_ports.comports()
     for port in ports:
         com_port_box.addItem(port.device)
+    com_port_box.addItem(NETWORK_SOURCE)
     top_bar.addWidget(com_port_box)
 
     baud_rate_box = QComboBox()
     baud_rate_box.addItems(["9600", "57600", "115200"])
     top_bar.addWidget(baud_rate_box)
 
+    protocol_box = QComboBox()
+    protocol_box.addItems(list(PROTOCOLS))
+    top_bar.addWidget(protocol_box)
+
     connect_button = QPushButton("CONNECT")
     top_bar.addWidget(connect_button)
     main_layout.addLayout(top_bar)
@@ -112,7 +118,8 @@ def create_data_tab():
         'battery': battery_label
     }
 
-    return data_tab, labels_dict, com_port_box, baud_rate_box, update_map, update_rpy_rates, update_motor_pwms
+    return (data_tab, labels_dict, connect_button, com_port_box, baud_rate_box, protocol_box,
+            update_map, update_rpy_rates, update_motor_pwms)
 
 
 def def_config_tab():
@@ -132,11 +139,13 @@ def def_logs_tab():
 
 
 def def_testing_tab():
-    """Create Testing tab layout"""
+    """Create Testing tab layout; returns the tab and its link-statistics update function"""
     tab = QWidget()
     layout = QVBoxLayout(tab)
+    link_stats_panel, update_link_stats = create_link_stats_panel()
+    layout.addWidget(link_stats_panel)
     layout.addStretch()
-    return tab
+    return tab, update_link_stats
 
 
 def main():
@@ -152,21 +161,27 @@ def main():
     window.setCentralWidget(tabs)
 
     # Data tab
-    data_tab, labels_dict, com_port_box, baud_rate_box, update_map, update_rpy_rates, update_motor_pwms = create_data_tab()
+    (data_tab, labels_dict, connect_button, com_port_box, baud_rate_box, protocol_box,
+     update_map, update_rpy_rates, update_motor_pwms) = create_data_tab()
     tabs.addTab(data_tab, "Data")
     tabs.addTab(def_config_tab(), "Config and Settings")
     tabs.addTab(def_logs_tab(), "Logs and Firmware")
-    tabs.addTab(def_testing_tab(), "Testing")
+    testing_tab, update_link_stats = def_testing_tab()
+    tabs.addTab(testing_tab, "Testing")
 
-    # Setup timer
-    setup_timer(
+    # Serial link: one background reader per CONNECT session
+    disconnect = setup_serial_link(
+        connect_button,
         labels_dict,
         com_port_box,
         baud_rate_box,
         update_map,
         update_rpy_rates,
-        update_motor_pwms
+        update_motor_pwms,
+        protocol_box,
+        update_link_stats
     )
+    app.aboutToQuit.connect(disconnect)
 
     window.show()
     sys.exit(app.exec_())
@@ -7,7 +7,7 @@ PyQt5 Mission Control App (layout adjusted)
 - Bottom note included.
 """
 
-import sys, socket, struct, threading, time
+import os, sys, struct, threading, time
 from collections import deque
 import numpy as np
 from PyQt5 import QtCore, QtWidgets
@@ -20,64 +20,33 @@ from PyQt5.QtWidgets import (
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "GCS telemetry"))
+from telemetry_hub import FixedFrameDecoder, TelemetryHub  # noqa: E402
+
 HOST='127.0.0.1'; SEND_PORT=55000; RECV_PORT=55001; TELEM_LEN=13
 PLOT_INTERVAL_MS=200; SEND_HZ=10
+DRAIN_INTERVAL_MS=50  # how often the UI takes telemetry off the hub
+SUB_MAXLEN=256        # hub packets (one per socket read) queued for the UI before the oldest drop
 
-class TelemetryReceiver(QtCore.QObject):
-    telemetry_updated=pyqtSignal(object); recv_status=pyqtSignal(bool)
-    def __init__(self,host,port): super().__init__(); self.host=host; self.port=port; self.running=False; self.sock=None
-    def start(self):
-        if self.running:return
-        self.running=True; threading.Thread(target=self._run,daemon=True).start()
-    def stop(self):
-        self.running=False
-        if self.sock:
-            try:self.sock.close()
-            except:pass
-    def _run(self):
-        s=socket.socket(socket.AF_INET,socket.SOCK_STREAM); s.setsockopt(socket.IPPROTO_TCP,socket.TCP_NODELAY,1)
-        s.bind((self.host,self.port)); s.listen(1); self.recv_status.emit(False)
-        try:
-            conn,addr=s.accept(); conn.setsockopt(socket.IPPROTO_TCP,socket.TCP_NODELAY,1); self.sock=conn; self.recv_status.emit(True)
-            while self.running:
-                data=conn.recv(8*TELEM_LEN)
-                if len(data)<8*TELEM_LEN: continue
-                self.telemetry_updated.emit(struct.unpack('>13d',data))
-        except:
-            self.recv_status.emit(False)
-        finally:
-            self.recv_status.emit(False); s.close(); self.running=False
-
-class CommandSender(QtCore.QObject):
-    send_status=pyqtSignal(bool)
-    def __init__(self,host,port): super().__init__(); self.host=host; self.port=port; self.running=False; self.sock=None; self.command_lock=threading.Lock(); self.current_alt=0; self.mode=1
-    def start(self):
-        if self.running:return
-        self.running=True; threading.Thread(target=self._run,daemon=True).start()
-    def stop(self):
-        self.running=False
-        if self.sock:
-            try:self.sock.close()
-            except:pass
+class AltitudeCommand:
+    """(mode, altitude) the hub's command server sends to Simulink as '>2d' SEND_HZ times a second."""
+    def __init__(self): self.command_lock=threading.Lock(); self.current_alt=0; self.mode=1
     def set_altitude(self,alt):
         with self.command_lock:self.current_alt=float(alt)
     def get_command(self):
         with self.command_lock:return(self.mode,self.current_alt)
-    def _run(self):
-        s=socket.socket(socket.AF_INET,socket.SOCK_STREAM); s.setsockopt(socket.IPPROTO_TCP,socket.TCP_NODELAY,1); s.bind((self.host,self.port)); s.listen(1); self.send_status.emit(False)
-        try:
-            conn,addr=s.accept(); conn.setsockopt(socket.IPPROTO_TCP,socket.TCP_NODELAY,1); self.sock=conn; self.send_status.emit(True)
-            next_t=time.perf_counter(); dt=1.0/SEND_HZ
-            while self.running:
-                m,a=self.get_command(); conn.sendall(struct.pack('>2d',m,a)); next_t+=dt; d=next_t-time.perf_counter(); time.sleep(d if d>0 else 0)
-        except:
-            self.send_status.emit(False)
-        finally:
-            self.send_status.emit(False); s.close(); self.running=False
+    def pack(self): return struct.pack('>2d',*self.get_command())
+
+def make_hub(command):
+    """SITL telemetry server (topic 'telemetry', (n, TELEM_LEN) batches) and the command server."""
+    hub=TelemetryHub()
+    hub.add_tcp_server('sitl',HOST,RECV_PORT,FixedFrameDecoder(f'>{TELEM_LEN}d','telemetry'))
+    hub.add_command_server('sitl_cmd',HOST,SEND_PORT,command.pack,rate_hz=SEND_HZ)
+    return hub
 
 class MissionController(QtCore.QObject):
     mission_finished=pyqtSignal(); mission_started=pyqtSignal()
-    def __init__(self,sender): super().__init__(); self.sender=sender; self.mission=[]; self.active=False; self.latest_telemetry=None
+    def __init__(self,command): super().__init__(); self.command=command; self.mission=[]; self.active=False; self.latest_telemetry=None
     def update_telemetry(self,t): self.latest_telemetry=t
     def load_mission(self,m): self.mission=m[:]
     def start(self):
@@ -88,7 +57,7 @@ class MissionController(QtCore.QObject):
         try:
             for alt,hold,tol in self.mission:
                 if not self.active:break
-                self.sender.set_altitude(alt); reached=False; t0=None
+                self.command.set_altitude(alt); reached=False; t0=None
                 while not reached and self.active:
                     if not self.latest_telemetry: time.sleep(0.05); continue
                     tt=self.latest_telemetry[0]; z=self.latest_telemetry[3]
@@ -98,10 +67,10 @@ class MissionController(QtCore.QObject):
                     else:t0=None
                     time.sleep(0.05)
             if self.active:
-                cur=self.sender.current_alt
+                cur=self.command.current_alt
                 for s in np.linspace(cur,0,10):
                     if not self.active:break
-                    self.sender.set_altitude(s); time.sleep(0.5)
+                    self.command.set_altitude(s); time.sleep(0.5)
         finally:
             self.active=False; self.mission_finished.emit()
 
@@ -112,10 +81,11 @@ class MplCanvas(FigureCanvas):
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__(); self.setWindowTitle('Mission Control'); self.resize(1400,1050)
-        self.receiver=TelemetryReceiver(HOST,RECV_PORT); self.sender=CommandSender(HOST,SEND_PORT); self.mission_ctrl=MissionController(self.sender)
-        self.receiver.telemetry_updated.connect(self.on_telemetry); self.receiver.recv_status.connect(self.on_recv_status); self.sender.send_status.connect(self.on_send_status)
+        self.command=AltitudeCommand(); self.mission_ctrl=MissionController(self.command)
+        self.hub=make_hub(self.command); self.feed=self.hub.subscribe(maxlen=SUB_MAXLEN,topics={'telemetry','link'})
         self.mission_ctrl.mission_finished.connect(self.on_mission_finished); self.mission_ctrl.mission_started.connect(self.on_mission_started)
-        self._buffers(); self._build_ui(); self.receiver.start(); self.sender.start()
+        self._buffers(); self._build_ui(); self.hub.start()
+        self.drain_timer=QtCore.QTimer(); self.drain_timer.setInterval(DRAIN_INTERVAL_MS); self.drain_timer.timeout.connect(self.drain_hub); self.drain_timer.start()
         self.timer=QtCore.QTimer(); self.timer.setInterval(PLOT_INTERVAL_MS); self.timer.timeout.connect(self.update_plots); self.timer.start()
 
     def _buffers(self):
@@ -190,13 +160,19 @@ class MainWindow(QMainWindow):
     def on_mission_finished(self): self.start_btn.setChecked(False); self.start_btn.setText('Start'); self.mission_table.setEnabled(True)
     def on_mission_started(self): pass
 
-    def on_telemetry(self,t):
-        tt,x,y,z,vx,vy,vz,roll,pitch,yaw,wx,wy,wz=t
-        self.time_buf.append(tt); self.x_buf.append(x); self.y_buf.append(y); self.z_buf.append(z)
-        self.vx_buf.append(vx); self.vy_buf.append(vy); self.vz_buf.append(vz)
-        self.roll_buf.append(roll); self.pitch_buf.append(pitch); self.yaw_buf.append(yaw)
-        self.wx_buf.append(wx); self.wy_buf.append(wy); self.wz_buf.append(wz)
-        self.mission_ctrl.update_telemetry(t)
+    def drain_hub(self):
+        for packet in self.feed.drain():
+            if packet.topic=='telemetry': self.on_telemetry(packet.payload)
+            elif packet.source=='sitl': self.on_recv_status(packet.payload)
+            else: self.on_send_status(packet.payload)
+
+    def on_telemetry(self,frames):
+        tt,x,y,z,vx,vy,vz,roll,pitch,yaw,wx,wy,wz=frames.T.tolist()
+        self.time_buf.extend(tt); self.x_buf.extend(x); self.y_buf.extend(y); self.z_buf.extend(z)
+        self.vx_buf.extend(vx); self.vy_buf.extend(vy); self.vz_buf.extend(vz)
+        self.roll_buf.extend(roll); self.pitch_buf.extend(pitch); self.yaw_buf.extend(yaw)
+        self.wx_buf.extend(wx); self.wy_buf.extend(wy); self.wz_buf.extend(wz)
+        self.mission_ctrl.update_telemetry(tuple(frames[-1].tolist()))
 
     def update_plots(self):
         ax=self.map_canvas.axes; ax.clear()
@@ -218,7 +194,7 @@ class MainWindow(QMainWindow):
         elif title=='Orientation': self.orient_canvas.draw()
         else: self.angvel_canvas.draw()
 
-    def closeEvent(self,e): self.receiver.stop(); self.sender.stop(); self.mission_ctrl.stop(); e.accept()
+    def closeEvent(self,e): self.drain_timer.stop(); self.mission_ctrl.stop(); self.hub.stop(); e.accept()
 
 def main(): app=QApplication(sys.argv); w=MainWindow(); w.show(); sys.exit(app.exec_())
 if __name__=='__main__': main()
\ No newline at end of file
@@ -0,0 +1,88 @@
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from calibration import ACCEL_1G_RAW, calibrate_file
+from navigation import Navigation
+
+
+def _random_rotation(rng, n):
+    """n random unit quaternions as (n, 3, 3) rotation matrices."""
+    q = rng.normal(size=(n, 4))
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    w, x, y, z = q.T
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)], axis=-1),
+        np.stack([2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)], axis=-1),
+        np.stack([2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)], axis=-1)
+    ], axis=1)
+
+
+def synthetic_capture(n, seed=0, still_fraction=0.2, hold=200):
+    """
+    Raw [t, ax..mz] capture of a board tumbled through `n // hold` random
+    poses, each held still for `hold` samples, plus a still segment at the
+    start. Returns the capture and the true sensor errors.
+    """
+    rng = np.random.default_rng(seed)
+    truth = {
+        "accel_bias": np.array([220.0, -140.0, 310.0]),
+        "accel_gain": np.array([[1.02, 0.004, -0.003], [0.0, 0.985, 0.006], [0.0, 0.0, 1.01]]),
+        "gyro_bias": np.array([-35.0, 18.0, 6.0]),
+        "mag_bias": np.array([0.08, -0.05, 0.12]),
+        "mag_gain": np.array([[1.1, 0.05, 0.0], [0.05, 0.92, -0.03], [0.0, -0.03, 1.0]])
+    }
+    poses = n // hold + 1
+    rot = _random_rotation(rng, poses)
+    rot[: int(poses * still_fraction)] = rot[0]  # long still segment for the gyro bias
+    pose = np.repeat(np.arange(poses), hold)[:n]
+
+    gravity = rot[:, 2, :] * ACCEL_1G_RAW               # world up seen in the body frame
+    field = rot.transpose(0, 2, 1) @ np.array([0.3, 0.0, -0.4])
+    acc = gravity[pose] @ truth["accel_gain"].T + truth["accel_bias"] + rng.normal(0, 30.0, (n, 3))
+    gyro = truth["gyro_bias"] + rng.normal(0, 3.0, (n, 3))
+    mag = field[pose] @ truth["mag_gain"].T + truth["mag_bias"] + rng.normal(0, 0.003, (n, 3))
+    t = np.arange(n) / 1000.0
+    return np.column_stack((t, acc, gyro, mag)), truth
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    capture, truth = synthetic_capture(n)
+    path = os.path.join(tempfile.mkdtemp(), "capture.npy")
+    np.save(path, capture)
+    print(f"Synthetic capture: {n} samples ({capture.nbytes / 1e6:.0f} MB) -> {path}")
+
+    start = time.perf_counter()
+    profile = calibrate_file(path)
+    elapsed = time.perf_counter() - start
+    print(f"Fit in {elapsed:.2f} s ({n / elapsed / 1e6:.1f} M samples/s)")
+
+    acc, gyro, mag = capture[:, 1:4], capture[:, 4:7], capture[:, 7:10]
+    acc_norm = np.linalg.norm((acc - profile.accel_bias) @ profile.accel_matrix.T, axis=1)
+    mag_corr = np.linalg.norm((mag - profile.mag_bias) @ profile.mag_matrix.T, axis=1)
+    print(f"accel bias error  {np.abs(profile.accel_bias - truth['accel_bias']).max():8.2f} raw")
+    print(f"gyro bias error   {np.abs(profile.gyro_bias - truth['gyro_bias']).max():8.3f} raw")
+    print(f"mag bias error    {np.abs(profile.mag_bias - truth['mag_bias']).max():8.5f}")
+    print(f"|accel| spread    raw {np.std(np.linalg.norm(acc, axis=1)) / ACCEL_1G_RAW * 100:6.2f} %"
+          f"  calibrated {np.std(acc_norm) / ACCEL_1G_RAW * 100:6.2f} %")
+    print(f"|mag| spread      raw {np.std(np.linalg.norm(mag, axis=1)) / np.mean(np.linalg.norm(mag, axis=1)) * 100:6.2f} %"
+          f"  calibrated {np.std(mag_corr) / np.mean(mag_corr) * 100:6.2f} %")
+
+    # Navigation applies the profile as one matrix + offset per sensor
+    raw, cal = Navigation(), Navigation(calibration=profile)
+    still = capture[:1000]
+    mpu, mags = still[:, 1:7], still[:, 7:10]
+    gps, baro = np.tile([12.97, 77.59, 100.0], (1000, 1)), np.tile([101325.0, 25.0, 40.0], (1000, 1))
+    for nav, label in ((raw, "uncalibrated"), (cal, "calibrated")):
+        out = nav.process_batch(mpu, gps, mags, baro)
+        acc_avg = nav.acc_matrix @ mpu[:, :3].mean(axis=0) + nav.acc_offset
+        gyro_avg = nav.gyro_matrix @ mpu[:, 3:6].mean(axis=0) + nav.gyro_offset
+        print(f"{label:<13} still board: |a| {np.linalg.norm(acc_avg):.3f} m/s^2, "
+              f"|w| {np.degrees(np.linalg.norm(gyro_avg)):.3f} deg/s, roll/pitch {out[3]:.2f}/{out[4]:.2f} deg")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import sys
+import timeit
+import tracemalloc
+from control import Control
+from replay import SimClock
+
+
+def make_inputs():
+    nav_state = [12.9716, 77.5946, 1.0, 2.0, -1.5, 10.0]
+    guidance_out = {"mode": "AltHold", "desired_roll": 5.0, "desired_pitch": -3.0,
+                    "desired_yaw": 12.0, "desired_thrust": 1.5}
+    return nav_state, guidance_out
+
+
+def allocations_per_tick(no_alloc, ticks=2000, warmup=1000):
+    """
+    Peak bytes allocated inside one process() call, worst tick after warm-up.
+    tracemalloc's peak is reset before every tick, so temporaries freed
+    before the call returns are counted too; the cost of the measurement
+    itself (an empty call) is subtracted.
+    """
+    clock = SimClock()
+    control = Control(clock=clock, no_alloc=no_alloc)
+    nav_state, guidance_out = make_inputs()
+    # A caller holding on to outputs, as a logger would (preallocated so only process() allocates)
+    kept = [None] * (warmup + ticks)
+    n = [0]
+
+    def tick():
+        clock.now += 0.002
+        out = control.process(nav_state, guidance_out)
+        if not no_alloc:  # no-alloc returns the same record every tick
+            kept[n[0]] = out
+            n[0] += 1
+
+    def idle():
+        clock.now += 0.002
+
+    def worst(fn):
+        peak = 0
+        for _ in range(ticks):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            fn()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+        return peak
+
+    for _ in range(warmup):
+        tick()
+    tracemalloc.start()
+    try:
+        overhead = worst(idle)
+        return max(worst(tick) - overhead, 0)
+    finally:
+        tracemalloc.stop()
+
+
+def time_per_tick(no_alloc, number=50000):
+    clock = SimClock()
+    control = Control(clock=clock, no_alloc=no_alloc)
+    nav_state, guidance_out = make_inputs()
+
+    def tick():
+        clock.now += 0.002
+        control.process(nav_state, guidance_out)
+
+    return min(timeit.repeat(tick, number=number, repeat=3)) / number
+
+
+def main():
+    failed = False
+    for no_alloc in (False, True):
+        label = "no-alloc" if no_alloc else "default"
+        per_tick = allocations_per_tick(no_alloc)
+        print(f"{label:<9} {time_per_tick(no_alloc) * 1e6:6.2f} us/tick   "
+              f"{per_tick:6d} B peak allocation/tick")
+        if no_alloc and per_tick > 0:
+            failed = True
+
+    if failed:
+        print("FAIL: no-alloc mode allocates per tick")
+        sys.exit(1)
+    print("OK: no-alloc mode allocates nothing per tick after warm-up")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+import math
+import random
+import sys
+import time
+import tracemalloc
+from ekf import QuaternionEKF
+from navigation import Navigation
+from replay import SimClock, read_frames
+from sensor_buffers import make_sensor_rings
+
+RATE_HZ = 250
+IMU_PER_TICK = 4
+G = 9.80665
+
+
+def _body_from_world(roll, pitch, yaw, v):
+    """R^T v for a ZYX (yaw, pitch, roll) body->world rotation."""
+    cr, sr = math.cos(roll), math.sin(roll)
+    cp, sp = math.cos(pitch), math.sin(pitch)
+    cy, sy = math.cos(yaw), math.sin(yaw)
+    r = [[cy * cp, cy * sp * sr - sy * cr, cy * sp * cr + sy * sr],
+         [sy * cp, sy * sp * sr + cy * cr, sy * sp * cr - cy * sr],
+         [-sp, cp * sr, cp * cr]]
+    return [sum(r[i][k] * v[i] for i in range(3)) for k in range(3)]
+
+
+def _unmount(vec, angle_deg):
+    """Undo Navigation.rotate_z so the synthetic raw data lands on the true body vector."""
+    a = math.radians(-angle_deg)
+    x, y, z = vec
+    return [x * math.cos(a) - y * math.sin(a), x * math.sin(a) + y * math.cos(a), z]
+
+
+def synthetic_flight(seconds=60.0, seed=0):
+    """Recorded-style frames with a known truth trajectory, gyro bias and sensor noise."""
+    rng = random.Random(seed)
+    nav = Navigation()
+    bias = [0.01, -0.008, 0.005]  # rad/s
+    dt = 1.0 / (RATE_HZ * IMU_PER_TICK)
+    frames = []
+    for tick in range(int(seconds * RATE_HZ)):
+        mpu = []
+        for k in range(IMU_PER_TICK):
+            t = (tick * IMU_PER_TICK + k) * dt
+            roll = math.radians(15) * math.sin(0.5 * t)
+            pitch = math.radians(10) * math.sin(0.3 * t + 1.0)
+            yaw = math.radians(60) * math.sin(0.05 * t)
+            droll = math.radians(15) * 0.5 * math.cos(0.5 * t)
+            dpitch = math.radians(10) * 0.3 * math.cos(0.3 * t + 1.0)
+            dyaw = math.radians(60) * 0.05 * math.cos(0.05 * t)
+            p = droll - dyaw * math.sin(pitch)
+            q = dpitch * math.cos(roll) + dyaw * math.sin(roll) * math.cos(pitch)
+            r = -dpitch * math.sin(roll) + dyaw * math.cos(roll) * math.cos(pitch)
+            acc = _body_from_world(roll, pitch, yaw, [0.0, 0.0, G])
+            acc = [a + rng.gauss(0, 0.3) for a in acc]
+            gyro = [w + b + rng.gauss(0, 0.01) for w, b in zip((p, q, r), bias)]
+            acc_raw = _unmount(acc, nav.orientation_angles['mpu6050'])
+            gyro_raw = _unmount(gyro, nav.orientation_angles['mpu6050'])
+            mpu.append([a / nav.ACCEL_SCALE for a in acc_raw] + [w / nav.GYRO_SCALE for w in gyro_raw])
+
+        alt = 100.0 + 5.0 * math.sin(0.1 * t)
+        mag = _body_from_world(roll, pitch, yaw, [0.3, 0.0, -0.4])
+        mag = _unmount([m + rng.gauss(0, 0.005) for m in mag], nav.orientation_angles['mag'])
+        pressure = nav.P0 * (1 - (alt + rng.gauss(0, 0.5)) / 44330) ** (1 / 0.1903)
+        frames.append({
+            "t": tick / RATE_HZ,
+            "mpu6050": mpu,
+            "gps": [[12.9716, 77.5946, alt + rng.gauss(0, 3.0)]],
+            "mag": [mag],
+            "baro": [[pressure, 25.0, 40.0]],
+            "truth": [math.degrees(roll), math.degrees(pitch), math.degrees(yaw), alt]
+        })
+    return frames
+
+
+def evaluate(frames, backend):
+    clock = SimClock(frames[0]["t"])
+    nav = Navigation(backend=backend, clock=clock)
+    sq = [0.0, 0.0, 0.0, 0.0]
+    n_truth = 0
+    outputs = []
+    elapsed = 0.0
+    for frame in frames:
+        clock.set(frame["t"])
+        start = time.perf_counter()
+        out = nav.process(frame["mpu6050"], frame["gps"], frame["mag"], frame["baro"])
+        elapsed += time.perf_counter() - start
+        outputs.append(out)
+        if "truth" in frame:
+            est = (out[3], out[4], out[5], out[2])
+            for i in range(4):
+                err = est[i] - frame["truth"][i]
+                if i == 2:
+                    err = (err + 180.0) % 360.0 - 180.0
+                sq[i] += err * err
+            n_truth += 1
+    rms = [math.sqrt(s / n_truth) for s in sq] if n_truth else None
+    return elapsed / len(frames), rms, outputs
+
+
+def multi_rate_streams(seconds=60.0, seed=1, imu_hz=1000, mag_hz=75, baro_hz=50, gps_hz=5,
+                       gps_latency=0.2):
+    """Independent timestamped sensor streams; GPS fixes arrive gps_latency after they are valid."""
+    rng = random.Random(seed)
+    nav = Navigation()
+    bias = [0.01, -0.008, 0.005]
+
+    def truth(t):
+        return (math.radians(15) * math.sin(0.5 * t), math.radians(10) * math.sin(0.3 * t + 1.0),
+                math.radians(60) * math.sin(0.05 * t), 100.0 + 5.0 * math.sin(0.1 * t))
+
+    streams = {"mpu6050": [], "mag": [], "baro": [], "gps": []}
+    for k in range(int(seconds * imu_hz)):
+        t = k / imu_hz
+        roll, pitch, yaw, _ = truth(t)
+        droll = math.radians(15) * 0.5 * math.cos(0.5 * t)
+        dpitch = math.radians(10) * 0.3 * math.cos(0.3 * t + 1.0)
+        dyaw = math.radians(60) * 0.05 * math.cos(0.05 * t)
+        p = droll - dyaw * math.sin(pitch)
+        q = dpitch * math.cos(roll) + dyaw * math.sin(roll) * math.cos(pitch)
+        r = -dpitch * math.sin(roll) + dyaw * math.cos(roll) * math.cos(pitch)
+        acc = [a + rng.gauss(0, 0.3) for a in _body_from_world(roll, pitch, yaw, [0.0, 0.0, G])]
+        gyro = [w + b + rng.gauss(0, 0.01) for w, b in zip((p, q, r), bias)]
+        acc_raw = _unmount(acc, nav.orientation_angles['mpu6050'])
+        gyro_raw = _unmount(gyro, nav.orientation_angles['mpu6050'])
+        streams["mpu6050"].append((t, [a / nav.ACCEL_SCALE for a in acc_raw] + [w / nav.GYRO_SCALE for w in gyro_raw]))
+    for k in range(int(seconds * mag_hz)):
+        t = k / mag_hz
+        roll, pitch, yaw, _ = truth(t)
+        mag = _body_from_world(roll, pitch, yaw, [0.3, 0.0, -0.4])
+        streams["mag"].append((t, _unmount([m + rng.gauss(0, 0.005) for m in mag], nav.orientation_angles['mag'])))
+    for k in range(int(seconds * baro_hz)):
+        t = k / baro_hz
+        alt = truth(t)[3] + rng.gauss(0, 0.5)
+        streams["baro"].append((t, [nav.P0 * (1 - alt / 44330) ** (1 / 0.1903), 25.0, 40.0]))
+    for k in range(int(seconds * gps_hz)):
+        t = k / gps_hz
+        streams["gps"].append((t + gps_latency, [12.9716, 77.5946, truth(t)[3] + rng.gauss(0, 3.0)]))
+    return streams, truth
+
+
+def evaluate_async(streams, truth, rate_hz=RATE_HZ, synchronous=False, backend="ekf"):
+    """
+    Feed the streams into sensor rings tick by tick. synchronous=True runs
+    process_rings (everything averaged per tick, a sensor with no new sample
+    repeated); otherwise process_async.
+    """
+    clock = SimClock()
+    nav = Navigation(backend=backend, clock=clock)
+    rings = make_sensor_rings(4096)
+    cursor = {name: 0 for name in streams}
+    sq = [0.0, 0.0, 0.0, 0.0]
+    elapsed = 0.0
+    n = 0
+    ticks = int(streams["mpu6050"][-1][0] * rate_hz)
+    for tick in range(1, ticks + 1):
+        now = tick / rate_hz
+        clock.set(now)
+        for name, samples in streams.items():
+            i = cursor[name]
+            while i < len(samples) and samples[i][0] <= now:
+                rings[name].push(*samples[i])
+                i += 1
+            cursor[name] = i
+        if rings["gps"].latest() is None:
+            continue  # both paths need a first GPS fix for lat/lon
+        start = time.perf_counter()
+        out = nav.process_rings(rings) if synchronous else nav.process_async(rings)
+        elapsed += time.perf_counter() - start
+        n += 1
+        roll, pitch, yaw, alt = truth(now)
+        est = (out[3], out[4], out[5], out[2])
+        for i, ref in enumerate((math.degrees(roll), math.degrees(pitch), math.degrees(yaw), alt)):
+            err = est[i] - ref
+            if i == 2:
+                err = (err + 180.0) % 360.0 - 180.0
+            sq[i] += err * err
+    return elapsed / n, [math.sqrt(s / n) for s in sq]
+
+
+def ekf_peak_per_step(steps=2000, warmup=200):
+    """
+    Worst peak bytes allocated inside one QuaternionEKF.step() after warm-up
+    (tracemalloc's peak reset around every step, so transient temporaries
+    count), minus the cost of measuring an empty call.
+    """
+    ekf = QuaternionEKF()
+    gyro, acc, mag = [0.01, -0.02, 0.03], [0.3, -0.2, 9.7], [0.2, 0.1, -0.4]
+
+    def step():
+        ekf.step(gyro, acc, mag, 10.0, 11.0, 1.0 / RATE_HZ)
+
+    def worst(fn):
+        peak = 0
+        for _ in range(steps):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            fn()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+        return peak
+
+    for _ in range(warmup):
+        step()
+    tracemalloc.start()
+    try:
+        overhead = worst(lambda: None)
+        return max(worst(step) - overhead, 0)
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    if len(sys.argv) > 1:
+        frames = list(read_frames(sys.argv[1]))
+        print(f"Recorded log {sys.argv[1]}: {len(frames)} frames")
+    else:
+        frames = synthetic_flight()
+        print(f"Synthetic flight: {len(frames)} frames at {RATE_HZ} Hz, {IMU_PER_TICK} IMU samples/frame")
+
+    results = {}
+    for backend in ("complementary", "ekf"):
+        per_call, rms, outputs = evaluate(frames, backend)
+        results[backend] = outputs
+        line = f"{backend:<14} {per_call * 1e6:8.1f} us/call"
+        if rms:
+            line += "   RMS error roll {:.2f} deg, pitch {:.2f} deg, yaw {:.2f} deg, alt {:.2f} m".format(*rms)
+        print(line)
+
+    if not any("truth" in f for f in frames):
+        diff = max(abs(a[3] - b[3]) for a, b in zip(results["complementary"], results["ekf"]))
+        print(f"No truth in log; max roll disagreement between backends: {diff:.2f} deg")
+    print(f"EKF peak allocation per step after warm-up: {ekf_peak_per_step()} B")
+
+    streams, truth = multi_rate_streams()
+    print("Multi-rate streams: IMU 1 kHz, mag 75 Hz, baro 50 Hz, GPS 5 Hz (0.2 s latency)")
+    for label, synchronous, backend in (("process_rings", True, "ekf"), ("process_async", False, "ekf"),
+                                        ("async compl.", False, "complementary")):
+        per_call, rms = evaluate_async(streams, truth, synchronous=synchronous, backend=backend)
+        print(f"{label:<14} {per_call * 1e6:8.1f} us/call   RMS error roll {rms[0]:.2f} deg, "
+              f"pitch {rms[1]:.2f} deg, yaw {rms[2]:.2f} deg, alt {rms[3]:.2f} m")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import math
+import sys
+import time
+import timeit
+import numpy as np
+import fastmath
+from guidance import Guidance
+from navigation import Navigation
+from replay import SimClock
+from sensor_buffers import make_sensor_rings
+
+N_ACCURACY = 2_000_000
+N_VECTOR = 100_000
+CROSSOVER_SIZES = (64, 256, 1024, 4096)
+ASYNC_WINDOWS = (4, 2048)  # IMU samples per process_async call: a 250 Hz tick at 1 kHz, a stall backlog
+
+
+def accuracy():
+    """Max / RMS absolute error of each fast kernel against math over its documented domain."""
+    rng = np.random.default_rng(0)
+    angles = rng.uniform(-4 * math.pi, 4 * math.pi, N_ACCURACY)
+    y = rng.normal(size=N_ACCURACY) * rng.choice([1e-3, 1.0, 1e3], N_ACCURACY)
+    x = rng.normal(size=N_ACCURACY) * rng.choice([1e-3, 1.0, 1e3], N_ACCURACY)
+    pressure = rng.uniform(0.25, 1.15, N_ACCURACY) * 101325.0
+    cases = (("sin", np.sin, (angles,)), ("cos", np.cos, (angles,)),
+             ("atan2", np.arctan2, (y, x)),
+             ("baro_altitude", fastmath.baro_altitude_exact_v, (pressure,)))
+
+    rows = []
+    sample = slice(0, N_ACCURACY, 20)  # the scalar forms are run one value at a time
+    for name, exact, args in cases:
+        err_v = np.abs(getattr(fastmath, name + "_v")(*args) - exact(*args))
+        scalar = getattr(fastmath, name)
+        sub = [a[sample] for a in args]
+        approx = np.array([scalar(*v) for v in zip(*(a.tolist() for a in sub))])
+        err_s = np.abs(approx - exact(*sub))
+        rows.append((name, float(err_s.max()), float(np.sqrt(np.mean(err_s ** 2))),
+                     float(err_v.max()), float(np.sqrt(np.mean(err_v ** 2)))))
+    return rows
+
+
+def _best(stmt, number, env):
+    return min(timeit.repeat(stmt, globals=env, number=number, repeat=5)) / number
+
+
+def speed():
+    """ns per call (scalar) and per element (vector): libm / float64 NumPy vs the fast forms."""
+    rng = np.random.default_rng(1)
+    env = {"math": math, "np": np, "fastmath": fastmath, "a": 1.234, "b": -0.7, "p": 95000.0,
+           "arr": rng.uniform(-10, 10, N_VECTOR), "arr2": rng.uniform(-10, 10, N_VECTOR),
+           "parr": rng.uniform(0.5, 1.1, N_VECTOR) * 101325.0}
+    cases = (("sin", "math.sin(a)", "fastmath.sin(a)", "np.sin(arr)", "fastmath.sin_v(arr)"),
+             ("cos", "math.cos(a)", "fastmath.cos(a)", "np.cos(arr)", "fastmath.cos_v(arr)"),
+             ("atan2", "math.atan2(a, b)", "fastmath.atan2(a, b)",
+              "np.arctan2(arr, arr2)", "fastmath.atan2_v(arr, arr2)"),
+             ("baro_altitude", "fastmath.baro_altitude_exact(p)", "fastmath.baro_altitude(p)",
+              "fastmath.baro_altitude_exact_v(parr)", "fastmath.baro_altitude_v(parr)"))
+    rows = []
+    for name, s_exact, s_fast, v_exact, v_fast in cases:
+        rows.append((name,
+                     _best(s_exact, 100_000, env) * 1e9, _best(s_fast, 100_000, env) * 1e9,
+                     _best(v_exact, 20, env) / N_VECTOR * 1e9, _best(v_fast, 20, env) / N_VECTOR * 1e9))
+    return rows
+
+
+def crossover():
+    """Speedup of the float32 path over float64 NumPy per array length, with the length cut-offs disabled."""
+    rng = np.random.default_rng(2)
+    cases = (("sin", np.sin, fastmath.sin_v, 1), ("atan2", np.arctan2, fastmath.atan2_v, 2),
+             ("baro_altitude", fastmath.baro_altitude_exact_v, fastmath.baro_altitude_v, 1))
+    cut_offs = fastmath.TRIG_VECTOR_MIN, fastmath.VECTOR_MIN
+    fastmath.TRIG_VECTOR_MIN = fastmath.VECTOR_MIN = 0
+    try:
+        rows = []
+        for name, exact, fast, arity in cases:
+            speedups = []
+            for n in CROSSOVER_SIZES:
+                env = {"exact": exact, "fast": fast,
+                       "args": [rng.uniform(0.5, 1.1, n) * 101325.0 for _ in range(arity)]}
+                speedups.append(_best("exact(*args)", 2000, env) / _best("fast(*args)", 2000, env))
+            rows.append((name, speedups))
+        return rows
+    finally:
+        fastmath.TRIG_VECTOR_MIN, fastmath.VECTOR_MIN = cut_offs
+
+
+def stage_speed():
+    """us per call of the stages that use the kernels, per fast-math mode."""
+    mpu = [[100, -200, 16384, 10, -5, 3]] * 4
+    gps, mag, baro = [[12.97, 77.59, 100.0]], [[0.3, 0.01, -0.4]], [[100000.0, 25.0, 40.0]]
+    rc = [1500, 1500, 1500, 1500]
+    rows = []
+    for mode in fastmath.MODES:
+        nav = Navigation(fast_math=mode)
+        guidance = Guidance(clock=SimClock(0.0), fast_math=mode)
+        state = nav.process(mpu, gps, mag, baro)
+        guidance.process(state, 2, False, False, rc)
+        env = {"nav": nav, "guidance": guidance, "mpu": mpu, "gps": gps, "mag": mag, "baro": baro,
+               "state": state, "rc": rc}
+        t_nav = _best("nav.process(mpu, gps, mag, baro)", 5000, env) * 1e6
+        t_guid = _best("guidance.process(state, 2, False, False, rc)", 5000, env) * 1e6
+        t_async = [_async_call(mode, n) for n in ASYNC_WINDOWS]
+        rows.append((mode, t_nav, t_guid, t_async, state))
+    return rows
+
+
+def _async_call(mode, n, calls=200):
+    """us per Navigation.process_async call (complementary backend) over windows of n IMU and n // 20 baro samples."""
+    nav = Navigation(fast_math=mode)
+    rings = make_sensor_rings(4 * n)
+    rng = np.random.default_rng(3)
+    imu = np.column_stack([rng.normal(0, 200, (n, 2)), rng.normal(16384, 200, n), rng.normal(0, 40, (n, 3))])
+    baro = np.column_stack([rng.normal(100000.0, 5.0, max(n // 20, 1)), np.full((max(n // 20, 1), 2), 25.0)])
+    rings["gps"].push(0.0, [12.97, 77.59, 100.0])
+    best = None
+    for k in range(calls):
+        t0 = k * n * 0.001
+        rings["mpu6050"].push_many(t0 + np.arange(n) * 0.001, imu)
+        rings["baro"].push_many(t0 + np.arange(len(baro)) * 0.02, baro)
+        start = time.perf_counter()
+        nav.process_async(rings)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e6
+
+
+def main():
+    rows = accuracy()
+    print(f"Accuracy (absolute error vs math, {N_ACCURACY} vector / {N_ACCURACY // 20} scalar samples)")
+    print(f"{'kernel':<15} {'scalar max':>11} {'rms':>9} {'vector max':>11} {'rms':>9}")
+    for name, s_max, s_rms, v_max, v_rms in rows:
+        print(f"{name:<15} {s_max:11.2e} {s_rms:9.2e} {v_max:11.2e} {v_rms:9.2e}")
+
+    # Speedups are measured here, not assumed: below 1x means the approximation is slower
+    print(f"\nSpeed (scalar ns/call, vector ns/element over {N_VECTOR})")
+    print(f"{'kernel':<15} {'libm':>8} {'table':>8} {'speedup':>8} {'np f64':>8} {'f32 _v':>8} {'speedup':>8}")
+    for name, s_exact, s_fast, v_exact, v_fast in speed():
+        print(f"{name:<15} {s_exact:8.1f} {s_fast:8.1f} {s_exact / s_fast:7.2f}x "
+              f"{v_exact:8.2f} {v_fast:8.2f} {v_exact / v_fast:7.2f}x")
+
+    print(f"\nfloat32 speedup by array length (cut-offs: sin/cos {fastmath.TRIG_VECTOR_MIN}, "
+          f"atan2/baro {fastmath.VECTOR_MIN})")
+    print(f"{'kernel':<15} " + " ".join(f"{n:>7}" for n in CROSSOVER_SIZES))
+    for name, speedups in crossover():
+        print(f"{name:<15} " + " ".join(f"{x:6.2f}x" for x in speedups))
+
+    print("\nStages (us/call, speedup vs exact)")
+    stages = stage_speed()
+    _, nav_ref, guid_ref, async_ref, reference = stages[0]
+    for mode, t_nav, t_guid, t_async, state in stages:
+        drift = max(abs(a - b) for a, b in zip(state, reference))
+        print(f"{mode:<6} navigation {t_nav:6.2f} ({nav_ref / t_nav:4.2f}x)   "
+              f"guidance POS_HOLD {t_guid:6.2f} ({guid_ref / t_guid:4.2f}x)   max output change {drift:.1e}")
+        print("       process_async " + "   ".join(
+            f"{n} IMU samples {t:8.1f} ({ref / t:4.2f}x)" for n, t, ref in zip(ASYNC_WINDOWS, t_async, async_ref)))
+
+    limits = {"sin": (5e-6, 2e-6), "cos": (5e-6, 2e-6), "atan2": (2e-6, 5e-7), "baro_altitude": (1e-3, 5e-3)}
+    failed = [name for name, s_max, _, v_max, _ in rows
+              if s_max > limits[name][0] or v_max > limits[name][1]]
+    if failed:
+        print(f"\nFAIL: documented error bound exceeded for {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
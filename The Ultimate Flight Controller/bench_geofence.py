@@ -0,0 +1,66 @@
+import math
+import random
+import timeit
+import numpy as np
+from geodesy import LocalFrame
+from geofence import Geofence, points_in_polygon
+from guidance import Guidance
+
+HOME = (12.9716, 77.5946)
+LOOP_BUDGET_US = 1e6 / 500  # 500 Hz loop
+
+
+def star_polygon(n, radius_m, rng):
+    """Wavy fence of n vertices around HOME with small jitter, as (lat, lon) pairs."""
+    m_per_deg = 111320.0
+    pts = []
+    for k in range(n):
+        a = 2 * math.pi * k / n
+        r = radius_m * (1.0 + 0.25 * math.sin(3 * a) + 0.01 * rng.random())
+        pts.append((HOME[0] + r * math.cos(a) / m_per_deg,
+                    HOME[1] + r * math.sin(a) / (m_per_deg * math.cos(math.radians(HOME[0])))))
+    return pts
+
+
+def main():
+    rng = random.Random(0)
+    frame = LocalFrame(*HOME)
+    print(f"{'vertices':>8} {'build (ms)':>11} {'check (us)':>11} {'brute (us)':>11} "
+          f"{'% budget':>9} {'mismatch':>9}")
+    for n in (100, 1000, 5000, 20000):
+        fence = Geofence(inclusion=[star_polygon(n, 2000.0, rng)],
+                         exclusion=[star_polygon(n // 10 + 3, 300.0, rng)], max_altitude=1200.0)
+        build = timeit.timeit(lambda: fence.project(frame), number=1)
+
+        probes = [(HOME[0] + rng.uniform(-0.02, 0.02), HOME[1] + rng.uniform(-0.02, 0.02)) for _ in range(2000)]
+        it = iter(probes * 1000)
+        t_check = timeit.timeit(lambda: fence.check(*next(it), 900.0), number=20000) / 20000
+
+        # Brute-force reference: ray cast against every edge
+        incl = fence.inclusion[0]
+        dn, de = frame.delta_ne(frame.lat0, frame.lon0, np.array([p[0] for p in probes]), np.array([p[1] for p in probes]))
+        ref = points_in_polygon(de, dn, incl.x, incl.y)
+        got = np.array([incl.contains(x, y) for x, y in zip(de.tolist(), dn.tolist())])
+        t_brute = timeit.timeit(lambda: points_in_polygon(de[:1], dn[:1], incl.x, incl.y), number=200) / 200
+
+        print(f"{n:>8} {build * 1e3:>11.1f} {t_check * 1e6:>11.2f} {t_brute * 1e6:>11.1f} "
+              f"{100 * t_check * 1e6 / LOOP_BUDGET_US:>8.2f}% {int((ref != got).sum()):>9}")
+
+    # End-to-end: Guidance tick cost with and without a 5000-vertex fence
+    def guidance_tick_us(fence):
+        g = Guidance()
+        if fence is not None:
+            g.set_geofence(fence)
+        state = [HOME[0], HOME[1], 900.0, 0.0, 0.0, 0.0]
+        for _ in range(5):
+            g.process(state, 3, False, False, [1500, 1500, 1500, 1500])
+        return timeit.timeit(lambda: g.process(state, 3, False, False, [1500, 1500, 1500, 1500]),
+                             number=20000) / 20000 * 1e6
+
+    fence = Geofence(inclusion=[star_polygon(5000, 2000.0, rng)], max_altitude=1200.0)
+    print(f"Guidance.process PosHold: {guidance_tick_us(None):.2f} us without fence, "
+          f"{guidance_tick_us(fence):.2f} us with 5000-vertex fence")
+
+
+if __name__ == "__main__":
+    main()
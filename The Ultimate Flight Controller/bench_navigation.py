@@ -0,0 +1,35 @@
+import random
+import timeit
+import numpy as np
+from navigation import Navigation
+
+
+def make_burst(n):
+    mpu = [[random.gauss(0, 200), random.gauss(0, 200), random.gauss(16384, 200),
+            random.gauss(0, 50), random.gauss(0, 50), random.gauss(0, 50)] for _ in range(n)]
+    gps = [[12.9716 + random.gauss(0, 1e-6), 77.5946 + random.gauss(0, 1e-6), 920.0] for _ in range(n)]
+    mag = [[random.gauss(0.2, 0.01), random.gauss(0.0, 0.01), random.gauss(-0.4, 0.01)] for _ in range(n)]
+    baro = [[random.gauss(91000, 5), 25.0, 40.0] for _ in range(n)]
+    return mpu, gps, mag, baro
+
+
+def main():
+    random.seed(0)
+    print(f"{'samples':>8} {'list (us)':>12} {'batch (us)':>12} {'speedup':>8} {'max diff':>10}")
+    for n in (1, 10, 100, 500, 1000):
+        lists = make_burst(n)
+        arrays = [np.array(x) for x in lists]
+
+        nav_list, nav_batch = Navigation(), Navigation()
+        out_list = nav_list.process(*lists)
+        out_batch = nav_batch.process_batch(*arrays)
+        diff = max(abs(a - b) for a, b in zip(out_list, out_batch))
+
+        reps = max(20, 20000 // n)
+        t_list = min(timeit.repeat(lambda: nav_list.process(*lists), number=reps, repeat=3)) / reps
+        t_batch = min(timeit.repeat(lambda: nav_batch.process_batch(*arrays), number=reps, repeat=3)) / reps
+        print(f"{n:>8} {t_list * 1e6:>12.1f} {t_batch * 1e6:>12.1f} {t_list / t_batch:>7.1f}x {diff:>10.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+from control import Control
+from guidance import Guidance, Mode
+from navigation import Navigation
+from replay import SimClock
+
+RATE_HZ = 250
+HOME = (12.9716, 77.5946)
+STAGES = ("navigation", "guidance", "control", "end_to_end")
+
+# name -> (flight modes cycled through, guided command or None)
+SCENARIOS = {
+    "stabilize": ((Mode.STABILIZE,), None),
+    "alt_hold": ((Mode.ALT_HOLD,), None),
+    "pos_hold": ((Mode.POS_HOLD,), None),
+    "guided_goto": ((Mode.GUIDED,), ("goto", {"lat": HOME[0] + 0.0005, "lon": HOME[1] + 0.0005,
+                                              "altitude": 20.0})),
+    "rtl": ((Mode.RTL,), None),
+    "mixed": ((Mode.STABILIZE, Mode.ALT_HOLD, Mode.POS_HOLD, Mode.GUIDED, Mode.RTL),
+              ("goto", {"lat": HOME[0] + 0.0005, "lon": HOME[1] + 0.0005, "altitude": 20.0}))
+}
+MODE_PERIOD = 250  # ticks spent in each mode of a cycling scenario
+BURST_SIZES = (1, 4, 16)
+COMPARED_METRICS = ("mean_us", "p99_us")  # latencies a baseline comparison gates on
+MAX_TOLERANCE = 0.3  # a gate looser than this would not catch a realistic regression
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+
+class SensorSim:
+    """Raw sensor bursts for a vehicle drifting away from home while rocking gently."""
+
+    def __init__(self, burst, seed=0):
+        self.burst = burst
+        self.rng = random.Random(seed)
+        self.tick = 0
+
+    def read(self):
+        rng, n = self.rng, self.burst
+        t = self.tick / RATE_HZ
+        self.tick += 1
+        roll, pitch = 0.1 * math.sin(0.7 * t), 0.08 * math.sin(0.5 * t + 1.0)
+        ax, ay, az = -math.sin(pitch) * 16384, math.sin(roll) * 16384, math.cos(roll) * math.cos(pitch) * 16384
+        mpu = [[ax + rng.gauss(0, 150), ay + rng.gauss(0, 150), az + rng.gauss(0, 150),
+                rng.gauss(0, 40), rng.gauss(0, 40), rng.gauss(0, 40)] for _ in range(n)]
+        drift = 2e-6 * t
+        gps = [[HOME[0] + drift, HOME[1] + drift, 10.0 + rng.gauss(0, 0.5)] for _ in range(n)]
+        mag = [[0.3 + rng.gauss(0, 0.01), rng.gauss(0, 0.01), -0.4 + rng.gauss(0, 0.01)] for _ in range(n)]
+        baro = [[101205.0 + rng.gauss(0, 5), 25.0, 40.0] for _ in range(n)]
+        return mpu, gps, mag, baro
+
+
+def _make_stack(scenario, burst):
+    clock = SimClock(0.0)
+    stack = {
+        "clock": clock,
+        "sensors": SensorSim(burst),
+        "navigation": Navigation(clock=clock),
+        "guidance": Guidance(clock=clock),
+        "control": Control(clock=clock)
+    }
+    command = SCENARIOS[scenario][1]
+    if command is not None:
+        stack["guidance"].set_guided_command(*command)
+    return stack
+
+
+def _inputs(scenario, tick):
+    modes = SCENARIOS[scenario][0]
+    mode = modes[(tick // MODE_PERIOD) % len(modes)]
+    return int(mode), False, False, [1500, 1500, 1500, 1500]
+
+
+def _run(scenario, burst, ticks, warmup, measure):
+    """Run the stack, calling measure(stage, fn, *args) for every stage call."""
+    stack = _make_stack(scenario, burst)
+    clock, sensors = stack["clock"], stack["sensors"]
+    nav, guidance, control = stack["navigation"], stack["guidance"], stack["control"]
+    direct = lambda stage, fn, *args: fn(*args)  # noqa: E731
+
+    for tick in range(warmup + ticks):
+        call = measure if tick >= warmup else direct
+        clock.set(tick / RATE_HZ)
+        readings = sensors.read()
+        inputs = _inputs(scenario, tick)
+
+        def stack_tick():
+            state = call("navigation", nav.process, *readings)
+            out = call("guidance", guidance.process, state, *inputs)
+            return call("control", control.process, state, out)
+
+        if call is direct:
+            stack_tick()
+        else:
+            measure("end_to_end", stack_tick)
+
+
+def measure_latency(scenario, burst, ticks, warmup):
+    samples = {stage: [] for stage in STAGES}
+    clock = time.perf_counter_ns
+
+    def measure(stage, fn, *args):
+        start = clock()
+        result = fn(*args)
+        samples[stage].append(clock() - start)
+        return result
+
+    _run(scenario, burst, ticks, warmup, measure)
+    stats = {}
+    for stage, values in samples.items():
+        us = np.asarray(values, dtype=float) / 1000.0
+        stats[stage] = {"mean_us": float(us.mean()), "p99_us": float(np.percentile(us, 99)),
+                        "max_us": float(us.max())}
+    return stats
+
+
+def measure_allocations(scenario, burst, ticks, warmup):
+    """
+    Mean bytes per call, per stage: alloc_bytes is the transient peak during
+    the call, retained_bytes what is still allocated afterwards (including
+    the returned object; negative when the call frees older state).
+    """
+    peak = {stage: 0 for stage in STAGES}
+    retained = {stage: 0 for stage in STAGES}
+    depth = []
+
+    def measure(stage, fn, *args):
+        if depth:
+            return fn(*args)  # stages inside end_to_end are measured in their own pass
+        depth.append(stage)
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        result = fn(*args)
+        current, high = tracemalloc.get_traced_memory()
+        depth.pop()
+        peak[stage] += high - before
+        retained[stage] += current - before
+        return result
+
+    tracemalloc.start()
+    try:
+        # One pass per stage so the outer end_to_end measurement does not hide the inner ones
+        for target in STAGES:
+            def only(stage, fn, *args, target=target):
+                return measure(stage, fn, *args) if stage == target else fn(*args)
+            _run(scenario, burst, ticks, warmup, only)
+    finally:
+        tracemalloc.stop()
+    return {stage: {"alloc_bytes": peak[stage] / ticks, "retained_bytes": retained[stage] / ticks}
+            for stage in STAGES}
+
+
+def _host():
+    """Where a report was measured; latencies only compare across reports from the same host."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "node": platform.node(),
+        "system": f"{platform.system()} {platform.release()}",
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "implementation": platform.python_implementation(),
+        "commit": commit
+    }
+
+
+def baseline_path(host=None):
+    """Baselines are per host: latencies only compare with a report from the same machine."""
+    return os.path.join(BASELINE_DIR, f"{host or platform.node() or 'host'}.json")
+
+
+def run_suite(ticks=2000, warmup=200, scenarios=None, bursts=BURST_SIZES, repeat=5, tolerance=0.25):
+    """
+    Latency is the median of `repeat` runs per metric, so one disturbed run
+    moves neither the report nor the noise estimate. meta.noise is the median
+    over all compared latencies of their relative median absolute deviation
+    across runs. The stored tolerance is at least three times that, capped at
+    MAX_TOLERANCE; meta.reliable is False when the cap had to cut it.
+    """
+    results = {}
+    spreads = []
+    for scenario in scenarios or SCENARIOS:
+        for burst in bursts:
+            runs = [measure_latency(scenario, burst, ticks, warmup) for _ in range(repeat)]
+            latency = {stage: {metric: float(np.median([run[stage][metric] for run in runs]))
+                               for metric in runs[0][stage]}
+                       for stage in STAGES}
+            for stage in STAGES:
+                for metric in COMPARED_METRICS:
+                    values = np.array([run[stage][metric] for run in runs])
+                    median = np.median(values)
+                    spreads.append(float(np.median(np.abs(values - median)) / median))
+            allocs = measure_allocations(scenario, burst, max(ticks // 4, 1), warmup)
+            results[f"{scenario}/burst{burst}"] = {
+                stage: {**latency[stage], **allocs[stage]} for stage in STAGES
+            }
+    noise = float(np.median(spreads)) if spreads else 0.0
+    needed = max(tolerance, math.ceil(3.0 * noise * 100) / 100)
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "host": _host(),
+            "ticks": ticks,
+            "warmup": warmup,
+            "repeat": repeat,
+            "noise": noise,
+            "tolerance": min(needed, MAX_TOLERANCE),
+            "reliable": needed <= MAX_TOLERANCE
+        },
+        "results": results
+    }
+
+
+def compare(report, baseline, tolerance=0.25, metrics=COMPARED_METRICS):
+    """Rows (case, stage, metric, baseline, current, ratio) that got slower than tolerance allows."""
+    regressions = []
+    for case, stages in report["results"].items():
+        base_stages = baseline.get("results", {}).get(case)
+        if base_stages is None:
+            continue
+        for stage, values in stages.items():
+            for metric in metrics:
+                base = base_stages.get(stage, {}).get(metric)
+                if base and values[metric] > base * (1 + tolerance):
+                    regressions.append((case, stage, metric, base, values[metric], values[metric] / base))
+    return regressions
+
+
+def print_report(report):
+    print(f"{'case':<22} {'stage':<11} {'mean us':>8} {'p99 us':>8} {'max us':>9} {'alloc B':>9} {'kept B':>8}")
+    for case, stages in report["results"].items():
+        for stage, v in stages.items():
+            print(f"{case:<22} {stage:<11} {v['mean_us']:8.2f} {v['p99_us']:8.2f} {v['max_us']:9.1f} "
+                  f"{v['alloc_bytes']:9.0f} {v['retained_bytes']:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage latency and allocation benchmark of the flight stack")
+    parser.add_argument("--ticks", type=int, default=2000, help="measured ticks per case")
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per case; the median is kept")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="limit to these scenarios (repeatable)")
+    parser.add_argument("--burst", type=int, action="append", help="sensor burst sizes (repeatable)")
+    parser.add_argument("--json", help="write the report as JSON")
+    parser.add_argument("--baseline", nargs="?", const=baseline_path(),
+                        help="compare against a JSON report (default: this host's baseline); exit 1 on regression")
+    parser.add_argument("--save-baseline", nargs="?", const=baseline_path(),
+                        help="write the report as a baseline (default: baselines/<host>.json)")
+    parser.add_argument("--tolerance", type=float, default=None,
+                        help="allowed slowdown (0.25 = 25 %%); defaults to the baseline's own tolerance")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    tolerance = args.tolerance
+    if tolerance is None:
+        tolerance = (baseline or {}).get("meta", {}).get("tolerance", 0.25)
+
+    report = run_suite(args.ticks, args.warmup, args.scenario, args.burst or BURST_SIZES, args.repeat, tolerance)
+    print_report(report)
+    for path in (args.json, args.save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+
+    meta = report["meta"]
+    print(f"\nRun-to-run noise {meta['noise']:.1%}, tolerance {tolerance:.0%}")
+    if not meta["reliable"]:
+        print(f"Warning: this host is too noisy to gate latency within {MAX_TOLERANCE:.0%}; "
+              f"record baselines on a quieter machine")
+    if baseline is not None:
+        base_meta = baseline.get("meta", {})
+        if base_meta.get("host", {}).get("node") != meta["host"]["node"]:
+            print(f"Warning: {args.baseline} was recorded on a different host")
+        if not base_meta.get("reliable", True):
+            print(f"Warning: {args.baseline} was recorded on a host too noisy to gate latency")
+        regressions = compare(report, baseline, tolerance)
+        if regressions:
+            print(f"\nRegressions vs {args.baseline} (> {tolerance:.0%} slower):")
+            for case, stage, metric, base, current, ratio in regressions:
+                print(f"  {case:<22} {stage:<11} {metric:<8} {base:8.2f} -> {current:8.2f} us ({ratio:.2f}x)")
+            sys.exit(1)
+        print(f"\nNo regressions vs {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
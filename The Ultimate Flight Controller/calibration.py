@@ -0,0 +1,245 @@
+import argparse
+import itertools
+import json
+import time
+import numpy as np
+
+# Profile format version written by CalibrationProfile.save()
+PROFILE_VERSION = 1
+
+# Columns of a raw capture, optionally preceded by a timestamp column
+CAPTURE_COLUMNS = ["ax", "ay", "az", "gx", "gy", "gz", "mx", "my", "mz"]
+
+ACCEL_1G_RAW = 16384.0  # MPU6050 +-2 g range
+
+
+class CalibrationProfile:
+    """
+    Fitted sensor corrections in raw sensor units:
+        accel: corrected = accel_matrix @ (raw - accel_bias)   (|corrected| = 1 g raw)
+        gyro : corrected = raw - gyro_bias
+        mag  : corrected = mag_matrix @ (raw - mag_bias)        (hard / soft iron)
+    """
+
+    def __init__(self, accel_bias=(0.0, 0.0, 0.0), accel_matrix=None, gyro_bias=(0.0, 0.0, 0.0),
+                 mag_bias=(0.0, 0.0, 0.0), mag_matrix=None, info=None):
+        self.accel_bias = np.asarray(accel_bias, dtype=float)
+        self.accel_matrix = np.eye(3) if accel_matrix is None else np.asarray(accel_matrix, dtype=float)
+        self.gyro_bias = np.asarray(gyro_bias, dtype=float)
+        self.mag_bias = np.asarray(mag_bias, dtype=float)
+        self.mag_matrix = np.eye(3) if mag_matrix is None else np.asarray(mag_matrix, dtype=float)
+        self.info = info or {}
+
+    def affine(self, sensor):
+        """(matrix, bias) so that corrected = matrix @ (raw - bias)."""
+        if sensor == "accel":
+            return self.accel_matrix, self.accel_bias
+        if sensor == "gyro":
+            return np.eye(3), self.gyro_bias
+        if sensor == "mag":
+            return self.mag_matrix, self.mag_bias
+        raise ValueError(f"Unknown sensor: {sensor}")
+
+    def to_dict(self):
+        return {
+            "version": PROFILE_VERSION,
+            "accel": {"bias": self.accel_bias.tolist(), "matrix": self.accel_matrix.tolist()},
+            "gyro": {"bias": self.gyro_bias.tolist()},
+            "mag": {"bias": self.mag_bias.tolist(), "matrix": self.mag_matrix.tolist()},
+            "info": self.info
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        version = data.get("version")
+        if version != PROFILE_VERSION:
+            raise ValueError(f"Unsupported calibration profile version: {version}")
+        return cls(data["accel"]["bias"], data["accel"]["matrix"], data["gyro"]["bias"],
+                   data["mag"]["bias"], data["mag"]["matrix"], data.get("info"))
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+# -------------------------------
+# Streaming capture reader
+# -------------------------------
+def iter_capture(path, chunk_rows=500_000):
+    """
+    Yield (N, 9) float arrays of [ax..az, gx..gz, mx..mz] from a capture.
+    .npy files are memory-mapped; anything else is read as comma-separated
+    text in chunks (a leading timestamp column and '#' comments are allowed).
+    """
+    if str(path).endswith(".npy"):
+        data = np.load(path, mmap_mode="r")
+        first = data.shape[1] - len(CAPTURE_COLUMNS)
+        for start in range(0, len(data), chunk_rows):
+            yield np.asarray(data[start:start + chunk_rows, first:], dtype=float)
+        return
+
+    with open(path) as f:
+        while True:
+            lines = list(itertools.islice(f, chunk_rows))
+            if not lines:
+                return
+            block = np.loadtxt(lines, delimiter=",", comments="#", ndmin=2)
+            if len(block):
+                yield block[:, block.shape[1] - len(CAPTURE_COLUMNS):]
+
+
+# -------------------------------
+# Solvers
+# -------------------------------
+class EllipsoidFit:
+    """
+    Least-squares ellipsoid through 3-D samples, accumulated chunk by chunk.
+
+    Fits a x^2 + b y^2 + c z^2 + 2f yz + 2g xz + 2h xy + 2p x + 2q y + 2r z = 1.
+    Only the 9x9 normal equations are kept, so memory does not grow with
+    the capture. Samples are divided by a fixed scale taken from the first
+    chunk to keep the normal equations well conditioned.
+    """
+
+    def __init__(self):
+        self.DtD = np.zeros((9, 9))
+        self.Dt1 = np.zeros(9)
+        self.count = 0
+        self.scale = None
+
+    def add(self, xyz):
+        xyz = np.asarray(xyz, dtype=float)
+        if len(xyz) == 0:
+            return
+        if self.scale is None:
+            self.scale = float(np.linalg.norm(xyz, axis=1).mean()) or 1.0
+        x, y, z = (xyz / self.scale).T
+        D = np.column_stack((x * x, y * y, z * z, 2 * y * z, 2 * x * z, 2 * x * y, 2 * x, 2 * y, 2 * z))
+        self.DtD += D.T @ D
+        self.Dt1 += D.sum(axis=0)
+        self.count += len(xyz)
+
+    def solve(self, radius=None):
+        """
+        (centre, matrix) with |matrix @ (v - centre)| = radius on the fitted
+        ellipsoid. radius=None keeps the geometric-mean radius of the data.
+        """
+        if self.count < 9:
+            raise ValueError("Ellipsoid fit needs at least 9 samples")
+        a, b, c, f, g, h, p, q, r = np.linalg.solve(self.DtD, self.Dt1)
+        A = np.array([[a, h, g], [h, b, f], [g, f, c]])
+        centre = -np.linalg.solve(A, [p, q, r])
+        k = 1.0 + centre @ A @ centre
+        eigvals, eigvecs = np.linalg.eigh(A / k)
+        if np.any(eigvals <= 0):
+            raise ValueError("Samples do not describe an ellipsoid; rotate the sensor through more orientations")
+        axes = 1.0 / np.sqrt(eigvals)  # semi-axes in scaled units
+        if radius is None:
+            radius = float(np.prod(axes) ** (1.0 / 3.0)) * self.scale
+        matrix = eigvecs @ np.diag(np.sqrt(eigvals)) @ eigvecs.T * (radius / self.scale)
+        return centre * self.scale, matrix
+
+    def residual(self, xyz, centre, matrix, radius):
+        """RMS of |matrix @ (v - centre)| - radius over a sample block."""
+        norms = np.linalg.norm((np.asarray(xyz, dtype=float) - centre) @ matrix.T, axis=1)
+        return float(np.sqrt(np.mean((norms - radius) ** 2)))
+
+
+class StillGyroBias:
+    """
+    Gyro bias from the stationary parts of a capture. Samples are grouped in
+    fixed blocks; a block counts as still when both the accelerometer and
+    the gyro barely vary inside it.
+    """
+
+    def __init__(self, block=50, accel_tol=150.0, gyro_tol=15.0):
+        self.block = block
+        self.accel_tol = accel_tol   # raw accel std (about 0.01 g)
+        self.gyro_tol = gyro_tol     # raw gyro std (about 0.1 deg/s)
+        self.total = np.zeros(3)
+        self.count = 0
+
+    def add(self, acc, gyro):
+        n = len(gyro) // self.block * self.block
+        if n == 0:
+            return
+        acc_blocks = np.asarray(acc[:n], dtype=float).reshape(-1, self.block, 3)
+        gyro_blocks = np.asarray(gyro[:n], dtype=float).reshape(-1, self.block, 3)
+        still = ((np.linalg.norm(acc_blocks.std(axis=1), axis=1) < self.accel_tol) &
+                 (np.linalg.norm(gyro_blocks.std(axis=1), axis=1) < self.gyro_tol))
+        self.total += gyro_blocks[still].sum(axis=(0, 1))
+        self.count += int(still.sum()) * self.block
+
+    def solve(self):
+        if self.count == 0:
+            raise ValueError("No stationary segment found for the gyro bias")
+        return self.total / self.count
+
+
+class CalibrationSolver:
+    """Feed capture chunks, then solve() for a CalibrationProfile."""
+
+    def __init__(self, accel_1g=ACCEL_1G_RAW, still_block=50):
+        self.accel_1g = accel_1g
+        self.accel_fit = EllipsoidFit()
+        self.mag_fit = EllipsoidFit()
+        self.gyro_bias = StillGyroBias(still_block)
+        self.samples = 0
+        self._check = None  # largest chunk seen, for residuals
+
+    def add(self, chunk):
+        chunk = np.asarray(chunk, dtype=float)
+        acc, gyro, mag = chunk[:, 0:3], chunk[:, 3:6], chunk[:, 6:9]
+        self.accel_fit.add(acc)
+        self.mag_fit.add(mag)
+        self.gyro_bias.add(acc, gyro)
+        self.samples += len(chunk)
+        if self._check is None or len(chunk) > len(self._check):
+            self._check = chunk
+
+    def solve(self):
+        accel_bias, accel_matrix = self.accel_fit.solve(self.accel_1g)
+        mag_bias, mag_matrix = self.mag_fit.solve()
+        info = {"samples": self.samples, "still_samples": self.gyro_bias.count,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        if self._check is not None:
+            # Residuals on one chunk: how round the corrected data is
+            info["accel_rms_raw"] = self.accel_fit.residual(self._check[:, 0:3], accel_bias, accel_matrix,
+                                                            self.accel_1g)
+            radius = float(np.linalg.norm((self._check[:, 6:9] - mag_bias) @ mag_matrix.T, axis=1).mean())
+            info["mag_rms_rel"] = self.mag_fit.residual(self._check[:, 6:9], mag_bias, mag_matrix,
+                                                        radius) / max(radius, 1e-12)
+        return CalibrationProfile(accel_bias, accel_matrix, self.gyro_bias.solve(), mag_bias, mag_matrix, info)
+
+
+def calibrate_file(path, chunk_rows=500_000, **solver_args):
+    solver = CalibrationSolver(**solver_args)
+    for chunk in iter_capture(path, chunk_rows):
+        solver.add(chunk)
+    return solver.solve()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit IMU and magnetometer calibration from a raw capture")
+    parser.add_argument("capture", help=".npy or CSV capture with columns [t,] " + ",".join(CAPTURE_COLUMNS))
+    parser.add_argument("--out", default="calibration.json")
+    parser.add_argument("--chunk", type=int, default=500_000, help="rows per chunk")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    profile = calibrate_file(args.capture, args.chunk)
+    elapsed = time.perf_counter() - start
+    profile.save(args.out)
+    info = profile.info
+    print(f"Fitted {info['samples']} samples ({info['still_samples']} still) in {elapsed:.2f} s -> {args.out}")
+    print(f"accel bias {np.round(profile.accel_bias, 1).tolist()}  gyro bias {np.round(profile.gyro_bias, 2).tolist()}"
+          f"  mag bias {np.round(profile.mag_bias, 4).tolist()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,64 @@
 import time
 import math
 
+# Every PWM value as a preallocated int keyed by its float, so a tick can
+# produce PWM outputs without creating int objects (see _pwm)
+_PWM_INTS = {float(v): v for v in range(1000, 2001)}
+
+
+def _pwm(x):
+    """int(x) clamped to 1000..2000, looked up instead of allocated."""
+    x = 1000.0 if x < 1000.0 else 2000.0 if x > 2000.0 else x
+    return _PWM_INTS[x - x % 1.0]
+
+
+class PID:
+    """Per-axis PID state. Slotted so a tick only rebinds existing attributes."""
+    __slots__ = ("gains", "integral", "prev_error", "prev_derivative")
+
+    def __init__(self, gains):
+        self.gains = gains  # (Kp, Ki, Kd)
+        self.reset()
+
+    def reset(self):
+        self.integral = 0.0
+        self.prev_error = 0.0
+        self.prev_derivative = 0.0
+
+    def update(self, error, dt, tau, low, high):
+        kp, ki, kd = self.gains
+        self.integral += error * dt
+
+        derivative = (error - self.prev_error) / dt
+        derivative = self.prev_derivative + tau / (tau + dt) * (derivative - self.prev_derivative)
+        self.prev_derivative = derivative
+        self.prev_error = error
+
+        output = kp * error + ki * self.integral + kd * derivative
+        return low if output < low else high if output > high else output  # Clamp (min/max allocate an args tuple)
+
+
+def _gains_property(pid_name):
+    def fget(self):
+        return getattr(self, pid_name).gains
+
+    def fset(self, gains):
+        getattr(self, pid_name).gains = gains
+
+    return property(fget, fset)
+
+
 class Control:
-    def __init__(self):
-        self.prev_time = time.time()
+    # PID gains (Kp, Ki, Kd), stored on the per-axis PID objects
+    roll_gains = _gains_property("roll_pid")
+    pitch_gains = _gains_property("pitch_pid")
+    yaw_gains = _gains_property("yaw_pid")
+    alt_gains = _gains_property("alt_pid")
+
+    def __init__(self, clock=time.time, no_alloc=False):
+        # Time source; swap in a simulated clock for offline replay
+        self.clock = clock
+        self.prev_time = self.clock()
 
         # Limits
         self.max_roll_deg = 30.0
@@ -12,51 +67,57 @@ class Control:
         self.alt_limit = (0.0, 1.0)  # throttle [0–1]
 
         # PID state
-        self.roll_integral = 0.0
-        self.pitch_integral = 0.0
-        self.yaw_integral = 0.0
-        self.alt_integral = 0.0
-
-        self.prev_roll_error = 0.0
-        self.prev_pitch_error = 0.0
-        self.prev_yaw_error = 0.0
-        self.prev_alt_error = 0.0
-
-        self.prev_roll_derivative = 0.0
-        self.prev_pitch_derivative = 0.0
-        self.prev_yaw_derivative = 0.0
-        self.prev_alt_derivative = 0.0
-
-        # PID gains (Kp, Ki, Kd)
-        self.roll_gains = (1.0, 0.0, 0.2)
-        self.pitch_gains = (1.0, 0.0, 0.2)
-        self.yaw_gains = (1.5, 0.0, 0.3)
-        self.alt_gains = (1.0, 0.05, 0.2)
+        self.roll_pid = PID((1.0, 0.0, 0.2))
+        self.pitch_pid = PID((1.0, 0.0, 0.2))
+        self.yaw_pid = PID((1.5, 0.0, 0.3))
+        self.alt_pid = PID((1.0, 0.05, 0.2))
 
         self.filter_tau = 0.02  # Low-pass filter time constant
 
-    def _dt(self):
-        now = time.time()
-        dt = now - self.prev_time
-        self.prev_time = now
-        return max(dt, 1e-3)
+        # With no_alloc, process() updates and returns the same output record
+        # every tick; callers must copy it if they keep it past the next tick.
+        self.no_alloc = no_alloc
+        self._output = self._new_output()
+
+        # Optional span recording, see set_tracer
+        self.tracer = None
+        self._trace_ids = ()
 
-    def _pid(self, error, prev_error, integral, prev_derivative, gains, limits, dt):
-        kp, ki, kd = gains
-        integral += error * dt
+    def set_tracer(self, tracer):
+        """Record spans per process() call, PID axis and the mixer into a tracing.Tracer; None disables."""
+        self.tracer = tracer
+        if tracer is not None:
+            self._trace_ids = tuple(tracer.intern("control." + name) for name in
+                                    ("process", "roll_pid", "pitch_pid", "yaw_pid", "alt_pid", "mixer"))
 
-        derivative = (error - prev_error) / dt
-        derivative = prev_derivative + self.filter_tau / (self.filter_tau + dt) * (derivative - prev_derivative)
+    @staticmethod
+    def _new_output():
+        return {
+            "roll_pwm": 1500,
+            "pitch_pwm": 1500,
+            "yaw_pwm": 1500,
+            "thrust_pwm": 1000,
+            "motors": {"M1": 1000, "M2": 1000, "M3": 1000, "M4": 1000}
+        }
 
-        output = kp * error + ki * integral + kd * derivative
-        output = max(limits[0], min(limits[1], output))  # Clamp
+    def _dt(self):
+        now = self.clock()
+        dt = now - self.prev_time
+        self.prev_time = now
+        return dt if dt > 1e-3 else 1e-3
 
-        return output, integral, derivative
+    @staticmethod
+    def _to_pwm(val, max_val):
+        return 1500.0 + (val / max_val) * 500.0
 
     def process(self, nav_state, guidance_out):
+        tracer = self.tracer
+        if tracer is not None:
+            t_start = tracer.now()
         _, _, curr_alt, curr_roll, curr_pitch, curr_yaw = nav_state
         mode = guidance_out["mode"]
         dt = self._dt()
+        tau = self.filter_tau
 
         # Errors
         roll_err = guidance_out["desired_roll"] - curr_roll
@@ -65,47 +126,31 @@ class Control:
         alt_err = guidance_out["desired_thrust"] - curr_alt
 
         # PID Controllers
-        roll_cmd, self.roll_integral, self.prev_roll_derivative = self._pid(
-            roll_err, self.prev_roll_error, self.roll_integral, self.prev_roll_derivative,
-            self.roll_gains, (-self.max_roll_deg, self.max_roll_deg), dt
-        )
-        self.prev_roll_error = roll_err
-
-        pitch_cmd, self.pitch_integral, self.prev_pitch_derivative = self._pid(
-            pitch_err, self.prev_pitch_error, self.pitch_integral, self.prev_pitch_derivative,
-            self.pitch_gains, (-self.max_pitch_deg, self.max_pitch_deg), dt
-        )
-        self.prev_pitch_error = pitch_err
-
-        yaw_cmd, self.yaw_integral, self.prev_yaw_derivative = self._pid(
-            yaw_err, self.prev_yaw_error, self.yaw_integral, self.prev_yaw_derivative,
-            self.yaw_gains, (-self.max_yaw_rate_deg, self.max_yaw_rate_deg), dt
-        )
-        self.prev_yaw_error = yaw_err
+        if tracer is not None:
+            t_roll = tracer.now()
+        roll_cmd = self.roll_pid.update(roll_err, dt, tau, -self.max_roll_deg, self.max_roll_deg)
+        if tracer is not None:
+            t_pitch = tracer.now()
+        pitch_cmd = self.pitch_pid.update(pitch_err, dt, tau, -self.max_pitch_deg, self.max_pitch_deg)
+        if tracer is not None:
+            t_yaw = tracer.now()
+        yaw_cmd = self.yaw_pid.update(yaw_err, dt, tau, -self.max_yaw_rate_deg, self.max_yaw_rate_deg)
+        if tracer is not None:
+            t_alt = tracer.now()
 
         # Altitude: If Stabilize, use throttle directly
         if mode == "Stabilize":
             thrust = guidance_out["desired_thrust"]
         else:
-            thrust, self.alt_integral, self.prev_alt_derivative = self._pid(
-                alt_err, self.prev_alt_error, self.alt_integral, self.prev_alt_derivative,
-                self.alt_gains, self.alt_limit, dt
-            )
-            self.prev_alt_error = alt_err
+            thrust = self.alt_pid.update(alt_err, dt, tau, self.alt_limit[0], self.alt_limit[1])
+        if tracer is not None:
+            t_mix = tracer.now()
 
         # Convert to PWM
-        def to_pwm(val, max_val):
-            return int(1500 + (val / max_val) * 500)
-
-        roll_pwm = to_pwm(roll_cmd, self.max_roll_deg)
-        pitch_pwm = to_pwm(pitch_cmd, self.max_pitch_deg)
-        yaw_pwm = to_pwm(yaw_cmd, self.max_yaw_rate_deg)
-        thrust_pwm = int(1000 + thrust * 1000)
-
-        roll_pwm = max(1000, min(2000, roll_pwm))
-        pitch_pwm = max(1000, min(2000, pitch_pwm))
-        yaw_pwm = max(1000, min(2000, yaw_pwm))
-        thrust_pwm = max(1000, min(2000, thrust_pwm))
+        roll_pwm = _pwm(self._to_pwm(roll_cmd, self.max_roll_deg))
+        pitch_pwm = _pwm(self._to_pwm(pitch_cmd, self.max_pitch_deg))
+        yaw_pwm = _pwm(self._to_pwm(yaw_cmd, self.max_yaw_rate_deg))
+        thrust_pwm = _pwm(1000.0 + thrust * 1000.0)
 
         # Motor mixing (X quad)
         m1 = thrust_pwm - pitch_cmd + roll_cmd + yaw_cmd  # Front left (CW)
@@ -113,19 +158,26 @@ class Control:
         m3 = thrust_pwm + pitch_cmd - roll_cmd + yaw_cmd  # Rear right (CW)
         m4 = thrust_pwm + pitch_cmd + roll_cmd - yaw_cmd  # Rear left (CCW)
 
-        def clamp_pwm(x): return int(max(1000, min(2000, x)))
-
-        motor_pwms = {
-            "M1": clamp_pwm(m1),
-            "M2": clamp_pwm(m2),
-            "M3": clamp_pwm(m3),
-            "M4": clamp_pwm(m4)
-        }
-
-        return {
-            "roll_pwm": roll_pwm,
-            "pitch_pwm": pitch_pwm,
-            "yaw_pwm": yaw_pwm,
-            "thrust_pwm": thrust_pwm,
-            "motors": motor_pwms
-        }
+        out = self._output if self.no_alloc else self._new_output()
+        out["roll_pwm"] = roll_pwm
+        out["pitch_pwm"] = pitch_pwm
+        out["yaw_pwm"] = yaw_pwm
+        out["thrust_pwm"] = thrust_pwm
+
+        motor_pwms = out["motors"]
+        motor_pwms["M1"] = _pwm(m1)
+        motor_pwms["M2"] = _pwm(m2)
+        motor_pwms["M3"] = _pwm(m3)
+        motor_pwms["M4"] = _pwm(m4)
+
+        if tracer is not None:
+            ids = self._trace_ids
+            t_end = tracer.now()
+            tracer.add(ids[0], t_start, t_end)
+            tracer.add(ids[1], t_roll, t_pitch)
+            tracer.add(ids[2], t_pitch, t_yaw)
+            tracer.add(ids[3], t_yaw, t_alt)
+            if mode != "Stabilize":
+                tracer.add(ids[4], t_alt, t_mix)
+            tracer.add(ids[5], t_mix, t_end)
+        return out
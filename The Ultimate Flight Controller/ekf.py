@@ -0,0 +1,262 @@
+import math
+import numpy as np
+
+GRAVITY = 9.80665
+
+# State indices: quaternion (body -> world, ZYX), gyro bias (rad/s), altitude (m), climb rate (m/s)
+Q0, Q1, Q2, Q3 = 0, 1, 2, 3
+BX, BY, BZ = 4, 5, 6
+ALT, VZ = 7, 8
+N_STATES = 9
+
+
+class QuaternionEKF:
+    """
+    Extended Kalman filter for attitude, gyro bias and altitude.
+
+    Predicts with the gyro (bias-corrected) and the gravity-compensated
+    vertical acceleration, then applies sequential scalar updates: the
+    accelerometer gravity direction (gated on |a| close to g), magnetometer
+    yaw, baro altitude and GPS altitude. Every matrix, view and scratch
+    vector is allocated once in __init__ and updated in place, and scalars
+    are read with item() and written element by element, so a step
+    allocates nothing (bench_ekf.py checks the peak per step).
+    """
+
+    def __init__(self, gyro_noise=0.02, bias_noise=1e-4, accel_noise=0.5,
+                 acc_meas_noise=0.05, mag_yaw_noise=0.1, baro_noise=1.0, gps_alt_noise=5.0,
+                 accel_gate=0.15):
+        self.x = np.zeros(N_STATES)
+        self.x[Q0] = 1.0
+        self.P = np.eye(N_STATES) * 0.1
+        self.P[BX:BZ + 1, BX:BZ + 1] *= 0.01
+        self.P[ALT, ALT] = 10.0
+        self.P[VZ, VZ] = 1.0
+
+        # Continuous process noise densities, scaled by dt every step
+        self.Q = np.zeros(N_STATES)
+        self.Q[Q0:Q3 + 1] = gyro_noise ** 2 * 0.25
+        self.Q[BX:BZ + 1] = bias_noise ** 2
+        self.Q[ALT] = (accel_noise * 0.01) ** 2
+        self.Q[VZ] = accel_noise ** 2
+
+        self.acc_meas_noise = acc_meas_noise ** 2
+        self.mag_yaw_noise = mag_yaw_noise ** 2
+        self.baro_noise = baro_noise ** 2
+        self.gps_alt_noise = gps_alt_noise ** 2
+        self.accel_gate = accel_gate
+
+        # Work buffers. Row/column shapes let the outer product and the
+        # innovation variance run as out= dot products; scalars are applied
+        # through _scale, since mixing a Python float into a ufunc allocates.
+        self.F = np.eye(N_STATES)
+        self._FT = self.F.T
+        self._FP = np.zeros((N_STATES, N_STATES))
+        self._outer = np.zeros((N_STATES, N_STATES))
+        self._P_diag = self.P.ravel()[::N_STATES + 1]
+        self._Q_dt = np.zeros(N_STATES)
+        self._H_row = np.zeros((1, N_STATES))
+        self._H = self._H_row[0]
+        self._PH_row = np.zeros((1, N_STATES))
+        self._PH = self._PH_row[0]
+        self._PH_col = self._PH_row.T
+        self._K_col = np.zeros((N_STATES, 1))
+        self._K = self._K_col[:, 0]
+        self._S = np.zeros((1, 1))
+        self._scale = np.zeros(N_STATES)
+        self.initialized = False
+
+    # -------------------------------
+    # Helpers
+    # -------------------------------
+    def euler(self):
+        """(roll, pitch, yaw) in radians."""
+        x = self.x
+        q0, q1, q2, q3 = x.item(Q0), x.item(Q1), x.item(Q2), x.item(Q3)
+        sin_pitch = 2.0 * (q0 * q2 - q3 * q1)
+        sin_pitch = -1.0 if sin_pitch < -1.0 else 1.0 if sin_pitch > 1.0 else sin_pitch
+        roll = math.atan2(2.0 * (q0 * q1 + q2 * q3), 1.0 - 2.0 * (q1 * q1 + q2 * q2))
+        pitch = math.asin(sin_pitch)
+        yaw = math.atan2(2.0 * (q0 * q3 + q1 * q2), 1.0 - 2.0 * (q2 * q2 + q3 * q3))
+        return roll, pitch, yaw
+
+    def reset(self, roll, pitch, yaw, alt):
+        cr, sr = math.cos(roll / 2), math.sin(roll / 2)
+        cp, sp = math.cos(pitch / 2), math.sin(pitch / 2)
+        cy, sy = math.cos(yaw / 2), math.sin(yaw / 2)
+        self.x[Q0] = cr * cp * cy + sr * sp * sy
+        self.x[Q1] = sr * cp * cy - cr * sp * sy
+        self.x[Q2] = cr * sp * cy + sr * cp * sy
+        self.x[Q3] = cr * cp * sy - sr * sp * cy
+        self.x[BX:BZ + 1] = 0.0
+        self.x[ALT] = alt
+        self.x[VZ] = 0.0
+        self.initialized = True
+
+    def _scalar_update(self, innovation, noise):
+        """Kalman update for one scalar measurement with Jacobian in self._H."""
+        P, H, PH, K, scale = self.P, self._H, self._PH, self._K, self._scale
+        np.dot(P, H, out=PH)
+        np.dot(self._H_row, self._PH_col, out=self._S)
+        scale.fill(1.0 / (self._S.item() + noise))
+        np.multiply(PH, scale, out=K)
+        scale.fill(innovation)
+        np.multiply(K, scale, out=PH)
+        np.add(self.x, PH, out=self.x)
+        np.dot(P, H, out=PH)
+        np.dot(self._K_col, self._PH_row, out=self._outer)
+        np.subtract(P, self._outer, out=P)
+
+    def _normalize(self):
+        x = self.x
+        q0, q1, q2, q3 = x.item(Q0), x.item(Q1), x.item(Q2), x.item(Q3)
+        inv = 1.0 / math.sqrt(q0 * q0 + q1 * q1 + q2 * q2 + q3 * q3)
+        x[Q0] = q0 * inv
+        x[Q1] = q1 * inv
+        x[Q2] = q2 * inv
+        x[Q3] = q3 * inv
+
+    # -------------------------------
+    # Filter steps
+    # -------------------------------
+    def predict(self, gyro, acc, dt):
+        x, F = self.x, self.F
+        q0, q1, q2, q3 = x.item(Q0), x.item(Q1), x.item(Q2), x.item(Q3)
+        bx, by, bz = x.item(BX), x.item(BY), x.item(BZ)
+        wx, wy, wz = gyro[0] - bx, gyro[1] - by, gyro[2] - bz
+        ax, ay, az = acc
+        h = 0.5 * dt
+
+        # Vertical acceleration in the world frame (third row of R times a)
+        up_acc = 2 * (q1 * q3 - q0 * q2) * ax + 2 * (q2 * q3 + q0 * q1) * ay + (q0 * q0 - q1 * q1 - q2 * q2 + q3 * q3) * az
+        vert = up_acc - GRAVITY
+
+        # Jacobian F = d f / d x (element-wise: slice assignment would build views and tuples)
+        F[Q0, Q1] = -h * wx
+        F[Q0, Q2] = -h * wy
+        F[Q0, Q3] = -h * wz
+        F[Q1, Q0] = h * wx
+        F[Q1, Q2] = h * wz
+        F[Q1, Q3] = -h * wy
+        F[Q2, Q0] = h * wy
+        F[Q2, Q1] = -h * wz
+        F[Q2, Q3] = h * wx
+        F[Q3, Q0] = h * wz
+        F[Q3, Q1] = h * wy
+        F[Q3, Q2] = -h * wx
+        F[Q0, BX], F[Q0, BY], F[Q0, BZ] = h * q1, h * q2, h * q3
+        F[Q1, BX], F[Q1, BY], F[Q1, BZ] = -h * q0, h * q3, -h * q2
+        F[Q2, BX], F[Q2, BY], F[Q2, BZ] = -h * q3, -h * q0, h * q1
+        F[Q3, BX], F[Q3, BY], F[Q3, BZ] = h * q2, -h * q1, -h * q0
+        d0 = -2 * q2 * ax + 2 * q1 * ay + 2 * q0 * az
+        d1 = 2 * q3 * ax + 2 * q0 * ay - 2 * q1 * az
+        d2 = -2 * q0 * ax + 2 * q3 * ay - 2 * q2 * az
+        d3 = 2 * q1 * ax + 2 * q2 * ay + 2 * q3 * az
+        half_dt2 = 0.5 * dt * dt
+        F[ALT, Q0], F[ALT, Q1], F[ALT, Q2], F[ALT, Q3] = half_dt2 * d0, half_dt2 * d1, half_dt2 * d2, half_dt2 * d3
+        F[ALT, VZ] = dt
+        F[VZ, Q0], F[VZ, Q1], F[VZ, Q2], F[VZ, Q3] = dt * d0, dt * d1, dt * d2, dt * d3
+
+        # State propagation
+        x[Q0] = q0 + h * (-wx * q1 - wy * q2 - wz * q3)
+        x[Q1] = q1 + h * (wx * q0 + wz * q2 - wy * q3)
+        x[Q2] = q2 + h * (wy * q0 - wz * q1 + wx * q3)
+        x[Q3] = q3 + h * (wz * q0 + wy * q1 - wx * q2)
+        vz = x.item(VZ)
+        x[ALT] = x.item(ALT) + vz * dt + half_dt2 * vert
+        x[VZ] = vz + vert * dt
+        self._normalize()
+
+        # Covariance propagation P = F P F^T + Q dt
+        np.dot(F, self.P, out=self._FP)
+        np.dot(self._FP, self._FT, out=self.P)
+        self._scale.fill(dt)
+        np.multiply(self.Q, self._scale, out=self._Q_dt)
+        np.add(self._P_diag, self._Q_dt, out=self._P_diag)
+
+    def update_accel(self, acc):
+        ax, ay, az = acc
+        norm = math.sqrt(ax * ax + ay * ay + az * az)
+        if norm == 0.0 or abs(norm - GRAVITY) > self.accel_gate * GRAVITY:
+            return False  # manoeuvring: the accelerometer is not a gravity reference
+        # One scalar update per axis (unrolled: a range() loop would allocate)
+        self._gravity_update(0, ax / norm)
+        self._gravity_update(1, ay / norm)
+        self._gravity_update(2, az / norm)
+        self._normalize()
+        return True
+
+    def _gravity_update(self, axis, meas):
+        x, H = self.x, self._H
+        q0, q1, q2, q3 = x.item(Q0), x.item(Q1), x.item(Q2), x.item(Q3)
+        H.fill(0.0)
+        if axis == 0:
+            pred = 2 * (q1 * q3 - q0 * q2)
+            H[Q0], H[Q1], H[Q2], H[Q3] = -2 * q2, 2 * q3, -2 * q0, 2 * q1
+        elif axis == 1:
+            pred = 2 * (q2 * q3 + q0 * q1)
+            H[Q0], H[Q1], H[Q2], H[Q3] = 2 * q1, 2 * q0, 2 * q3, 2 * q2
+        else:
+            pred = q0 * q0 - q1 * q1 - q2 * q2 + q3 * q3
+            H[Q0], H[Q1], H[Q2], H[Q3] = 2 * q0, -2 * q1, -2 * q2, 2 * q3
+        self._scalar_update(meas - pred, self.acc_meas_noise)
+
+    def update_yaw(self, yaw_meas):
+        x, H = self.x, self._H
+        q0, q1, q2, q3 = x.item(Q0), x.item(Q1), x.item(Q2), x.item(Q3)
+        num = 2.0 * (q0 * q3 + q1 * q2)
+        den = 1.0 - 2.0 * (q2 * q2 + q3 * q3)
+        r2 = num * num + den * den
+        H.fill(0.0)
+        H[Q0] = (den * 2 * q3) / r2
+        H[Q1] = (den * 2 * q2) / r2
+        H[Q2] = (den * 2 * q1 + num * 4 * q2) / r2
+        H[Q3] = (den * 2 * q0 + num * 4 * q3) / r2
+        innovation = (yaw_meas - math.atan2(num, den) + math.pi) % (2 * math.pi) - math.pi
+        self._scalar_update(innovation, self.mag_yaw_noise)
+        self._normalize()
+
+    def update_altitude(self, alt_meas, noise, predicted=None):
+        """`predicted` overrides the current altitude for delayed measurements."""
+        H = self._H
+        H.fill(0.0)
+        H[ALT] = 1.0
+        if predicted is None:
+            predicted = self.x.item(ALT)
+        self._scalar_update(alt_meas - predicted, noise)
+
+    def step(self, gyro, acc, mag, baro_alt, gps_alt, dt):
+        """One full predict/update cycle. gyro rad/s, acc m/s^2, mag in any unit."""
+        if not self.initialized:
+            self.initialize(acc, mag, baro_alt)
+            roll, pitch, yaw = self.euler()
+            return roll, pitch, yaw, self.x.item(ALT)
+
+        self.predict(gyro, acc, dt)
+        self.update_accel(acc)
+        self.update_mag(mag)
+        self.update_altitude(baro_alt, self.baro_noise)
+        if gps_alt is not None:
+            self.update_altitude(gps_alt, self.gps_alt_noise)
+        roll, pitch, yaw = self.euler()
+        return roll, pitch, yaw, self.x.item(ALT)
+
+    def initialize(self, acc, mag, baro_alt):
+        """Seed attitude from gravity and the magnetometer, altitude from the baro."""
+        ax, ay, az = acc
+        roll = math.atan2(ay, az)
+        pitch = math.atan2(-ax, math.sqrt(ay * ay + az * az))
+        self.reset(roll, pitch, self._mag_yaw(mag, roll, pitch), baro_alt)
+
+    def update_mag(self, mag):
+        roll, pitch, _ = self.euler()
+        self.update_yaw(self._mag_yaw(mag, roll, pitch))
+
+    @staticmethod
+    def _mag_yaw(mag, roll, pitch):
+        # Same tilt compensation as the complementary filter
+        mag_x = mag[0] * math.cos(pitch) + mag[2] * math.sin(pitch)
+        mag_y = (mag[0] * math.sin(roll) * math.sin(pitch) +
+                 mag[1] * math.cos(roll) -
+                 mag[2] * math.sin(roll) * math.cos(pitch))
+        return math.atan2(-mag_y, mag_x)
@@ -0,0 +1,177 @@
+"""
+Bounded-error math kernels for the navigation and guidance hot paths.
+
+Two families, each checked against `math` by bench_fastmath.py:
+
+Vectorised forms (NumPy arrays in), evaluated in single precision so
+NumPy can use its SIMD float32 loops:
+
+    sin_v, cos_v     |x| <= 4 pi               <= 2e-6
+    atan2_v          any (y, x)                <= 5e-7 rad
+    baro_altitude_v  p / p0 in [0.25, 1.15]    <= 5e-3 m
+
+The float32 conversion costs more than it saves on short arrays, so
+inputs shorter than TRIG_VECTOR_MIN (sin, cos) or VECTOR_MIN (atan2, baro)
+go through the float64 loop unchanged (bench_fastmath.py measures the
+crossover).
+
+Scalar forms (plain floats), table / polynomial approximations that need
+no libm:
+
+    sin, cos         any angle                 <= 5e-6
+    atan2            any (y, x)                <= 2e-6 rad
+    baro_altitude    p / p0 in [0.25, 1.15]    <= 1e-3 m   (exact formula outside)
+
+In CPython a single math.sin call is several times cheaper than any
+Python-level approximation, so no kernel set uses the scalar forms; they
+are for interpreters without a fast libm. Stages choose a kernel set with
+kernels(mode):
+
+    "exact" (or False)  math / float64 NumPy, bit-for-bit the original output
+    "fast"  (or True)   float32 vector kernels, libm scalars
+"""
+import math
+import numpy as np
+
+TWO_PI = 2.0 * math.pi
+HALF_PI = 0.5 * math.pi
+BARO_EXPONENT = 0.1903
+BARO_SCALE = 44330.0
+
+# -------------------------------
+# sin / cos: 1024-entry table over one period, linear interpolation
+# -------------------------------
+_SIN_SIZE = 1024
+_SIN_STEP = TWO_PI / _SIN_SIZE
+_SIN_INV_STEP = _SIN_SIZE / TWO_PI
+_SIN_TABLE = np.sin(np.arange(_SIN_SIZE + 1) * _SIN_STEP).tolist()
+_COS_OFFSET = _SIN_SIZE / 4.0  # cos(x) = sin(x + pi / 2), in table steps
+
+# Shortest arrays the float32 vector kernels convert; below them float64 is faster
+TRIG_VECTOR_MIN = 128
+VECTOR_MIN = 1024
+
+
+def sin(x):
+    f = (x * _SIN_INV_STEP) % _SIN_SIZE
+    i = int(f)
+    a = _SIN_TABLE[i]
+    return a + (_SIN_TABLE[i + 1] - a) * (f - i)
+
+
+def cos(x):
+    f = (x * _SIN_INV_STEP + _COS_OFFSET) % _SIN_SIZE
+    i = int(f)
+    a = _SIN_TABLE[i]
+    return a + (_SIN_TABLE[i + 1] - a) * (f - i)
+
+
+def _single(x, minimum):
+    x = np.asarray(x)
+    return x.astype(np.float32) if x.size >= minimum else x
+
+
+def sin_v(x):
+    return np.sin(_single(x, TRIG_VECTOR_MIN))
+
+
+def cos_v(x):
+    return np.cos(_single(x, TRIG_VECTOR_MIN))
+
+
+# -------------------------------
+# atan2: octant reduction + odd minimax polynomial for atan on [0, 1]
+# -------------------------------
+_A1, _A3, _A5, _A7, _A9, _A11 = (0.99997726, -0.33262347, 0.19354346,
+                                 -0.11643287, 0.05265332, -0.01172120)
+
+
+def atan2(y, x):
+    ax, ay = abs(x), abs(y)
+    if ax >= ay:
+        if ax == 0.0:
+            return math.atan2(y, x)  # keeps the signed-zero conventions
+        z = ay / ax
+        swap = False
+    else:
+        z = ax / ay
+        swap = True
+    z2 = z * z
+    r = z * (_A1 + z2 * (_A3 + z2 * (_A5 + z2 * (_A7 + z2 * (_A9 + z2 * _A11)))))
+    if swap:
+        r = HALF_PI - r
+    if x < 0.0:
+        r = math.pi - r
+    return -r if y < 0.0 else r
+
+
+def atan2_v(y, x):
+    return np.arctan2(_single(y, VECTOR_MIN), _single(x, VECTOR_MIN))
+
+
+# -------------------------------
+# Barometric altitude: 44330 * (1 - (p / p0) ** 0.1903)
+# -------------------------------
+_BARO_LOW, _BARO_HIGH = 0.25, 1.15
+_BARO_SIZE = 4096
+_BARO_STEP = (_BARO_HIGH - _BARO_LOW) / _BARO_SIZE
+_BARO_INV_STEP = 1.0 / _BARO_STEP
+_BARO_TABLE = (BARO_SCALE * (1.0 - (_BARO_LOW + np.arange(_BARO_SIZE + 1) * _BARO_STEP) ** BARO_EXPONENT)).tolist()
+
+
+def baro_altitude_exact(pressure, p0=101325.0):
+    return BARO_SCALE * (1 - (pressure / p0) ** BARO_EXPONENT)
+
+
+def baro_altitude(pressure, p0=101325.0):
+    f = (pressure / p0 - _BARO_LOW) * _BARO_INV_STEP
+    if f < 0.0 or f >= _BARO_SIZE:
+        return baro_altitude_exact(pressure, p0)
+    i = int(f)
+    a = _BARO_TABLE[i]
+    return a + (_BARO_TABLE[i + 1] - a) * (f - i)
+
+
+def baro_altitude_exact_v(pressure, p0=101325.0):
+    return BARO_SCALE * (1 - (np.asarray(pressure, dtype=float) / p0) ** BARO_EXPONENT)
+
+
+def baro_altitude_v(pressure, p0=101325.0):
+    pressure = np.asarray(pressure)
+    if pressure.size < VECTOR_MIN:
+        return baro_altitude_exact_v(pressure, p0)
+    ratio = pressure.astype(np.float32) / np.float32(p0)
+    return np.float32(BARO_SCALE) * (np.float32(1.0) - ratio ** np.float32(BARO_EXPONENT))
+
+
+# -------------------------------
+# Per-stage selection
+# -------------------------------
+class MathKernels:
+    """The set of functions a stage calls; see kernels()."""
+
+    def __init__(self, name, fast, sin, cos, atan2, baro_altitude, sin_v, cos_v, atan2_v, baro_altitude_v):
+        self.name = name
+        self.fast = fast
+        self.sin, self.cos, self.atan2 = sin, cos, atan2
+        self.baro_altitude = baro_altitude
+        self.sin_v, self.cos_v, self.atan2_v = sin_v, cos_v, atan2_v
+        self.baro_altitude_v = baro_altitude_v
+
+
+EXACT = MathKernels("exact", False, math.sin, math.cos, math.atan2, baro_altitude_exact,
+                    np.sin, np.cos, np.arctan2, baro_altitude_exact_v)
+FAST = MathKernels("fast", True, math.sin, math.cos, math.atan2, baro_altitude_exact,
+                   sin_v, cos_v, atan2_v, baro_altitude_v)
+MODES = {"exact": EXACT, "fast": FAST}
+
+
+def kernels(mode=False):
+    """Kernel set for a stage: False / "exact" or True / "fast"."""
+    if mode is True:
+        mode = "fast"
+    elif mode is False or mode is None:
+        mode = "exact"
+    if mode not in MODES:
+        raise ValueError(f"Unknown fast-math mode: {mode}")
+    return MODES[mode]
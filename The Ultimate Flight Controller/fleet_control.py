@@ -0,0 +1,124 @@
+import time
+import numpy as np
+from control import Control
+
+# Axis order used by every (N, 4) array below
+ROLL, PITCH, YAW, ALT = range(4)
+
+
+class FleetControl:
+    """
+    Struct-of-arrays version of Control for N vehicles.
+
+    PID state (integral, previous error, filtered derivative) lives in (N, 4)
+    arrays, gains in (N, 4, 3) and filter_tau in (N,), so every vehicle may
+    fly its own gain set. One process() call gives the same outputs as
+    calling Control.process on each vehicle with the same dt.
+    """
+
+    def __init__(self, n, clock=time.time):
+        ref = Control(clock=clock)
+        self.n = n
+        self.clock = clock
+        self.prev_time = self.clock()
+
+        # Limits (shared)
+        self.max_roll_deg = ref.max_roll_deg
+        self.max_pitch_deg = ref.max_pitch_deg
+        self.max_yaw_rate_deg = ref.max_yaw_rate_deg
+        self.alt_limit = ref.alt_limit
+        self.limits = np.array([
+            (-ref.max_roll_deg, ref.max_roll_deg),
+            (-ref.max_pitch_deg, ref.max_pitch_deg),
+            (-ref.max_yaw_rate_deg, ref.max_yaw_rate_deg),
+            ref.alt_limit
+        ])
+        self.pwm_scale = np.array([ref.max_roll_deg, ref.max_pitch_deg, ref.max_yaw_rate_deg])
+
+        # PID state
+        self.integral = np.zeros((n, 4))
+        self.prev_error = np.zeros((n, 4))
+        self.prev_derivative = np.zeros((n, 4))
+
+        # PID gains (Kp, Ki, Kd) per vehicle and axis
+        base = np.array([ref.roll_gains, ref.pitch_gains, ref.yaw_gains, ref.alt_gains])
+        self.gains = np.tile(base, (n, 1, 1))
+        self.filter_tau = np.full(n, ref.filter_tau)
+
+    def set_gains(self, index, roll_gains=None, pitch_gains=None, yaw_gains=None,
+                  alt_gains=None, filter_tau=None):
+        for axis, gains in ((ROLL, roll_gains), (PITCH, pitch_gains), (YAW, yaw_gains), (ALT, alt_gains)):
+            if gains is not None:
+                self.gains[index, axis] = gains
+        if filter_tau is not None:
+            self.filter_tau[index] = filter_tau
+
+    def reset(self, index=slice(None)):
+        self.integral[index] = 0.0
+        self.prev_error[index] = 0.0
+        self.prev_derivative[index] = 0.0
+
+    def _dt(self):
+        now = self.clock()
+        dt = now - self.prev_time
+        self.prev_time = now
+        return max(dt, 1e-3)
+
+    def process(self, nav_states, desired, stabilize, dt=None):
+        """
+        Inputs:
+            nav_states: (N, 6) [lat, lon, alt, roll_deg, pitch_deg, yaw_deg]
+            desired   : (N, 4) [desired_roll, desired_pitch, desired_yaw, desired_thrust]
+            stabilize : (N,) bool, True where guidance mode is "Stabilize"
+            dt        : optional fixed step; read from the clock otherwise
+
+        Output:
+            pwm   : (N, 4) int [roll_pwm, pitch_pwm, yaw_pwm, thrust_pwm]
+            motors: (N, 4) int [M1, M2, M3, M4]
+        """
+        nav_states = np.asarray(nav_states, dtype=float)
+        desired = np.asarray(desired, dtype=float)
+        stabilize = np.asarray(stabilize, dtype=bool)
+        if dt is None:
+            dt = self._dt()
+
+        # Errors (alt compares desired thrust with altitude, as Control does)
+        current = nav_states[:, [3, 4, 5, 2]]
+        error = desired - current
+
+        # PID Controllers, all vehicles and axes at once
+        kp, ki, kd = self.gains[:, :, 0], self.gains[:, :, 1], self.gains[:, :, 2]
+        tau = self.filter_tau[:, None]
+
+        integral = self.integral + error * dt
+        derivative = (error - self.prev_error) / dt
+        derivative = self.prev_derivative + tau / (tau + dt) * (derivative - self.prev_derivative)
+        output = kp * error + ki * integral + kd * derivative
+        output = np.maximum(self.limits[:, 0], np.minimum(self.limits[:, 1], output))
+
+        # Altitude: If Stabilize, use throttle directly and leave alt state untouched
+        active = np.ones((self.n, 4), dtype=bool)
+        active[:, ALT] = ~stabilize
+        self.integral = np.where(active, integral, self.integral)
+        self.prev_derivative = np.where(active, derivative, self.prev_derivative)
+        self.prev_error = np.where(active, error, self.prev_error)
+        thrust = np.where(stabilize, desired[:, ALT], output[:, ALT])
+
+        # Convert to PWM
+        cmd = output[:, :3]
+        pwm = np.empty((self.n, 4))
+        pwm[:, :3] = np.trunc(1500 + (cmd / self.pwm_scale) * 500)
+        pwm[:, 3] = np.trunc(1000 + thrust * 1000)
+        pwm = np.clip(pwm, 1000, 2000)
+
+        # Motor mixing (X quad)
+        roll_cmd, pitch_cmd, yaw_cmd = cmd[:, 0], cmd[:, 1], cmd[:, 2]
+        thrust_pwm = pwm[:, 3]
+        motors = np.empty((self.n, 4))
+        motors[:, 0] = thrust_pwm - pitch_cmd + roll_cmd + yaw_cmd  # Front left (CW)
+        motors[:, 1] = thrust_pwm - pitch_cmd - roll_cmd - yaw_cmd  # Front right (CCW)
+        motors[:, 2] = thrust_pwm + pitch_cmd - roll_cmd + yaw_cmd  # Rear right (CW)
+        motors[:, 3] = thrust_pwm + pitch_cmd + roll_cmd - yaw_cmd  # Rear left (CCW)
+        motors = np.trunc(np.clip(motors, 1000, 2000))
+
+        return pwm.astype(int), motors.astype(int)
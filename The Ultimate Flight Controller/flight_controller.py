@@ -1,3 +1,223 @@
+import sys
+import time
 from navigation import Navigation
 from guidance import Guidance
-from control import Control
\ No newline at end of file
+from control import Control
+from tracing import Tracer
+
+
+class LoopStats:
+    """Deadline misses, wake-up jitter histogram and per-stage execution times."""
+
+    STAGES = ("navigation", "guidance", "control")
+
+    def __init__(self, bucket_us=50, n_buckets=40):
+        self.bucket_us = bucket_us
+        self.jitter_hist = [0] * n_buckets  # last bucket collects everything above
+        self.ticks = 0
+        self.deadline_misses = 0
+        self.guidance_skips = 0
+        self.max_jitter = 0.0
+        self.stage_total = {name: 0.0 for name in self.STAGES}
+        self.stage_max = {name: 0.0 for name in self.STAGES}
+        self.stage_count = {name: 0 for name in self.STAGES}
+
+    def record_jitter(self, jitter):
+        idx = int(jitter * 1e6 / self.bucket_us)
+        self.jitter_hist[min(max(idx, 0), len(self.jitter_hist) - 1)] += 1
+        if jitter > self.max_jitter:
+            self.max_jitter = jitter
+
+    def record_stage(self, name, elapsed):
+        self.stage_total[name] += elapsed
+        self.stage_count[name] += 1
+        if elapsed > self.stage_max[name]:
+            self.stage_max[name] = elapsed
+
+    def report(self):
+        stages = {}
+        for name in self.STAGES:
+            n = self.stage_count[name]
+            stages[name] = {
+                "calls": n,
+                "mean_us": self.stage_total[name] / n * 1e6 if n else 0.0,
+                "max_us": self.stage_max[name] * 1e6
+            }
+        return {
+            "ticks": self.ticks,
+            "deadline_misses": self.deadline_misses,
+            "guidance_skips": self.guidance_skips,
+            "max_jitter_us": self.max_jitter * 1e6,
+            "jitter_bucket_us": self.bucket_us,
+            "jitter_hist": list(self.jitter_hist),
+            "stages": stages
+        }
+
+
+class FlightController:
+    """
+    Fixed-rate Navigation -> Guidance -> Control loop.
+
+    read_sensors()  -> (mpu6050_list, gps_list, mag_list, baro_list)
+    read_inputs()   -> (flight_mode, rc_failsafe, battery_failsafe, rc_input_pwm)
+    write_outputs(control_out) is called once per tick if given.
+
+    When a tick overruns its period the next tick skips guidance and reuses
+    the last guidance output, so control keeps its rate. At most
+    max_guidance_skips consecutive guidance updates are dropped.
+
+    no_alloc=True makes Control reuse one output record, so write_outputs
+    must copy anything it keeps.
+
+    With sensor_rings (see sensor_buffers.make_sensor_rings) Navigation
+    consumes the rings directly through Navigation.process_async and
+    read_sensors is not used: with either backend every IMU sample is a
+    prediction and slower sensors correct only when they produce a new
+    sample.
+
+    calibration is a calibration.CalibrationProfile (or profile path)
+    applied by Navigation to every raw sample.
+
+    tracer (a tracing.Tracer) records a span per tick and per stage, mode
+    handler, PID axis and mixer; save it with tracer.save(path) and open
+    the file in Perfetto or chrome://tracing.
+    """
+
+    def __init__(self, read_sensors, read_inputs, write_outputs=None, rate_hz=250,
+                 max_guidance_skips=4, spin_margin=0.0005, no_alloc=False,
+                 nav_backend="complementary", sensor_rings=None, calibration=None, tracer=None):
+        self.read_sensors = read_sensors
+        self.read_inputs = read_inputs
+        self.write_outputs = write_outputs
+        self.sensor_rings = sensor_rings
+        self.period = 1.0 / rate_hz
+        self.max_guidance_skips = max_guidance_skips
+        self.spin_margin = spin_margin  # busy-wait the last part of each period
+
+        self.navigation = Navigation(backend=nav_backend, clock=time.perf_counter, calibration=calibration)
+        self.guidance = Guidance(clock=time.perf_counter)
+        self.control = Control(clock=time.perf_counter, no_alloc=no_alloc)
+
+        self.tracer = tracer
+        if tracer is not None:
+            for stage in (self.navigation, self.guidance, self.control):
+                stage.set_tracer(tracer)
+            self._tick_id = tracer.intern("loop.tick")
+            self._overrun_id = tracer.intern("loop.overrun")
+
+        self.stats = LoopStats()
+        self.guidance_out = None
+        self.overran = False
+        self.consecutive_skips = 0
+        self.running = False
+
+    def tick(self):
+        clock = time.perf_counter
+        tracer = self.tracer
+        if tracer is not None:
+            trace_start = tracer.now()
+        tick_start = clock()
+
+        t0 = clock()
+        if self.sensor_rings is not None:
+            nav_state = self.navigation.process_async(self.sensor_rings)
+        else:
+            nav_state = self.navigation.process(*self.read_sensors())
+        t1 = clock()
+        self.stats.record_stage("navigation", t1 - t0)
+
+        skip = (self.overran and self.guidance_out is not None
+                and self.consecutive_skips < self.max_guidance_skips)
+        if skip:
+            self.consecutive_skips += 1
+            self.stats.guidance_skips += 1
+        else:
+            self.consecutive_skips = 0
+            self.guidance_out = self.guidance.process(nav_state, *self.read_inputs())
+            t2 = clock()
+            self.stats.record_stage("guidance", t2 - t1)
+            t1 = t2
+
+        control_out = self.control.process(nav_state, self.guidance_out)
+        t3 = clock()
+        self.stats.record_stage("control", t3 - t1)
+
+        if self.write_outputs:
+            self.write_outputs(control_out)
+
+        tick_end = clock()
+        self.overran = (tick_end - tick_start) > self.period
+        if tracer is not None:
+            span_id = self._overrun_id if self.overran else self._tick_id
+            tracer.add(span_id, trace_start, tracer.now())
+        return control_out
+
+    def _wait_until(self, deadline):
+        remaining = deadline - time.perf_counter()
+        if remaining > self.spin_margin:
+            time.sleep(remaining - self.spin_margin)
+        while time.perf_counter() < deadline:
+            pass
+
+    def run(self, duration=None, max_ticks=None):
+        """Run the loop until stop(), `duration` seconds or `max_ticks` ticks."""
+        self.running = True
+        start = time.perf_counter()
+        deadline = start + self.period
+
+        while self.running:
+            if max_ticks is not None and self.stats.ticks >= max_ticks:
+                break
+            if duration is not None and time.perf_counter() - start >= duration:
+                break
+
+            self.tick()
+            self.stats.ticks += 1
+
+            now = time.perf_counter()
+            if now > deadline:
+                # Missed: count every period we slipped and resync instead of bursting
+                missed = int((now - deadline) / self.period) + 1
+                self.stats.deadline_misses += missed
+                deadline += missed * self.period
+            self._wait_until(deadline)
+            self.stats.record_jitter(time.perf_counter() - deadline)
+            deadline += self.period
+
+        self.running = False
+        return self.stats.report()
+
+    def stop(self):
+        self.running = False
+
+
+def main():
+    rate_hz = int(sys.argv[1]) if len(sys.argv) > 1 else 250
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    trace_path = sys.argv[3] if len(sys.argv) > 3 else None
+
+    # Synthetic level, stationary vehicle in AltHold with centred sticks
+    sensors = ([[0, 0, 16384, 0, 0, 0]] * 8, [[12.9716, 77.5946, 920.0]],
+               [[0.2, 0.0, -0.4]], [[91000.0, 25.0, 40.0]])
+    inputs = (2, False, False, [1500, 1500, 1500, 1500])
+
+    tracer = Tracer() if trace_path else None
+    fc = FlightController(lambda: sensors, lambda: inputs, rate_hz=rate_hz, tracer=tracer)
+    report = fc.run(duration=duration)
+
+    print(f"Rate: {rate_hz} Hz, ticks: {report['ticks']}, "
+          f"deadline misses: {report['deadline_misses']}, guidance skips: {report['guidance_skips']}")
+    print(f"Max jitter: {report['max_jitter_us']:.1f} us")
+    for name, s in report["stages"].items():
+        print(f"  {name:<11} mean {s['mean_us']:8.1f} us   max {s['max_us']:8.1f} us")
+    print("Jitter histogram:")
+    width = report["jitter_bucket_us"]
+    for i, count in enumerate(report["jitter_hist"]):
+        if count:
+            print(f"  {i * width:>5}-{(i + 1) * width:<5} us: {count}")
+    if tracer is not None:
+        print(f"Wrote {tracer.save(trace_path)} spans to {trace_path} ({tracer.overwritten} overwritten)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from fleet_control import FleetControl
+
+# Order of the values in a gain tuple
+PARAM_NAMES = [
+    "roll_kp", "roll_ki", "roll_kd",
+    "pitch_kp", "pitch_ki", "pitch_kd",
+    "yaw_kp", "yaw_ki", "yaw_kd",
+    "alt_kp", "alt_ki", "alt_kd",
+    "filter_tau"
+]
+
+# Default search bounds (low, high) per parameter
+DEFAULT_BOUNDS = {
+    "roll_kp": (0.2, 3.0), "roll_ki": (0.0, 0.5), "roll_kd": (0.0, 0.6),
+    "pitch_kp": (0.2, 3.0), "pitch_ki": (0.0, 0.5), "pitch_kd": (0.0, 0.6),
+    "yaw_kp": (0.2, 3.0), "yaw_ki": (0.0, 0.5), "yaw_kd": (0.0, 0.6),
+    "alt_kp": (0.1, 2.0), "alt_ki": (0.0, 0.5), "alt_kd": (0.0, 0.6),
+    "filter_tau": (0.005, 0.1)
+}
+
+SIM_DT = 0.004    # 250 Hz control loop
+GRAVITY = 9.80665
+
+
+# -------------------------------
+# Plant model
+# -------------------------------
+class QuadPlant:
+    """
+    Minimal decoupled X-quad plant for N vehicles driven by motor PWMs.
+    Attitude axes are damped double integrators on the mixed PWM difference,
+    altitude responds to mean throttle with hover at 50 %.
+    """
+
+    ANGULAR_GAIN = 5.0      # deg/s^2 per PWM of differential thrust
+    ANGULAR_DAMPING = 2.0   # 1/s
+    VERTICAL_DAMPING = 0.5  # 1/s
+
+    def __init__(self, n):
+        self.att = np.zeros((n, 3))       # roll, pitch, yaw (deg)
+        self.rate = np.zeros((n, 3))      # deg/s
+        self.alt = np.zeros(n)            # m
+        self.climb = np.zeros(n)          # m/s
+
+    def nav_states(self):
+        n = len(self.alt)
+        states = np.zeros((n, 6))
+        states[:, 2] = self.alt
+        states[:, 3:6] = self.att
+        return states
+
+    def step(self, motors, dt, torque=None):
+        m1, m2, m3, m4 = (motors[:, i].astype(float) for i in range(4))
+        diff = np.empty((len(m1), 3))
+        diff[:, 0] = (m1 + m4) - (m2 + m3)
+        diff[:, 1] = (m3 + m4) - (m1 + m2)
+        diff[:, 2] = (m1 + m3) - (m2 + m4)
+
+        accel = self.ANGULAR_GAIN * diff - self.ANGULAR_DAMPING * self.rate
+        if torque is not None:
+            accel += torque
+        self.rate += accel * dt
+        self.att += self.rate * dt
+
+        throttle = (motors.mean(axis=1) - 1000.0) / 1000.0
+        climb_accel = 2.0 * GRAVITY * throttle - GRAVITY - self.VERTICAL_DAMPING * self.climb
+        self.climb += climb_accel * dt
+        self.alt = np.maximum(self.alt + self.climb * dt, 0.0)
+        self.climb = np.where(self.alt <= 0.0, np.maximum(self.climb, 0.0), self.climb)
+
+        # Keep diverging candidates finite; they score badly anyway
+        np.clip(self.att, -1e4, 1e4, out=self.att)
+        np.clip(self.rate, -1e5, 1e5, out=self.rate)
+
+
+# -------------------------------
+# Scenarios
+# -------------------------------
+def _make_fleet(candidates):
+    fleet = FleetControl(len(candidates), clock=lambda: 0.0)
+    for i, g in enumerate(candidates):
+        fleet.set_gains(i, g[0:3], g[3:6], g[6:9], g[9:12], g[12])
+    return fleet
+
+
+def _simulate(candidates, duration, setpoint_fn, torque_fn=None, start_alt=1.0):
+    """Fly every candidate through one scenario, return RMS error per vehicle."""
+    n = len(candidates)
+    fleet = _make_fleet(candidates)
+    plant = QuadPlant(n)
+    plant.alt[:] = start_alt
+    stabilize = np.zeros(n, dtype=bool)
+    sq_err = np.zeros(n)
+    steps = int(duration / SIM_DT)
+
+    for k in range(steps):
+        t = k * SIM_DT
+        desired = np.tile(setpoint_fn(t), (n, 1))
+        nav = plant.nav_states()
+        _, motors = fleet.process(nav, desired, stabilize, dt=SIM_DT)
+        plant.step(motors, SIM_DT, torque_fn(t) if torque_fn else None)
+
+        err = desired - nav[:, [3, 4, 5, 2]]
+        err[:, 3] *= 10.0  # 10 cm altitude error weighs like 1 deg attitude error
+        sq_err += (err ** 2).sum(axis=1)
+
+    rms = np.sqrt(sq_err / steps)
+    return np.where(np.isfinite(rms), rms, 1e9)
+
+
+def scenario_step(candidates):
+    return _simulate(candidates, 4.0, lambda t: (10.0, -10.0, 5.0, 2.0) if t >= 0.5 else (0.0, 0.0, 0.0, 1.0))
+
+
+def scenario_disturbance(candidates):
+    def gust(t):
+        return np.array([400.0, -300.0, 100.0]) if 1.0 <= t < 1.2 else None
+    return _simulate(candidates, 4.0, lambda t: (0.0, 0.0, 0.0, 1.0), gust)
+
+
+def scenario_mission(candidates):
+    def track(t):
+        return (15.0 * math.sin(0.8 * t), 15.0 * math.cos(0.6 * t), 3.0 * math.sin(0.3 * t), 1.0 + 0.5 * t / 8.0)
+    return _simulate(candidates, 8.0, track)
+
+
+SCENARIOS = {
+    "step": (scenario_step, 1.0),
+    "disturbance": (scenario_disturbance, 1.0),
+    "mission": (scenario_mission, 1.0)
+}
+
+
+def evaluate_chunk(candidates):
+    """Worker entry point: score a list of gain tuples in one vectorised fleet."""
+    scores = {name: fn(candidates) for name, (fn, _) in SCENARIOS.items()}
+    results = []
+    for i, g in enumerate(candidates):
+        per = {name: float(scores[name][i]) for name in SCENARIOS}
+        cost = sum(SCENARIOS[name][1] * per[name] for name in SCENARIOS)
+        results.append({"gains": list(g), "cost": cost, "scores": per})
+    return results
+
+
+# -------------------------------
+# Candidate generation
+# -------------------------------
+def gain_key(gains):
+    return tuple(round(float(g), 6) for g in gains)
+
+
+def grid_candidates(bounds, points):
+    axes = [np.linspace(*bounds[name], points) for name in PARAM_NAMES]
+    for combo in itertools.product(*axes):
+        yield gain_key(combo)
+
+
+def random_candidates(bounds, count, rng):
+    for _ in range(count):
+        yield gain_key(rng.uniform(*bounds[name]) for name in PARAM_NAMES)
+
+
+def _normalise(gains, bounds):
+    lo = np.array([bounds[name][0] for name in PARAM_NAMES])
+    hi = np.array([bounds[name][1] for name in PARAM_NAMES])
+    return (np.asarray(gains, dtype=float) - lo) / np.where(hi > lo, hi - lo, 1.0)
+
+
+def _fit_points(cache, max_points, rng):
+    """Cache keys the GP is fitted to: all of them, or the best half of the cap plus a random rest."""
+    keys = sorted(cache, key=lambda k: cache[k]["cost"])
+    if len(keys) <= max_points:
+        return keys
+    best = max_points // 2
+    return keys[:best] + rng.sample(keys[best:], max_points - best)
+
+
+def bayesian_proposals(cache, bounds, count, rng, pool_size=2000, length_scale=0.3, noise=1e-6,
+                       max_points=1000):
+    """
+    Expected-improvement proposals from a Gaussian process (RBF kernel) fitted
+    to log cost of at most max_points cache entries, so memory and the
+    Cholesky cost stay bounded as the cache grows.
+    """
+    keys = _fit_points(cache, max_points, rng)
+    x = _normalise(keys, bounds)
+    y = np.log(np.array([cache[k]["cost"] for k in keys]) + 1e-9)
+    y_mean, y_std = y.mean(), y.std() or 1.0
+    y = (y - y_mean) / y_std
+
+    def kernel(a, b):
+        # |a - b|^2 expanded, so only the (len(a), len(b)) matrix is built
+        d2 = (a ** 2).sum(axis=1)[:, None] + (b ** 2).sum(axis=1)[None, :] - 2.0 * a @ b.T
+        return np.exp(-0.5 * np.maximum(d2, 0.0) / length_scale ** 2)
+
+    k_xx = kernel(x, x) + noise * np.eye(len(x))
+    chol = np.linalg.cholesky(k_xx)
+    alpha = np.linalg.solve(chol.T, np.linalg.solve(chol, y))
+
+    pool = [gain_key(rng.uniform(*bounds[name]) for name in PARAM_NAMES) for _ in range(pool_size)]
+    xs = _normalise(pool, bounds)
+    k_s = kernel(xs, x)
+    mu = k_s @ alpha
+    v = np.linalg.solve(chol, k_s.T)
+    sigma = np.sqrt(np.maximum(1.0 - (v ** 2).sum(axis=0), 1e-12))
+
+    best = y.min()
+    z = (best - mu) / sigma
+    cdf = 0.5 * (1.0 + np.vectorize(math.erf)(z / math.sqrt(2.0)))
+    pdf = np.exp(-0.5 * z ** 2) / math.sqrt(2.0 * math.pi)
+    ei = (best - mu) * cdf + sigma * pdf
+
+    proposals = []
+    for idx in np.argsort(-ei):
+        key = pool[idx]
+        if key not in cache and key not in proposals:
+            proposals.append(key)
+        if len(proposals) >= count:
+            break
+    return proposals
+
+
+# -------------------------------
+# Engine
+# -------------------------------
+class GainSearch:
+    """
+    Evaluates candidate gain tuples across a process pool. Every result is
+    appended to a JSON-lines cache keyed by the gain tuple, so an
+    interrupted search resumes where it stopped.
+    """
+
+    def __init__(self, cache_path="gain_cache.jsonl", bounds=None, workers=None, chunk_size=64, seed=0):
+        self.cache_path = cache_path
+        self.bounds = dict(DEFAULT_BOUNDS, **(bounds or {}))
+        self.workers = workers or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.rng = random.Random(seed)
+        self.cache = {}
+        self._load_cache()
+
+    def _load_cache(self):
+        if not os.path.exists(self.cache_path):
+            return
+        complete = 0
+        with open(self.cache_path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn final line from an interrupted run
+                complete += len(line)
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.cache[gain_key(entry["gains"])] = entry
+        if complete < os.path.getsize(self.cache_path):
+            # Cut the torn line so the next append starts on a line of its own
+            with open(self.cache_path, "r+b") as f:
+                f.truncate(complete)
+
+    def evaluate(self, candidates):
+        pending = [g for g in dict.fromkeys(candidates) if g not in self.cache]
+        if not pending:
+            return
+        chunks = [pending[i:i + self.chunk_size] for i in range(0, len(pending), self.chunk_size)]
+
+        with open(self.cache_path, "a") as cache_file, ProcessPoolExecutor(self.workers) as pool:
+            futures = [pool.submit(evaluate_chunk, chunk) for chunk in chunks]
+            for done, future in enumerate(as_completed(futures), 1):
+                for entry in future.result():
+                    self.cache[gain_key(entry["gains"])] = entry
+                    cache_file.write(json.dumps(entry) + "\n")
+                cache_file.flush()
+                print(f"  chunk {done}/{len(chunks)} done, {len(self.cache)} cached")
+
+    def grid(self, points=2):
+        self.evaluate(list(grid_candidates(self.bounds, points)))
+
+    def random(self, count=256):
+        self.evaluate(list(random_candidates(self.bounds, count, self.rng)))
+
+    def bayesian(self, rounds=10, batch=None, initial=64):
+        batch = batch or self.chunk_size * self.workers
+        if len(self.cache) < initial:
+            self.random(initial - len(self.cache))
+        for r in range(rounds):
+            print(f"Bayesian round {r + 1}/{rounds}")
+            self.evaluate(bayesian_proposals(self.cache, self.bounds, batch, self.rng))
+
+    def ranked(self, top=None):
+        entries = sorted(self.cache.values(), key=lambda e: e["cost"])
+        return entries[:top] if top else entries
+
+    def write_table(self, path, top=None):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["rank", "cost", *SCENARIOS, *PARAM_NAMES])
+            for rank, e in enumerate(self.ranked(top), 1):
+                writer.writerow([rank, e["cost"], *(e["scores"][s] for s in SCENARIOS), *e["gains"]])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel PID gain search against a simulated quad")
+    parser.add_argument("strategy", choices=["grid", "random", "bayesian"])
+    parser.add_argument("--count", type=int, default=256, help="random: candidates to evaluate")
+    parser.add_argument("--points", type=int, default=2, help="grid: points per parameter")
+    parser.add_argument("--rounds", type=int, default=10, help="bayesian: proposal rounds")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache", default="gain_cache.jsonl")
+    parser.add_argument("--out", default="gain_ranking.csv")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    search = GainSearch(args.cache, workers=args.workers, seed=args.seed)
+    print(f"Loaded {len(search.cache)} cached results")
+
+    if args.strategy == "grid":
+        search.grid(args.points)
+    elif args.strategy == "random":
+        search.random(args.count)
+    else:
+        search.bayesian(args.rounds)
+
+    search.write_table(args.out, args.top)
+    print(f"{'rank':>4} {'cost':>10}  gains")
+    for rank, e in enumerate(search.ranked(args.top), 1):
+        print(f"{rank:>4} {e['cost']:>10.3f}  {tuple(e['gains'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import math
+import numpy as np
+
+# WGS-84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+
+
+class LocalFrame:
+    """
+    East-North-Up frame fixed at an origin (usually home_position).
+
+    Scale factors and the ECEF->ENU rotation are computed once. delta_ne()
+    gives the local north/east offset between two nearby fixes with a few
+    multiplies (no trig), staying under 1 cm for legs of a few hundred
+    metres anywhere within ~10 km of the origin. to_enu()/from_enu() are
+    exact ellipsoidal conversions, vectorised for whole waypoint arrays.
+    """
+
+    def __init__(self, lat0, lon0, alt0=0.0):
+        self.lat0 = float(lat0)
+        self.lon0 = float(lon0)
+        self.alt0 = float(alt0)
+
+        phi, lam = math.radians(self.lat0), math.radians(self.lon0)
+        sin_phi, cos_phi = math.sin(phi), math.cos(phi)
+        sin_lam, cos_lam = math.sin(lam), math.cos(lam)
+        w2 = 1.0 - WGS84_E2 * sin_phi ** 2
+
+        # Radii of curvature at the origin: meridian (M) and prime vertical (N)
+        n = WGS84_A / math.sqrt(w2)
+        m = WGS84_A * (1.0 - WGS84_E2) / w2 ** 1.5
+        rad = math.pi / 180.0
+
+        # Metres per degree at the origin and their first-order change per degree of latitude
+        self.m_per_deg_lat = m * rad
+        self.m_per_deg_lon = n * cos_phi * rad
+        self._lat_slope = 3.0 * m * WGS84_E2 * sin_phi * cos_phi / w2 * rad * rad
+        self._lon_slope = -n * sin_phi * rad * rad
+
+        self.origin_ecef = self._ecef(self.lat0, self.lon0, self.alt0)
+        self.rotation = np.array([
+            [-sin_lam, cos_lam, 0.0],
+            [-sin_phi * cos_lam, -sin_phi * sin_lam, cos_phi],
+            [cos_phi * cos_lam, cos_phi * sin_lam, sin_phi]
+        ])
+
+    # -------------------------------
+    # Per-tick fast path
+    # -------------------------------
+    def delta_ne(self, lat_from, lon_from, lat_to, lon_to):
+        """North/east metres from one fix to another, scaled at their mid latitude."""
+        mid = 0.5 * (lat_from + lat_to) - self.lat0
+        dn = (lat_to - lat_from) * (self.m_per_deg_lat + self._lat_slope * mid)
+        de = (lon_to - lon_from) * (self.m_per_deg_lon + self._lon_slope * mid)
+        return dn, de
+
+    def distance(self, lat_from, lon_from, lat_to, lon_to):
+        dn, de = self.delta_ne(lat_from, lon_from, lat_to, lon_to)
+        return math.sqrt(dn * dn + de * de)
+
+    # -------------------------------
+    # Exact vectorised conversions
+    # -------------------------------
+    @staticmethod
+    def _ecef(lat, lon, alt):
+        phi = np.radians(lat)
+        lam = np.radians(lon)
+        sin_phi = np.sin(phi)
+        n = WGS84_A / np.sqrt(1.0 - WGS84_E2 * sin_phi ** 2)
+        x = (n + alt) * np.cos(phi) * np.cos(lam)
+        y = (n + alt) * np.cos(phi) * np.sin(lam)
+        z = (n * (1.0 - WGS84_E2) + alt) * sin_phi
+        return np.stack([x, y, z], axis=-1)
+
+    def to_enu(self, lat, lon, alt=None):
+        """Geodetic (deg, deg, m) -> (..., 3) array of east, north, up in metres."""
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        alt = np.full(lat.shape, self.alt0) if alt is None else np.asarray(alt, dtype=float)
+        return (self._ecef(lat, lon, alt) - self.origin_ecef) @ self.rotation.T
+
+    def from_enu(self, enu):
+        """(..., 3) east, north, up array -> (lat, lon, alt) arrays."""
+        ecef = np.asarray(enu, dtype=float) @ self.rotation + self.origin_ecef
+        x, y, z = ecef[..., 0], ecef[..., 1], ecef[..., 2]
+        lon = np.arctan2(y, x)
+        p = np.hypot(x, y)
+
+        # Fixed-point iteration on latitude; converges to sub-mm in a few steps near the surface
+        lat = np.arctan2(z, p * (1.0 - WGS84_E2))
+        for _ in range(4):
+            n = WGS84_A / np.sqrt(1.0 - WGS84_E2 * np.sin(lat) ** 2)
+            alt = p / np.cos(lat) - n
+            lat = np.arctan2(z, p * (1.0 - WGS84_E2 * n / (n + alt)))
+        n = WGS84_A / np.sqrt(1.0 - WGS84_E2 * np.sin(lat) ** 2)
+        alt = p / np.cos(lat) - n
+        return np.degrees(lat), np.degrees(lon), alt
@@ -0,0 +1,177 @@
+import math
+import numpy as np
+
+# Cell classes in a PolygonIndex grid
+OUTSIDE, INSIDE, BOUNDARY = 0, 1, 2
+
+
+def _segments_cross(ax, ay, bx, by, cx, cy, dx, dy):
+    """True if segment AB properly crosses segment CD (half-open on C/D)."""
+    d1 = (dx - cx) * (ay - cy) - (dy - cy) * (ax - cx)
+    d2 = (dx - cx) * (by - cy) - (dy - cy) * (bx - cx)
+    if (d1 > 0) == (d2 > 0):
+        return False
+    d3 = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+    d4 = (bx - ax) * (dy - ay) - (by - ay) * (dx - ax)
+    return (d3 > 0) != (d4 > 0)
+
+
+def points_in_polygon(px, py, vx, vy):
+    """Vectorised even-odd ray cast of points (px, py) against polygon (vx, vy)."""
+    px = np.asarray(px, dtype=float)[:, None]
+    py = np.asarray(py, dtype=float)[:, None]
+    x1, y1 = vx[None, :], vy[None, :]
+    x2, y2 = np.roll(vx, -1)[None, :], np.roll(vy, -1)[None, :]
+    straddle = (y1 > py) != (y2 > py)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+    return (np.count_nonzero(straddle & (px < x_cross), axis=1) % 2) == 1
+
+
+class PolygonIndex:
+    """
+    Uniform grid over a polygon's bounding box. Each cell is precomputed as
+    fully inside, fully outside, or boundary with the list of edges that
+    touch it, so a query costs one cell lookup plus a few edge tests.
+    """
+
+    def __init__(self, x, y, cells_per_side=None):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        n = len(self.x)
+        if n < 3:
+            raise ValueError("A fence polygon needs at least 3 vertices")
+
+        self.min_x, self.max_x = self.x.min(), self.x.max()
+        self.min_y, self.max_y = self.y.min(), self.y.max()
+        side = cells_per_side or int(min(512, max(8, 4 * math.sqrt(n))))
+        self.nx = self.ny = side
+        self.cell_w = max((self.max_x - self.min_x) / side, 1e-9)
+        self.cell_h = max((self.max_y - self.min_y) / side, 1e-9)
+        self.centre_x = (self.min_x + (np.arange(side) + 0.5) * self.cell_w).tolist()
+        self.centre_y = (self.min_y + (np.arange(side) + 0.5) * self.cell_h).tolist()
+
+        x1, y1 = self.x, self.y
+        x2, y2 = np.roll(self.x, -1), np.roll(self.y, -1)
+        self.centre_inside = self._classify_centres(x1, y1, x2, y2)
+        self.cell_edges = self._bin_edges(x1, y1, x2, y2)
+
+        cell_class = np.where(self.centre_inside, INSIDE, OUTSIDE).astype(np.int8)
+        for (i, j) in self.cell_edges:
+            cell_class[i, j] = BOUNDARY
+        self.cell_class = cell_class
+        self._centre_inside_list = self.centre_inside.tolist()
+        self._cell_class_list = cell_class.tolist()
+
+    def _classify_centres(self, x1, y1, x2, y2):
+        """Scanline even-odd test of every cell centre: one pass over the edges per row."""
+        cx = np.asarray(self.centre_x)
+        inside = np.empty((self.nx, self.ny), dtype=bool)
+        for j, yc in enumerate(self.centre_y):
+            straddle = (y1 > yc) != (y2 > yc)
+            xa, ya, xb, yb = x1[straddle], y1[straddle], x2[straddle], y2[straddle]
+            crossings = np.sort(xa + (yc - ya) * (xb - xa) / (yb - ya))
+            right = len(crossings) - np.searchsorted(crossings, cx, side="right")
+            inside[:, j] = (right % 2) == 1
+        return inside
+
+    def _bin_edges(self, x1, y1, x2, y2):
+        """Map each grid cell to the edges that pass through it (exact, vectorised)."""
+        n = len(x1)
+        last_x, last_y = self.nx - 1, self.ny - 1
+        lo_x, hi_x = np.minimum(x1, x2), np.maximum(x1, x2)
+        i0 = np.clip(((lo_x - self.min_x) / self.cell_w).astype(int), 0, last_x)
+        i1 = np.clip(((hi_x - self.min_x) / self.cell_w).astype(int), 0, last_x)
+
+        # One row per (edge, column spanned); clip the edge to that column
+        edge = np.repeat(np.arange(n), i1 - i0 + 1)
+        col = i0[edge] + np.arange(len(edge)) - np.repeat(np.cumsum(i1 - i0 + 1) - (i1 - i0 + 1), i1 - i0 + 1)
+        xa = np.maximum(self.min_x + col * self.cell_w, lo_x[edge])
+        xb = np.minimum(self.min_x + (col + 1) * self.cell_w, hi_x[edge])
+        dx = x2[edge] - x1[edge]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = np.where(dx != 0, (y2[edge] - y1[edge]) / dx, 0.0)
+        ya = np.where(dx != 0, y1[edge] + (xa - x1[edge]) * slope, np.minimum(y1[edge], y2[edge]))
+        yb = np.where(dx != 0, y1[edge] + (xb - x1[edge]) * slope, np.maximum(y1[edge], y2[edge]))
+        pad = 1e-9 * self.cell_h
+        j0 = np.clip(((np.minimum(ya, yb) - pad - self.min_y) / self.cell_h).astype(int), 0, last_y)
+        j1 = np.clip(((np.maximum(ya, yb) + pad - self.min_y) / self.cell_h).astype(int), 0, last_y)
+
+        # Expand again per row spanned within the column
+        span = j1 - j0 + 1
+        rep = np.repeat(np.arange(len(edge)), span)
+        row = j0[rep] + np.arange(len(rep)) - np.repeat(np.cumsum(span) - span, span)
+        cell = col[rep] * self.ny + row
+        edge_of = edge[rep]
+
+        order = np.argsort(cell, kind="stable")
+        cell, edge_of = cell[order], edge_of[order]
+        cells, starts = np.unique(cell, return_index=True)
+        ends = np.append(starts[1:], len(cell))
+
+        segments = list(zip(x1.tolist(), y1.tolist(), x2.tolist(), y2.tolist()))
+        edge_list = edge_of.tolist()
+        table = {}
+        for c, a, b in zip(cells.tolist(), starts.tolist(), ends.tolist()):
+            table[divmod(c, self.ny)] = [segments[e] for e in dict.fromkeys(edge_list[a:b])]
+        return table
+
+    def contains(self, px, py):
+        if px < self.min_x or px > self.max_x or py < self.min_y or py > self.max_y:
+            return False
+        i = min(int((px - self.min_x) / self.cell_w), self.nx - 1)
+        j = min(int((py - self.min_y) / self.cell_h), self.ny - 1)
+        cls = self._cell_class_list[i][j]
+        if cls != BOUNDARY:
+            return cls == INSIDE
+
+        # Parity of edge crossings on the short hop from the cell centre to the point
+        inside = self._centre_inside_list[i][j]
+        cx, cy = self.centre_x[i], self.centre_y[j]
+        for ax, ay, bx, by in self.cell_edges[(i, j)]:
+            if _segments_cross(cx, cy, px, py, ax, ay, bx, by):
+                inside = not inside
+        return inside
+
+
+class Geofence:
+    """
+    Inclusion and exclusion polygons (lists of (lat, lon)) plus an optional
+    altitude ceiling. Polygons are projected into the Guidance local frame
+    and indexed once; check() then costs a few multiplies and a grid lookup.
+    """
+
+    def __init__(self, inclusion=(), exclusion=(), max_altitude=None, cells_per_side=None):
+        self.inclusion_ll = [np.asarray(p, dtype=float) for p in inclusion]
+        self.exclusion_ll = [np.asarray(p, dtype=float) for p in exclusion]
+        self.max_altitude = max_altitude
+        self.cells_per_side = cells_per_side
+        self.frame = None
+        self.inclusion = []
+        self.exclusion = []
+        self.last_breach = None
+
+    def project(self, frame):
+        self.frame = frame
+
+        def index(poly):
+            dn, de = frame.delta_ne(frame.lat0, frame.lon0, poly[:, 0], poly[:, 1])
+            return PolygonIndex(de, dn, self.cells_per_side)
+
+        self.inclusion = [index(p) for p in self.inclusion_ll]
+        self.exclusion = [index(p) for p in self.exclusion_ll]
+
+    def check(self, lat, lon, alt):
+        """Return None when inside the fence, otherwise a short breach reason."""
+        frame = self.frame
+        dn, de = frame.delta_ne(frame.lat0, frame.lon0, lat, lon)
+
+        if self.max_altitude is not None and alt > self.max_altitude:
+            self.last_breach = "ceiling"
+        elif any(not poly.contains(de, dn) for poly in self.inclusion):
+            self.last_breach = "inclusion"
+        elif any(poly.contains(de, dn) for poly in self.exclusion):
+            self.last_breach = "exclusion"
+        else:
+            return None
+        return self.last_breach
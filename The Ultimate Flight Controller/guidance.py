@@ -1,8 +1,50 @@
 import time
 import math
+from collections import deque
+from enum import IntEnum
+import fastmath
+from geodesy import LocalFrame
+from mission import MissionQueue
+
+
+class Mode(IntEnum):
+    STABILIZE = 1
+    ALT_HOLD = 2
+    POS_HOLD = 3
+    GUIDED = 4
+    LAND = 5
+    RTL = 6
+
+
+MODE_NAMES = {
+    Mode.STABILIZE: "Stabilize",
+    Mode.ALT_HOLD: "AltHold",
+    Mode.POS_HOLD: "PosHold",
+    Mode.GUIDED: "Guided",
+    Mode.LAND: "Land",
+    Mode.RTL: "RTL"
+}
+
+# Failsafe overrides in priority order: (event, forced mode).
+# The geofence entry is replaced by Guidance.geofence_action.
+FAILSAFE_TRANSITIONS = (
+    ("battery_failsafe", Mode.LAND),
+    ("geofence_breach", Mode.RTL),
+    ("rc_failsafe", Mode.RTL)
+)
+
 
 class Guidance:
-    def __init__(self):
+    def __init__(self, clock=time.time, fast_math=False, profile=False):
+        # Time source; swap in a simulated clock for offline replay
+        self.clock = clock
+        # Trig kernels: False / "exact" or True / "fast" (see fastmath)
+        self.math = fastmath.kernels(fast_math)
+        # Optional span recording, see set_tracer
+        self.tracer = None
+        self._trace_ids = {}
+        # Handlers are only timed (handler_stats) when profiling or tracing
+        self.profile = profile
         # Limits
         self.max_roll_deg = 30.0
         self.max_pitch_deg = 30.0
@@ -21,6 +63,7 @@ class Guidance:
         # Position Hold & RTL
         self.hold_position = None
         self.home_position = None
+        self.local_frame = None  # ENU frame at home (provisional until home is set)
         self.home_buffer = []
         self.home_set = False
         self.rtl_stage = None
@@ -31,9 +74,103 @@ class Guidance:
         self.guided_target = {}
         self.guided_stage = None
 
+        # Guided mission
+        self.mission = None
+        self.mission_hold_start = None
+        self.mission_lookahead = 1.0  # s of travel at waypoint speed used as max position error
+
         # Output
         self.guidance_output = self._default_output()
 
+        # Geofence
+        self.geofence = None
+        self.geofence_action = Mode.RTL
+        self.geofence_breach = None
+        self._fence_latch_mode = None
+
+        # Mode state machine, compiled once
+        self.mode = None
+        self._pending_reaction = None
+        self._build_state_machine()
+
+    def _build_state_machine(self):
+        self._handlers = {
+            Mode.STABILIZE: self._stabilize,
+            Mode.ALT_HOLD: self._alt_hold,
+            Mode.POS_HOLD: self._pos_hold,
+            Mode.GUIDED: self._guided,
+            Mode.LAND: self._land,
+            Mode.RTL: self._rtl
+        }
+        # Guided command -> handler, RTL stage -> handler
+        self._guided_commands = {
+            "takeoff": self._guided_takeoff,
+            "goto": self._guided_goto,
+            "mission": self._guided_mission,
+            "land": self._land,
+            "rtl": self._guided_rtl
+        }
+        self._rtl_stages = {
+            None: self._rtl_start,
+            "goto_home": self._rtl_goto_home,
+            "descend": self._land
+        }
+        self._on_enter = {
+            Mode.POS_HOLD: self._enter_pos_hold,
+            Mode.GUIDED: self._enter_guided,
+            Mode.RTL: self._enter_rtl
+        }
+        self._on_exit = {
+            Mode.STABILIZE: self._exit_stabilize,
+            Mode.RTL: self._exit_rtl
+        }
+
+        # Requested mode id -> Mode; unknown ids fall back to Stabilize
+        self._requested = {int(m): m for m in Mode}
+
+        self._build_failsafe_table()
+
+        # Timing: recent transitions and per-handler execution time
+        self.transitions = deque(maxlen=256)  # (time, from, to, reason, reaction_s)
+        self._reaction_start = None
+        self.handler_stats = {m: [0, 0.0, 0.0] for m in Mode}  # calls, total_s, max_s
+
+    def _build_failsafe_table(self):
+        # (battery_failsafe, geofence_breach, rc_failsafe) -> (forced mode, reason) or None
+        transitions = [(event, self.geofence_action if event == "geofence_breach" else mode)
+                       for event, mode in FAILSAFE_TRANSITIONS]
+        self._failsafe_table = {}
+        for battery in (False, True):
+            for fence in (False, True):
+                for rc in (False, True):
+                    active = {"battery_failsafe": battery, "geofence_breach": fence, "rc_failsafe": rc}
+                    self._failsafe_table[(battery, fence, rc)] = next(
+                        ((mode, event) for event, mode in transitions if active[event]), None)
+
+    def set_geofence(self, geofence, action=Mode.RTL):
+        """Install a Geofence (or None); a breach forces `action` (LAND or RTL)."""
+        self.geofence = geofence
+        self.geofence_action = Mode(action)
+        self.geofence_breach = None
+        self._fence_latch_mode = None
+        self._build_failsafe_table()
+
+    def _check_geofence(self, states, flight_mode):
+        """Latched breach: cleared once the pilot selects a different mode."""
+        if self.geofence is None or self.local_frame is None:
+            return False
+        if self.geofence_breach is not None:
+            if flight_mode == self._fence_latch_mode:
+                return True
+            self.geofence_breach = None
+        if self.geofence.frame is not self.local_frame:
+            self.geofence.project(self.local_frame)
+        self.geofence_breach = self.geofence.check(states[0], states[1], states[2])
+        if self.geofence_breach is None:
+            return False
+        self._fence_latch_mode = flight_mode
+        return True
+
     def _default_output(self):
         return {"desired_roll": 0.0, "desired_pitch": 0.0, "desired_yaw": 0.0, "desired_thrust": 0.0}
 
@@ -47,39 +184,105 @@ class Guidance:
         return self.guidance_output
 
     def process(self, states, flight_mode, rc_failsafe, battery_failsafe, rc_input_pwm):
+        tracer = self.tracer
+        if tracer is not None:
+            trace_start = tracer.now()
         self.last_state = states
         self.rc_input_pwm = rc_input_pwm
-        self.current_mode = flight_mode
 
         self._update_home_position(states)
 
-        if battery_failsafe:
-            self.current_mode = 5  # LAND
-        elif rc_failsafe:
-            self.current_mode = 6  # RTL
-
-        mode_function_map = {
-            1: self._stabilize,
-            2: self._alt_hold,
-            3: self._pos_hold,
-            4: self._guided,
-            5: self._land,
-            6: self._rtl
-        }
+        fence_breach = self._check_geofence(states, flight_mode)
+        forced = self._failsafe_table[(bool(battery_failsafe), fence_breach, bool(rc_failsafe))]
+        if forced is None:
+            mode, reason = self._requested.get(flight_mode, Mode.STABILIZE), "request"
+        else:
+            mode, reason = forced
+        if mode is not self.mode:
+            self._transition(mode, reason)
+
+        # Handlers may relabel the tick (Guided running an RTL command)
+        self.current_mode = mode
+        if self.profile or tracer is not None:
+            if tracer is not None:
+                span_start = tracer.now()
+            handler_start = time.perf_counter()
+            result = self._handlers[mode]()
+            handler_end = time.perf_counter()
+            if tracer is not None:
+                tracer.add(self._trace_ids[mode], span_start, tracer.now())
+
+            stats = self.handler_stats[mode]
+            elapsed = handler_end - handler_start
+            stats[0] += 1
+            stats[1] += elapsed
+            if elapsed > stats[2]:
+                stats[2] = elapsed
+        else:
+            result = self._handlers[mode]()
 
-        mode_name_map = {
-            1: "Stabilize",
-            2: "AltHold",
-            3: "PosHold",
-            4: "Guided",
-            5: "Land",
-            6: "RTL"
-        }
+        if self._pending_reaction is not None:
+            # Time from the failsafe lookup picking the new mode to its first output
+            self.transitions[-1] = self._pending_reaction + (time.perf_counter() - self._reaction_start,)
+            self._pending_reaction = None
 
-        result = mode_function_map.get(self.current_mode, self._stabilize)()
-        result["mode"] = mode_name_map.get(self.current_mode, "Stabilize")
+        result["mode"] = MODE_NAMES[self.current_mode]
+        if tracer is not None:
+            tracer.add(self._trace_ids["process"], trace_start, tracer.now())
         return result
 
+    def _transition(self, mode, reason):
+        self._reaction_start = time.perf_counter()
+        prev = self.mode
+        if prev is not None and prev in self._on_exit:
+            self._on_exit[prev]()
+        self.mode = mode
+        if mode in self._on_enter:
+            self._on_enter[mode]()
+        self._pending_reaction = (self.clock(), prev, mode, reason)
+        self.transitions.append(self._pending_reaction + (None,))
+
+    def set_tracer(self, tracer):
+        """Record a span per process() call and per mode handler into a tracing.Tracer; None disables."""
+        self.tracer = tracer
+        if tracer is not None:
+            self._trace_ids = {mode: tracer.intern("guidance." + name) for mode, name in MODE_NAMES.items()}
+            self._trace_ids["process"] = tracer.intern("guidance.process")
+
+    def failsafe_reaction_times(self):
+        """Reaction times (s) of every recorded transition forced by a failsafe."""
+        return [t[4] for t in self.transitions if t[3] != "request" and t[4] is not None]
+
+    def handler_report(self):
+        """Per-mode handler timings; only filled while profile is set or a tracer is attached."""
+        return {
+            MODE_NAMES[m]: {
+                "calls": calls,
+                "mean_us": total / calls * 1e6 if calls else 0.0,
+                "max_us": peak * 1e6
+            }
+            for m, (calls, total, peak) in self.handler_stats.items()
+        }
+
+    # Entry / exit actions
+    def _exit_stabilize(self):
+        # Stabilize tracks no altitude; start the next mode from the current one
+        self.target_altitude = None
+        self.prev_time = None
+
+    def _enter_pos_hold(self):
+        self.hold_position = None
+
+    def _enter_guided(self):
+        self.guided_stage = None
+        self.rtl_stage = None
+
+    def _enter_rtl(self):
+        self.rtl_stage = None
+
+    def _exit_rtl(self):
+        self.rtl_stage = None
+
     def _stabilize(self):
         roll, pitch = self._manual_angle_inputs()
         yaw = self._map_pwm_to_rate(self.rc_input_pwm[2], self.max_yaw_rate_deg)
@@ -105,20 +308,17 @@ class Guidance:
         else:
             if self.hold_position is None:
                 self.hold_position = (lat, lon)
-            roll, pitch = self._compute_pos_error(self.hold_position, (lat, lon), lat, yaw_rad)
+            roll, pitch = self._compute_pos_error(self.hold_position, (lat, lon), yaw_rad)
 
         self._update_target_altitude()
         return self._set_guidance_output(roll, pitch, yaw, self.target_altitude)
 
     def _guided(self):
-        cmd = self.guided_command
-        if cmd == "takeoff": return self._guided_takeoff()
-        if cmd == "goto": return self._guided_goto()
-        if cmd == "land": return self._land()
-        if cmd == "rtl":
-            self.current_mode = 6
-            return self._rtl()
-        return self._failsafe()
+        return self._guided_commands.get(self.guided_command, self._failsafe)()
+
+    def _guided_rtl(self):
+        self.current_mode = Mode.RTL
+        return self._rtl()
 
     def _land(self):
         self._init_altitude_if_needed()
@@ -128,29 +328,22 @@ class Guidance:
     def _rtl(self):
         if not self.home_set:
             return self._failsafe()
+        return self._rtl_stages[self.rtl_stage]()
 
+    def _rtl_start(self):
+        self.rtl_stage = "goto_home"
+        self._init_altitude_if_needed()
+        return self._rtl_goto_home()
+
+    def _rtl_goto_home(self):
         lat, lon, alt, _, _, yaw_deg = self.last_state
         home_lat, home_lon = self.home_position
-        dx = (home_lat - lat) * 111000.0
-        dy = (home_lon - lon) * 111000.0 * math.cos(math.radians(lat))
-        dist = math.sqrt(dx ** 2 + dy ** 2)
-
-        if self.rtl_stage is None:
-            self.rtl_stage = "goto_home"
-            self._init_altitude_if_needed()
-
-        if self.rtl_stage == "goto_home":
-            if dist <= self.rtl_tolerance:
-                self.rtl_stage = "descend"
-                return self._land()
-            yaw_rad = math.radians(yaw_deg)
-            roll, pitch = self._compute_pos_error((home_lat, home_lon), (lat, lon), lat, yaw_rad)
-            return self._set_guidance_output(roll, pitch, 0.0, self.target_altitude)
-
-        elif self.rtl_stage == "descend":
+        if self.local_frame.distance(lat, lon, home_lat, home_lon) <= self.rtl_tolerance:
+            self.rtl_stage = "descend"
             return self._land()
-
-        return self.guidance_output
+        yaw_rad = math.radians(yaw_deg)
+        roll, pitch = self._compute_pos_error((home_lat, home_lon), (lat, lon), yaw_rad)
+        return self._set_guidance_output(roll, pitch, 0.0, self.target_altitude)
 
     def _failsafe(self):
         return self._set_guidance_output(0.0, 0.0, 0.0, 0.0)
@@ -159,6 +352,20 @@ class Guidance:
         self.guided_command = command
         self.guided_target = target or {}
         self.guided_stage = None
+        self.rtl_stage = None
+        if command == "mission" and "waypoints" in self.guided_target:
+            self.load_mission(self.guided_target["waypoints"])
+
+    def load_mission(self, waypoints):
+        """
+        waypoints: [{"lat", "lon", "altitude", "speed", "hold", "radius"}, ...]
+        Edit the running mission with self.mission.insert/remove/skip.
+        """
+        self.mission = MissionQueue(waypoints)
+        self.mission_hold_start = None
+        if self.local_frame is not None:
+            self.mission.project(self.local_frame)
+        self.guided_command = "mission"
 
     def _guided_takeoff(self):
         target_alt = self.guided_target.get("altitude", 5.0)
@@ -182,26 +389,66 @@ class Guidance:
         tgt_alt = self.guided_target["altitude"]
 
         yaw_rad = math.radians(yaw_deg)
-        roll, pitch = self._compute_pos_error((tgt_lat, tgt_lon), (lat, lon), lat, yaw_rad)
+        roll, pitch = self._compute_pos_error((tgt_lat, tgt_lon), (lat, lon), yaw_rad)
 
         self._init_altitude_if_needed()
         alt_error = tgt_alt - alt
         climb_rate = max(-1.0, min(1.0, alt_error))
         self.target_altitude += climb_rate * self._dt()
 
-        dist = math.sqrt((tgt_lat - lat) ** 2 + (tgt_lon - lon) ** 2) * 111000.0
+        dist = self.local_frame.distance(lat, lon, tgt_lat, tgt_lon)
         if dist < 0.5 and abs(alt_error) < 0.2:
             return self._alt_hold()
 
         return self._set_guidance_output(roll, pitch, 0.0, self.target_altitude)
 
+    def _guided_mission(self):
+        mission = self.mission
+        if mission is None or len(mission) == 0:
+            return self._failsafe()
+        if mission.frame is not self.local_frame:
+            mission.project(self.local_frame)  # home frame replaced the provisional one
+
+        # Hold on the last waypoint once the mission is complete
+        wp = mission.active or mission[-1]
+
+        lat, lon, alt, _, _, yaw_deg = self.last_state
+        frame = self.local_frame
+        north, east = frame.delta_ne(frame.lat0, frame.lon0, lat, lon)
+        dx, dy = wp.enu[1] - north, wp.enu[0] - east
+        dist = math.sqrt(dx * dx + dy * dy)
+
+        max_error = wp.speed * self.mission_lookahead
+        if dist > max_error:
+            dx *= max_error / dist
+            dy *= max_error / dist
+        roll, pitch = self._body_tilt(dx, dy, math.radians(yaw_deg))
+
+        self._init_altitude_if_needed()
+        alt_error = wp.altitude - alt
+        climb_rate = max(-1.0, min(1.0, alt_error))
+        self.target_altitude += climb_rate * self._dt()
+
+        if not mission.complete and dist <= wp.radius and abs(alt_error) < 0.2:
+            now = self.clock()
+            if self.mission_hold_start is None:
+                self.mission_hold_start = now
+            if now - self.mission_hold_start >= wp.hold:
+                mission.skip()
+                self.mission_hold_start = None
+
+        return self._set_guidance_output(roll, pitch, 0.0, self.target_altitude)
+
     def _update_home_position(self, states):
         lat, lon = states[0], states[1]
         if not self.home_set:
+            if self.local_frame is None:
+                self.local_frame = LocalFrame(lat, lon)
             self.home_buffer.append((lat, lon))
             if len(self.home_buffer) >= 4:
                 self.home_position = tuple(sum(x) / len(x) for x in zip(*self.home_buffer))
                 self.home_set = True
+                self.local_frame = LocalFrame(*self.home_position)
 
     def _manual_angle_inputs(self):
         roll = self._map_pwm_to_angle(self.rc_input_pwm[0], self.max_roll_deg)
@@ -224,25 +471,28 @@ class Guidance:
             rate = 0.0
         self.target_altitude += rate * self._dt()
 
-    def _compute_pos_error(self, target, current, lat_ref, yaw_rad):
-        dx = (target[0] - current[0]) * 111000.0
-        dy = (target[1] - current[1]) * 111000.0 * math.cos(math.radians(lat_ref))
-        x_body = math.cos(yaw_rad) * dx + math.sin(yaw_rad) * dy
-        y_body = -math.sin(yaw_rad) * dx + math.cos(yaw_rad) * dy
+    def _compute_pos_error(self, target, current, yaw_rad):
+        dx, dy = self.local_frame.delta_ne(current[0], current[1], target[0], target[1])
+        return self._body_tilt(dx, dy, yaw_rad)
+
+    def _body_tilt(self, dx, dy, yaw_rad):
+        cos_yaw, sin_yaw = self.math.cos(yaw_rad), self.math.sin(yaw_rad)
+        x_body = cos_yaw * dx + sin_yaw * dy
+        y_body = -sin_yaw * dx + cos_yaw * dy
         kp = 2.0
         roll = max(-self.max_roll_deg, min(self.max_roll_deg, kp * y_body))
         pitch = max(-self.max_pitch_deg, min(self.max_pitch_deg, kp * x_body))
         return roll, pitch
 
     def _init_altitude_if_needed(self):
-        now = time.time()
+        now = self.clock()
         if self.target_altitude is None:
             self.target_altitude = self.last_state[2]
         if self.prev_time is None:
             self.prev_time = now
 
     def _dt(self):
-        now = time.time()
+        now = self.clock()
         if self.prev_time is None:
             self.prev_time = now
         dt = now - self.prev_time
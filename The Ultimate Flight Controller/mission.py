@@ -0,0 +1,179 @@
+import random
+import numpy as np
+
+
+class Waypoint:
+    __slots__ = ("lat", "lon", "altitude", "speed", "hold", "radius", "enu")
+
+    def __init__(self, lat, lon, altitude, speed=2.0, hold=0.0, radius=1.0):
+        self.lat = lat
+        self.lon = lon
+        self.altitude = altitude
+        self.speed = speed      # m/s cap on the approach
+        self.hold = hold        # s to loiter once accepted
+        self.radius = radius    # m acceptance radius
+        self.enu = None         # (east, north, up) from the mission frame origin, see MissionQueue.project
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["lat"], d["lon"], d["altitude"], d.get("speed", 2.0),
+                   d.get("hold", 0.0), d.get("radius", 1.0))
+
+
+class _Node:
+    __slots__ = ("item", "priority", "size", "left", "right")
+
+    def __init__(self, item, priority):
+        self.item = item
+        self.priority = priority
+        self.size = 1
+        self.left = None
+        self.right = None
+
+
+def _size(node):
+    return node.size if node else 0
+
+
+def _update(node):
+    node.size = 1 + _size(node.left) + _size(node.right)
+    return node
+
+
+class MissionQueue:
+    """
+    Ordered waypoint list as an implicit treap: positional get, insert and
+    remove are O(log n) without rebuilding the mission. `cursor` is the
+    index of the active waypoint.
+    """
+
+    def __init__(self, waypoints=(), seed=0):
+        self._rng = random.Random(seed)
+        self.cursor = 0
+        self.frame = None
+        items = [w if isinstance(w, Waypoint) else Waypoint.from_dict(w) for w in waypoints]
+        self.root = self._build(items)
+
+    def _build(self, items):
+        # O(n) Cartesian-tree build over the right spine
+        stack = []
+        for item in items:
+            node = _Node(item, self._rng.random())
+            last = None
+            while stack and stack[-1].priority < node.priority:
+                last = _update(stack.pop())
+            node.left = last
+            if stack:
+                stack[-1].right = node
+            stack.append(node)
+        root = None
+        while stack:
+            root = _update(stack.pop())
+        return root
+
+    def _split(self, node, k):
+        """Split into (first k items, rest)."""
+        if node is None:
+            return None, None
+        if _size(node.left) >= k:
+            left, node.left = self._split(node.left, k)
+            return left, _update(node)
+        node.right, right = self._split(node.right, k - _size(node.left) - 1)
+        return _update(node), right
+
+    def _merge(self, a, b):
+        if a is None or b is None:
+            return a or b
+        if a.priority > b.priority:
+            a.right = self._merge(a.right, b)
+            return _update(a)
+        b.left = self._merge(a, b.left)
+        return _update(b)
+
+    def __len__(self):
+        return _size(self.root)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("waypoint index out of range")
+        node = self.root
+        while True:
+            left = _size(node.left)
+            if index < left:
+                node = node.left
+            elif index == left:
+                return node.item
+            else:
+                index -= left + 1
+                node = node.right
+
+    def __iter__(self):
+        stack, node = [], self.root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.item
+            node = node.right
+
+    def insert(self, index, waypoint):
+        if not isinstance(waypoint, Waypoint):
+            waypoint = Waypoint.from_dict(waypoint)
+        if self.frame is not None:
+            frame = self.frame
+            dn, de = frame.delta_ne(frame.lat0, frame.lon0, waypoint.lat, waypoint.lon)
+            waypoint.enu = (de, dn, waypoint.altitude - frame.alt0)
+        index = max(0, min(index, len(self)))
+        left, right = self._split(self.root, index)
+        self.root = self._merge(self._merge(left, _Node(waypoint, self._rng.random())), right)
+        if index < self.cursor:
+            self.cursor += 1  # keep pointing at the same active waypoint
+
+    def remove(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError("waypoint index out of range")
+        left, rest = self._split(self.root, index)
+        removed, right = self._split(rest, 1)
+        self.root = self._merge(left, right)
+        if index < self.cursor:
+            self.cursor -= 1
+        return removed.item
+
+    def skip(self, count=1):
+        self.cursor = min(self.cursor + count, len(self))
+
+    @property
+    def active(self):
+        return self[self.cursor] if self.cursor < len(self) else None
+
+    @property
+    def complete(self):
+        return self.cursor >= len(self)
+
+    def project(self, frame):
+        """
+        Pre-project every waypoint into `frame` with one vectorised call, using
+        the origin-relative delta_ne the geofence uses, so steering needs only
+        the same few multiplies per tick for the vehicle.
+        """
+        self.frame = frame
+        items = list(self)
+        if not items:
+            return
+        coords = np.array([(w.lat, w.lon, w.altitude) for w in items])
+        dn, de = frame.delta_ne(frame.lat0, frame.lon0, coords[:, 0], coords[:, 1])
+        for w, e, n, u in zip(items, de.tolist(), dn.tolist(), (coords[:, 2] - frame.alt0).tolist()):
+            w.enu = (e, n, u)
+
+    def remaining_distance(self, from_enu=None):
+        """Horizontal path length (m) from `from_enu` (or the active waypoint) to the end."""
+        pts = [w.enu for i, w in enumerate(self) if i >= self.cursor and w.enu is not None]
+        if from_enu is not None:
+            pts.insert(0, from_enu)
+        if len(pts) < 2:
+            return 0.0
+        xy = np.array(pts)[:, :2]
+        return float(np.hypot(*np.diff(xy, axis=0).T).sum())
@@ -1,7 +1,13 @@
 import math
+import time
+import numpy as np
+import fastmath
+from calibration import CalibrationProfile
+from ekf import QuaternionEKF, ALT
+from sensor_buffers import SensorRing
 
 class Navigation:
-    def __init__(self):
+    def __init__(self, backend="complementary", clock=time.time, calibration=None, fast_math=False):
         # Constants
         self.P0 = 101325
         self.ACCEL_SCALE = 9.80665 / 16384.0
@@ -20,6 +26,78 @@ class Navigation:
         # Persistent state: roll, pitch, yaw (rad), alt (m)
         self.prev_state = [0.0, 0.0, 0.0, 0.0]
 
+        # Estimator backend: "complementary" (fixed gains) or "ekf"
+        if backend not in ("complementary", "ekf"):
+            raise ValueError(f"Unknown navigation backend: {backend}")
+        self.backend = backend
+        self.clock = clock
+        # atan2 / sin / cos / baro kernels: False / "exact" or True / "fast" (see fastmath)
+        self.math = fastmath.kernels(fast_math)
+        self.prev_time = None
+        self.ekf = QuaternionEKF() if backend == "ekf" else None
+
+        # Asynchronous (timestamped) fusion, see process_async
+        self.gps_latency = 0.2  # s between a GPS fix being valid and its arrival
+        self._last_imu_t = None
+        self._alt_history = SensorRing(1, 4096)  # (t, predicted altitude) per IMU sample
+        self._alt_baro = None  # latest baro / GPS altitude (complementary backend)
+        self._alt_gps = None
+        # process_rings drops queued samples older than this behind the newest IMU sample
+        self.max_sample_age = 1.0  # s, above the slowest (1 Hz) GPS period
+
+        # Sensor calibration (calibration.CalibrationProfile or a profile path)
+        if isinstance(calibration, str):
+            calibration = CalibrationProfile.load(calibration)
+        self.calibration = calibration
+
+        # Precomputed mounting rotations (scale folded in) for the batch path
+        self._build_batch_matrices()
+
+        # Optional span recording, see set_tracer
+        self.tracer = None
+        self._trace_ids = {}
+
+    def _rotation_matrix(self, angle_deg):
+        angle_rad = math.radians(angle_deg)
+        c, s = math.cos(angle_rad), math.sin(angle_rad)
+        return np.array([[c, -s, 0.0],
+                         [s, c, 0.0],
+                         [0.0, 0.0, 1.0]])
+
+    def _build_batch_matrices(self):
+        """
+        Rebuild the batch correction after changing orientation_angles or the
+        calibration. Each sensor becomes corrected = matrix @ raw + offset,
+        with calibration, scale and mounting rotation folded together.
+        """
+        self.acc_matrix = self._rotation_matrix(self.orientation_angles['mpu6050']) * self.ACCEL_SCALE
+        self.gyro_matrix = self._rotation_matrix(self.orientation_angles['mpu6050']) * self.GYRO_SCALE
+        self.mag_matrix = self._rotation_matrix(self.orientation_angles['mag'])
+        self.acc_offset = np.zeros(3)
+        self.gyro_offset = np.zeros(3)
+        self.mag_offset = np.zeros(3)
+
+        if self.calibration is not None:
+            for sensor, name in (("accel", "acc"), ("gyro", "gyro"), ("mag", "mag")):
+                cal_matrix, cal_bias = self.calibration.affine(sensor)
+                matrix = getattr(self, name + "_matrix") @ cal_matrix
+                setattr(self, name + "_matrix", matrix)
+                setattr(self, name + "_offset", -(matrix @ cal_bias))
+
+    def set_tracer(self, tracer):
+        """Record per-call spans into a tracing.Tracer; None disables."""
+        self.tracer = tracer
+        if tracer is not None:
+            self._trace_ids = {name: tracer.intern("navigation." + name)
+                               for name in ("process", "process_batch", "process_async", "fuse")}
+
+    def load_calibration(self, profile):
+        """Apply a CalibrationProfile (or profile path) to every later sample."""
+        if isinstance(profile, str):
+            profile = CalibrationProfile.load(profile)
+        self.calibration = profile
+        self._build_batch_matrices()
+
     def rotate_z(self, vec, angle_deg):
         angle_rad = math.radians(angle_deg)
         x, y, z = vec
@@ -42,8 +120,13 @@ class Navigation:
         Output:
             [lat, lon, alt, roll_deg, pitch_deg, yaw_deg]
         """
+        if self.calibration is not None:
+            # The calibrated correction only exists as the precomputed matrices
+            return self.process_batch(mpu6050_list, gps_list, mag_list, baro_list)
 
-        prev_roll, prev_pitch, prev_yaw, prev_alt = self.prev_state
+        tracer = self.tracer
+        if tracer is not None:
+            start = tracer.now()
 
         # 1. Rotate and scale MPU6050 data
         acc_list, gyro_list = [], []
@@ -65,21 +148,290 @@ class Navigation:
         gps_avg = self.average(gps_list)
         baro_avg = self.average(baro_list)
 
+        result = self._fuse(acc_avg, gyro_avg, mag_avg, gps_avg, baro_avg)
+        if tracer is not None:
+            tracer.record(self._trace_ids["process"], start)
+        return result
+
+    def process_batch(self, mpu6050, gps, mag, baro):
+        """
+        Batch variant of process() for large sensor bursts.
+
+        Inputs:
+            mpu6050: (N, 6) array of raw [ax, ay, az, gx, gy, gz]
+            gps    : (N, 3) array of [lat, lon, alt]
+            mag    : (N, 3) array of [mx, my, mz]
+            baro   : (N, 3) array of [pressure, temp, humidity]
+
+        Output:
+            [lat, lon, alt, roll_deg, pitch_deg, yaw_deg]
+        """
+
+        tracer = self.tracer
+        if tracer is not None:
+            start = tracer.now()
+
+        # 1. Reduce each burst in one pass (rotation and scale are linear,
+        #    so they can be applied once to the mean instead of per sample)
+        imu_mean = np.asarray(mpu6050, dtype=float).mean(axis=0)
+        mag_mean = np.asarray(mag, dtype=float).mean(axis=0)
+        gps_avg = np.asarray(gps, dtype=float).mean(axis=0).tolist()
+        baro_avg = np.asarray(baro, dtype=float).mean(axis=0).tolist()
+
+        # 2. Apply precomputed calibration and mounting rotations
+        acc_avg = (self.acc_matrix @ imu_mean[:3] + self.acc_offset).tolist()
+        gyro_avg = (self.gyro_matrix @ imu_mean[3:6] + self.gyro_offset).tolist()
+        mag_avg = (self.mag_matrix @ mag_mean + self.mag_offset).tolist()
+
+        result = self._fuse(acc_avg, gyro_avg, mag_avg, gps_avg, baro_avg)
+        if tracer is not None:
+            tracer.record(self._trace_ids["process_batch"], start)
+        return result
+
+    def process_rings(self, rings):
+        """
+        Consume every new sample from sensor_buffers rings
+        ({"mpu6050", "gps", "mag", "baro"} -> SensorRing) as array views.
+        Queued samples more than max_sample_age older than the newest IMU
+        sample are dropped rather than averaged in; a sensor with no new
+        samples reuses its latest one.
+
+        Output:
+            [lat, lon, alt, roll_deg, pitch_deg, yaw_deg]
+        """
+        imu = rings["mpu6050"].latest()
+        cutoff = None if imu is None else imu[0][0] - self.max_sample_age
+        windows = []
+        used = []
+        for name in ("mpu6050", "gps", "mag", "baro"):
+            ring = rings[name]
+            times, values = ring.window()
+            used.append(len(values))
+            if cutoff is not None and len(times) and times[0] < cutoff:
+                values = values[int(np.searchsorted(times, cutoff)):]
+            if len(values) == 0:
+                latest = ring.latest()
+                if latest is None:
+                    raise ValueError(f"No {name} samples received yet")
+                values = latest[1]
+            windows.append(values)
+
+        result = self.process_batch(*windows)
+        for name, n in zip(("mpu6050", "gps", "mag", "baro"), used):
+            rings[name].consume(n)
+        return result
+
+    def process_async(self, rings):
+        """
+        Multi-rate fusion over timestamped rings.
+
+        EKF backend: every IMU sample is a prediction step with its own dt.
+        Magnetometer, baro and GPS samples are applied once each, in time
+        order, as soon as the IMU has caught up with their timestamp. Later
+        samples stay queued for the next call. GPS altitude is compared with
+        the predicted altitude gps_latency seconds before it arrived.
+
+        Complementary backend: see _process_async_complementary.
+
+        Output:
+            [lat, lon, alt, roll_deg, pitch_deg, yaw_deg]
+        """
+        ekf = self.ekf
+        if ekf is None:
+            return self._process_async_complementary(rings)
+        tracer = self.tracer
+        if tracer is not None:
+            start = tracer.now()
+
+        imu_t, imu_v = rings["mpu6050"].window()
+        if len(imu_t) == 0 and not ekf.initialized:
+            raise ValueError("No mpu6050 samples received yet")
+
+        # Calibrate, scale and rotate the whole IMU window at once
+        acc = imu_v[:, :3] @ self.acc_matrix.T + self.acc_offset
+        gyro = imu_v[:, 3:6] @ self.gyro_matrix.T + self.gyro_offset
+
+        if not ekf.initialized:
+            # Only the samples queued now are superseded by the initial state; later ones stay queued
+            stale = {name: len(rings[name]) for name in ("mag", "baro", "gps")}
+            mag, baro = rings["mag"].latest(), rings["baro"].latest()
+            if mag is None or baro is None:
+                raise ValueError("Need mag and baro samples to initialise the EKF")
+            ekf.initialize(acc.mean(axis=0).tolist(), (self.mag_matrix @ mag[1][0] + self.mag_offset).tolist(),
+                           self._baro_altitude(baro[1][0, 0]))
+            self._last_imu_t = float(imu_t[0])
+            for name, n in stale.items():
+                rings[name].consume(n)
+
+        # Slow sensors merged into one time-ordered queue
+        events = []
+        for name in ("mag", "baro", "gps"):
+            t, v = rings[name].window()
+            events.extend(zip(t.tolist(), [name] * len(t), v.tolist()))
+        events.sort(key=lambda e: e[0])
+        used = {"mag": 0, "baro": 0, "gps": 0}
+        next_event = 0
+
+        history = self._alt_history
+        for t, g, a in zip(imu_t.tolist(), gyro.tolist(), acc.tolist()):
+            # Measurements stamped before this IMU sample belong to the previous interval
+            while next_event < len(events) and events[next_event][0] <= t:
+                self._apply_event(events[next_event])
+                used[events[next_event][1]] += 1
+                next_event += 1
+
+            dt = t - self._last_imu_t
+            if dt > 0.0:
+                ekf.predict(g, a, min(dt, 0.1))
+                self._last_imu_t = t
+            if len(history) >= history.capacity:
+                history.consume(1)
+            history.push(t, ekf.x[ALT])
+
+        # Gravity-direction correction once per call from the mean accelerometer
+        if len(imu_t):
+            ekf.update_accel(acc.mean(axis=0).tolist())
+
+        rings["mpu6050"].consume(len(imu_t))
+        for name, n in used.items():
+            rings[name].consume(n)
+
+        gps = rings["gps"].latest()
+        lat, lon = (gps[1][0, 0], gps[1][0, 1]) if gps is not None else (0.0, 0.0)
+        roll, pitch, yaw = ekf.euler()
+        alt = float(ekf.x[ALT])
+        self.prev_state = [roll, pitch, yaw, alt]
+        if tracer is not None:
+            tracer.record(self._trace_ids["process_async"], start)
+        return [lat, lon, alt, math.degrees(roll), math.degrees(pitch), math.degrees(yaw)]
+
+    def _process_async_complementary(self, rings):
+        """
+        The complementary filter run per sample instead of per tick: every
+        IMU sample integrates its gyro over its own dt and blends in its
+        accelerometer tilt, each new magnetometer sample pulls yaw towards
+        its heading once, and altitude only changes when a new baro or GPS
+        sample arrives. Every queued sample is used exactly once.
+        """
+        tracer = self.tracer
+        if tracer is not None:
+            start = tracer.now()
+
+        imu_t, imu_v = rings["mpu6050"].window()
+        n = len(imu_t)
+        if n == 0 and self._last_imu_t is None:
+            raise ValueError("No mpu6050 samples received yet")
+        roll, pitch, yaw, alt = self.prev_state
+
+        if n:
+            acc = imu_v[:, :3] @ self.acc_matrix.T + self.acc_offset
+            gyro = imu_v[:, 3:6] @ self.gyro_matrix.T + self.gyro_offset
+            last_t = imu_t[0] if self._last_imu_t is None else self._last_imu_t
+            dt = np.clip(np.diff(imu_t, prepend=last_t), 0.0, 0.1)
+
+            # x_k = a (x_{k-1} + g_k dt_k) + (1 - a) z_k, unrolled over the window
+            a = self.ALPHA_RPY
+            weights = a ** np.arange(n - 1, -1, -1, dtype=float)
+            acc_roll = self.math.atan2_v(acc[:, 1], acc[:, 2])
+            acc_pitch = self.math.atan2_v(-acc[:, 0], np.hypot(acc[:, 1], acc[:, 2]))
+            decay = a ** n
+            roll = float(decay * roll + weights @ (a * gyro[:, 0] * dt + (1 - a) * acc_roll))
+            pitch = float(decay * pitch + weights @ (a * gyro[:, 1] * dt + (1 - a) * acc_pitch))
+            yaw += float(gyro[:, 2] @ dt)
+            self._last_imu_t = float(imu_t[-1])
+            rings["mpu6050"].consume(n)
+
+        _, mag = rings["mag"].window()
+        if len(mag):
+            m = self.math
+            mag_avg = (mag.mean(axis=0) @ self.mag_matrix.T + self.mag_offset).tolist()
+            sin_r, cos_r = m.sin(roll), m.cos(roll)
+            sin_p, cos_p = m.sin(pitch), m.cos(pitch)
+            mag_x = mag_avg[0] * cos_p + mag_avg[2] * sin_p
+            mag_y = mag_avg[0] * sin_r * sin_p + mag_avg[1] * cos_r - mag_avg[2] * sin_r * cos_p
+            # One correction per magnetometer sample
+            keep = self.ALPHA_RPY ** len(mag)
+            yaw = keep * yaw + (1 - keep) * m.atan2(-mag_y, mag_x)
+            rings["mag"].consume(len(mag))
+
+        _, baro = rings["baro"].window()
+        if len(baro):
+            self._alt_baro = float(np.mean(self.math.baro_altitude_v(baro[:, 0], self.P0)))
+            rings["baro"].consume(len(baro))
+        _, gps_new = rings["gps"].window()
+        if len(gps_new):
+            self._alt_gps = float(gps_new[-1, 2])
+            rings["gps"].consume(len(gps_new))
+        if len(baro) or len(gps_new):
+            alt_baro = self._alt_gps if self._alt_baro is None else self._alt_baro
+            alt_gps = alt_baro if self._alt_gps is None else self._alt_gps
+            alt = self.ALPHA_ALT * alt_baro + (1 - self.ALPHA_ALT) * alt_gps
+
+        self.prev_state = [roll, pitch, yaw, alt]
+        gps = rings["gps"].latest()
+        lat, lon = (gps[1][0, 0], gps[1][0, 1]) if gps is not None else (0.0, 0.0)
+        if tracer is not None:
+            tracer.record(self._trace_ids["process_async"], start)
+        return [lat, lon, alt, math.degrees(roll), math.degrees(pitch), math.degrees(yaw)]
+
+    def _apply_event(self, event):
+        t, name, values = event
+        ekf = self.ekf
+        if name == "mag":
+            ekf.update_mag((self.mag_matrix @ values + self.mag_offset).tolist())
+        elif name == "baro":
+            ekf.update_altitude(self._baro_altitude(values[0]), ekf.baro_noise)
+        else:
+            # Latency compensation: innovation against the altitude when the fix was valid
+            times, alts = self._alt_history.window()
+            predicted = None
+            if len(times):
+                i = int(np.searchsorted(times, t - self.gps_latency, side="right")) - 1
+                if i >= 0:
+                    predicted = float(alts[i, 0])
+            ekf.update_altitude(values[2], ekf.gps_alt_noise, predicted)
+
+    def _baro_altitude(self, pressure):
+        return self.math.baro_altitude(pressure, self.P0)
+
+    def _fuse(self, acc_avg, gyro_avg, mag_avg, gps_avg, baro_avg):
+        if self.ekf is not None:
+            return self._fuse_ekf(acc_avg, gyro_avg, mag_avg, gps_avg, baro_avg)
+
+        tracer = self.tracer
+        if tracer is not None:
+            start = tracer.now()
+
+        prev_roll, prev_pitch, prev_yaw, prev_alt = self.prev_state
+
         # 4. Compute roll, pitch from accelerometer
-        acc_roll = math.atan2(acc_avg[1], acc_avg[2])
-        acc_pitch = math.atan2(-acc_avg[0], math.sqrt(acc_avg[1]**2 + acc_avg[2]**2))
+        m = self.math
+        acc_roll = m.atan2(acc_avg[1], acc_avg[2])
+        acc_pitch = m.atan2(-acc_avg[0], math.sqrt(acc_avg[1]**2 + acc_avg[2]**2))
 
         # 5. Compute yaw from magnetometer
-        mag_x = mag_avg[0] * math.cos(acc_pitch) + mag_avg[2] * math.sin(acc_pitch)
-        mag_y = (mag_avg[0] * math.sin(acc_roll) * math.sin(acc_pitch) +
-                 mag_avg[1] * math.cos(acc_roll) -
-                 mag_avg[2] * math.sin(acc_roll) * math.cos(acc_pitch))
-        mag_yaw = math.atan2(-mag_y, mag_x)
+        if m.fast:
+            # sin/cos of the tilt angles straight from the gravity vector, no trig
+            r = math.sqrt(acc_avg[1]**2 + acc_avg[2]**2)
+            g = math.sqrt(acc_avg[0]**2 + r * r)
+            if r > 0.0:
+                sin_r, cos_r = acc_avg[1] / r, acc_avg[2] / r
+            else:
+                sin_r, cos_r = 0.0, 1.0
+            sin_p, cos_p = (-acc_avg[0] / g, r / g) if g > 0.0 else (0.0, 1.0)
+        else:
+            sin_r, cos_r = m.sin(acc_roll), m.cos(acc_roll)
+            sin_p, cos_p = m.sin(acc_pitch), m.cos(acc_pitch)
+        mag_x = mag_avg[0] * cos_p + mag_avg[2] * sin_p
+        mag_y = (mag_avg[0] * sin_r * sin_p +
+                 mag_avg[1] * cos_r -
+                 mag_avg[2] * sin_r * cos_p)
+        mag_yaw = m.atan2(-mag_y, mag_x)
 
         # 6. Altitude from baro + GPS
         pressure = baro_avg[0]
         gps_alt = gps_avg[2]
-        alt_baro = 44330 * (1 - (pressure / self.P0) ** 0.1903)
+        alt_baro = self._baro_altitude(pressure)
 
         # 7. Complementary filter
         roll = self.ALPHA_RPY * (prev_roll + gyro_avg[0]) + (1 - self.ALPHA_RPY) * acc_roll
@@ -89,6 +441,8 @@ class Navigation:
 
         # 8. Update internal state
         self.prev_state = [roll, pitch, yaw, alt]
+        if tracer is not None:
+            tracer.record(self._trace_ids["fuse"], start)
 
         # 9. Return final fused values
         return [
@@ -99,3 +453,26 @@ class Navigation:
             math.degrees(pitch),      # pitch in degrees
             math.degrees(yaw)         # yaw in degrees
         ]
+
+    def _fuse_ekf(self, acc_avg, gyro_avg, mag_avg, gps_avg, baro_avg):
+        tracer = self.tracer
+        if tracer is not None:
+            start = tracer.now()
+        now = self.clock()
+        dt = 0.0 if self.prev_time is None else min(max(now - self.prev_time, 1e-4), 0.1)
+        self.prev_time = now
+
+        alt_baro = self._baro_altitude(baro_avg[0])
+        roll, pitch, yaw, alt = self.ekf.step(gyro_avg, acc_avg, mag_avg, alt_baro, gps_avg[2], dt)
+        self.prev_state = [roll, pitch, yaw, alt]
+        if tracer is not None:
+            tracer.record(self._trace_ids["fuse"], start)
+
+        return [
+            gps_avg[0],
+            gps_avg[1],
+            alt,
+            math.degrees(roll),
+            math.degrees(pitch),
+            math.degrees(yaw)
+        ]
@@ -0,0 +1,116 @@
+import csv
+import json
+import sys
+import time
+from navigation import Navigation
+from guidance import Guidance
+from control import Control
+
+
+class SimClock:
+    """Manually advanced clock; pass as `clock=` to Guidance and Control."""
+
+    def __init__(self, start=0.0):
+        self.now = float(start)
+
+    def __call__(self):
+        return self.now
+
+    def set(self, t):
+        self.now = float(t)
+
+
+def read_frames(path):
+    """
+    Yield recorded frames from a JSON-lines flight log. Each line holds:
+        t               : timestamp (s)
+        mpu6050, gps, mag, baro : sensor bursts as in Navigation.process
+        flight_mode     : 1-6
+        rc_failsafe, battery_failsafe : bool
+        rc_input_pwm    : [roll, pitch, yaw, throttle]
+        guided_command  : optional {"command": ..., "target": {...}}
+    """
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+class Replay:
+    """Runs recorded frames through Navigation -> Guidance -> Control on a simulated clock."""
+
+    FIELDS = ["t", "mode", "lat", "lon", "alt", "roll", "pitch", "yaw",
+              "roll_pwm", "pitch_pwm", "yaw_pwm", "thrust_pwm", "M1", "M2", "M3", "M4"]
+
+    def __init__(self, start_time=0.0, nav_backend="complementary", calibration=None):
+        self.clock = SimClock(start_time)
+        self.navigation = Navigation(backend=nav_backend, clock=self.clock, calibration=calibration)
+        self.guidance = Guidance(clock=self.clock)
+        self.control = Control(clock=self.clock)
+
+    def step(self, frame):
+        self.clock.set(frame["t"])
+
+        if "guided_command" in frame:
+            cmd = frame["guided_command"]
+            self.guidance.set_guided_command(cmd["command"], cmd.get("target"))
+
+        nav_state = self.navigation.process(
+            frame["mpu6050"], frame["gps"], frame["mag"], frame["baro"]
+        )
+        guidance_out = self.guidance.process(
+            nav_state,
+            frame["flight_mode"],
+            frame.get("rc_failsafe", False),
+            frame.get("battery_failsafe", False),
+            frame["rc_input_pwm"]
+        )
+        control_out = self.control.process(nav_state, guidance_out)
+
+        motors = control_out["motors"]
+        return [frame["t"], guidance_out["mode"], *nav_state,
+                control_out["roll_pwm"], control_out["pitch_pwm"],
+                control_out["yaw_pwm"], control_out["thrust_pwm"],
+                motors["M1"], motors["M2"], motors["M3"], motors["M4"]]
+
+    def run(self, frames, out_path):
+        """Replay every frame as fast as possible and write one CSV row per frame."""
+        count = 0
+        with open(out_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.FIELDS)
+            for frame in frames:
+                writer.writerow(self.step(frame))
+                count += 1
+        return count
+
+
+def replay_file(log_path, out_path):
+    frames = read_frames(log_path)
+    first = next(frames, None)
+    if first is None:
+        return 0
+
+    replay = Replay(start_time=first["t"])
+
+    def all_frames():
+        yield first
+        yield from frames
+
+    return replay.run(all_frames(), out_path)
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python replay.py <flight_log.jsonl> <results.csv>")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    count = replay_file(sys.argv[1], sys.argv[2])
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {count} frames in {elapsed:.3f} s ({count / max(elapsed, 1e-9):.0f} frames/s)")
+
+
+if __name__ == "__main__":
+    main()
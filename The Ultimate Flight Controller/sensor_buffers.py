@@ -0,0 +1,103 @@
+import numpy as np
+
+# Values per sample, matching the Navigation.process inputs
+SENSOR_WIDTHS = {
+    "mpu6050": 6,   # ax, ay, az, gx, gy, gz (raw)
+    "gps": 3,       # lat, lon, alt
+    "mag": 3,       # mx, my, mz
+    "baro": 3       # pressure, temp, humidity
+}
+
+
+class SensorRing:
+    """
+    Single-producer / single-consumer ring of timestamped samples in a NumPy
+    structured array.
+
+    The producer only advances `head` and the consumer only advances `tail`,
+    so the two sides never take a lock. Every sample is stored twice
+    (slot i and i + capacity), so any unconsumed run is one contiguous
+    slice and window() can return views with no copy, even across the wrap.
+    When the ring is full the producer drops the new sample and counts it in
+    `dropped`, so memory stays fixed however long the session runs.
+    """
+
+    def __init__(self, width, capacity=1024):
+        self.width = width
+        self.capacity = capacity
+        self.dtype = np.dtype([("t", "f8"), ("v", "f8", (width,))])
+        self.buffer = np.zeros(2 * capacity, dtype=self.dtype)
+        self._t = self.buffer["t"]
+        self._v = self.buffer["v"]
+        self.head = 0      # total samples written (producer)
+        self.tail = 0      # total samples consumed (consumer)
+        self.dropped = 0
+
+    def __len__(self):
+        return self.head - self.tail
+
+    # -------------------------------
+    # Producer side
+    # -------------------------------
+    def push(self, t, values):
+        head = self.head
+        if head - self.tail >= self.capacity:
+            self.dropped += 1
+            return False
+        i = head % self.capacity
+        self._t[i] = t
+        self._v[i] = values
+        self._t[i + self.capacity] = t
+        self._v[i + self.capacity] = values
+        self.head = head + 1  # publish only after the slot is complete
+        return True
+
+    def push_many(self, times, values):
+        """Write a block of samples; returns how many fitted."""
+        n = min(len(times), self.capacity - (self.head - self.tail))
+        self.dropped += len(times) - n
+        if n <= 0:
+            return 0
+        start = self.head % self.capacity
+        first = min(n, self.capacity - start)
+        for base in (start, start + self.capacity):
+            self._t[base:base + first] = times[:first]
+            self._v[base:base + first] = values[:first]
+        if n > first:
+            rest = n - first
+            for base in (0, self.capacity):
+                self._t[base:base + rest] = times[first:n]
+                self._v[base:base + rest] = values[first:n]
+        self.head += n
+        return n
+
+    # -------------------------------
+    # Consumer side
+    # -------------------------------
+    def window(self, max_n=None):
+        """(times, values) views over the unconsumed samples, oldest first; no copy."""
+        n = self.head - self.tail
+        if max_n is not None:
+            n = min(n, max_n)
+        i = self.tail % self.capacity
+        return self._t[i:i + n], self._v[i:i + n]
+
+    def consume(self, n):
+        """
+        Release the oldest n samples once the views from window() are no
+        longer needed. Pass the length of the window that was processed:
+        samples the producer pushed since then must stay queued.
+        """
+        self.tail += min(n, self.head - self.tail)
+
+    def latest(self):
+        """(t, values) view of the most recent sample, or None if nothing was written."""
+        if self.head == 0:
+            return None
+        i = (self.head - 1) % self.capacity
+        return self._t[i:i + 1], self._v[i:i + 1]
+
+
+def make_sensor_rings(capacity=1024):
+    """One ring per Navigation input, keyed like the process() arguments."""
+    return {name: SensorRing(width, capacity) for name, width in SENSOR_WIDTHS.items()}
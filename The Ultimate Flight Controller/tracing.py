@@ -0,0 +1,88 @@
+import json
+import time
+
+
+class Tracer:
+    """
+    Span recorder for the flight loop, exported as Chrome trace / Perfetto JSON.
+
+    Stages hold `self.tracer = None` and guard every hook with
+    `if tracer is not None`, so a disabled tracer costs one comparison.
+    Spans go into three preallocated lists used as a ring: once `capacity`
+    spans are stored the oldest are overwritten and counted in `overwritten`.
+
+        tracer = Tracer()
+        nav_id = tracer.intern("navigation.process")
+        start = tracer.now()
+        ...
+        tracer.record(nav_id, start)
+        tracer.save("flight.trace.json")   # open in ui.perfetto.dev or chrome://tracing
+    """
+
+    def __init__(self, capacity=65536, clock=time.perf_counter_ns):
+        self.capacity = capacity
+        self.now = clock
+        self.names = []
+        self._ids = {}
+        self._name = [0] * capacity
+        self._start = [0] * capacity
+        self._end = [0] * capacity
+        self.count = 0
+
+    def intern(self, name):
+        """Stable small integer for a span name; call once, outside the hot path."""
+        span_id = self._ids.get(name)
+        if span_id is None:
+            span_id = self._ids[name] = len(self.names)
+            self.names.append(name)
+        return span_id
+
+    def record(self, span_id, start):
+        """Close a span opened at `start` (from self.now()) at the current time."""
+        end = self.now()
+        i = self.count % self.capacity
+        self._name[i] = span_id
+        self._start[i] = start
+        self._end[i] = end
+        self.count += 1
+
+    def add(self, span_id, start, end):
+        """Store a span whose both ends were already measured (ns)."""
+        i = self.count % self.capacity
+        self._name[i] = span_id
+        self._start[i] = start
+        self._end[i] = end
+        self.count += 1
+
+    @property
+    def overwritten(self):
+        return max(0, self.count - self.capacity)
+
+    def clear(self):
+        self.count = 0
+
+    def spans(self):
+        """(name, start_ns, duration_ns) of every stored span, oldest first."""
+        n = min(self.count, self.capacity)
+        first = self.count - n
+        out = []
+        for k in range(first, self.count):
+            i = k % self.capacity
+            out.append((self.names[self._name[i]], self._start[i], self._end[i] - self._start[i]))
+        return out
+
+    def chrome_events(self, pid=1, tid=1):
+        events = [{"name": name, "cat": name.split(".", 1)[0], "ph": "X", "pid": pid, "tid": tid,
+                   "ts": start / 1000.0, "dur": duration / 1000.0}
+                  for name, start, duration in self.spans()]
+        events.append({"name": "process_name", "ph": "M", "pid": pid, "tid": tid,
+                       "args": {"name": "flight controller"}})
+        return events
+
+    def save(self, path, pid=1, tid=1):
+        """Write a Chrome trace JSON file; returns the number of spans written."""
+        events = self.chrome_events(pid, tid)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms",
+                       "otherData": {"overwritten_spans": self.overwritten}}, f)
+        return len(events) - 1